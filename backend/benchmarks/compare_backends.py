@@ -0,0 +1,50 @@
+"""
+Запускает замер запросов статистики на SQLite и PostgreSQL и выводит результаты рядом.
+
+Каждый бэкенд замеряется в отдельном процессе (python -m benchmarks.stats_queries).
+Для PostgreSQL нужна пустая база: укажите ее в BENCHMARK_POSTGRES_URL,
+иначе замер PostgreSQL пропускается.
+
+Запуск из каталога backend:
+    BENCHMARK_POSTGRES_URL=postgresql://... python -m benchmarks.compare_backends [--iterations 2000]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def run(database_url: str, extra_args: list) -> str:
+    """Запускает benchmarks.stats_queries с заданной базой и возвращает его вывод."""
+    env = dict(os.environ, DATABASE_URL=database_url)
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.stats_queries", *extra_args],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", default="2000")
+    parser.add_argument("--users", default="100")
+    parser.add_argument("--rows", default="50")
+    args = parser.parse_args()
+    extra_args = ["--iterations", args.iterations, "--users", args.users, "--rows", args.rows]
+
+    backends = {"SQLite (WAL)": f"sqlite:///{tempfile.mkdtemp()}/compare.db"}
+    postgres_url = os.getenv("BENCHMARK_POSTGRES_URL")
+    if postgres_url:
+        backends["PostgreSQL"] = postgres_url
+    else:
+        print("BENCHMARK_POSTGRES_URL не задана, PostgreSQL пропущен\n")
+
+    for name, url in backends.items():
+        print(f"== {name}")
+        print(run(url, extra_args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Замер накладных расходов Python на один запрос статистики.
+
+Сравнивает прежний вариант (ORM Query, который строится заново при каждом
+вызове) с текущим (заранее собранные Core select() из utils/db_operations.py).
+Время внутри драйвера БД вычитается, поэтому результат показывает именно
+затраты SQLAlchemy и Python.
+
+Запуск из каталога backend:
+    python -m benchmarks.stats_queries [--users 100] [--rows 50] [--iterations 2000]
+
+По умолчанию используется временный файл SQLite (WAL); чтобы замерить
+на PostgreSQL, задайте DATABASE_URL пустой базы. Сравнение обоих бэкендов —
+benchmarks/compare_backends.py.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/stats_benchmark.db")
+
+from sqlalchemy import event, func, insert  # noqa: E402
+
+from models.database import Base, SessionLocal, get_engine  # noqa: E402
+from models.init_db import init_db  # noqa: E402
+from models.categories import IncomeCategory, IncomeCategoryClosure  # noqa: E402
+from models.income import Income  # noqa: E402
+from models.user import User  # noqa: E402
+from utils.db_operations import get_monthly_income, get_month_range  # noqa: E402
+
+
+def legacy_monthly_income(user_id, db):
+    """Прежняя реализация get_monthly_income на ORM Query (для сравнения)."""
+    start_of_month, end_of_month = get_month_range(datetime.today().date())
+
+    incomes_grouped = db.query(IncomeCategory.name, func.sum(Income.amount)) \
+        .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
+        .filter(Income.user_id == user_id, Income.date.between(start_of_month, end_of_month)) \
+        .group_by(IncomeCategory.name) \
+        .all()
+
+    total_income = sum(amount for _, amount in incomes_grouped) if incomes_grouped else 0
+    category_incomes = {category: amount for category, amount in incomes_grouped} if incomes_grouped else {}
+
+    detailed_incomes = db.query(Income.date, IncomeCategory.name, Income.description, Income.amount) \
+        .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
+        .filter(Income.user_id == user_id, Income.date.between(start_of_month, end_of_month)) \
+        .order_by(Income.date) \
+        .all()
+
+    return total_income, category_incomes, detailed_incomes
+
+
+def seed(users: int, rows: int):
+    """Заполняет базу пользователями и их доходами за текущий месяц."""
+    engine = get_engine()
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine)
+    else:
+        init_db()
+
+    start_of_month, end_of_month = get_month_range(datetime.today().date())
+    days = (end_of_month - start_of_month).days
+    with engine.begin() as connection:
+        connection.execute(insert(IncomeCategory.__table__), [{"name": f"Категория {i}"} for i in range(10)])
+        category_ids = [row[0] for row in connection.execute(IncomeCategory.__table__.select())]
+        connection.execute(insert(IncomeCategoryClosure.__table__), [
+            {"ancestor_id": category_id, "descendant_id": category_id, "depth": 0} for category_id in category_ids
+        ])
+        user_ids = [
+            connection.execute(
+                insert(User.__table__).values(tg_id=10 ** 9 + i, name=f"user{i}", balance=0)
+                .returning(User.__table__.c.id)
+            ).scalar_one()
+            for i in range(users)
+        ]
+        connection.execute(insert(Income.__table__), [
+            {
+                "user_id": user_id,
+                "category_id": random.choice(category_ids),
+                "amount": Decimal(random.randint(100, 10000)),
+                "date": start_of_month + timedelta(days=random.randint(0, days)),
+                "description": "benchmark",
+            }
+            for user_id in user_ids
+            for _ in range(rows)
+        ])
+    return user_ids
+
+
+def measure(query_func, user_ids, iterations):
+    """Возвращает (общее время, время в драйвере БД) на один вызов в микросекундах."""
+    engine = get_engine()
+    db_time = 0.0
+    started_at = {}
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        started_at[id(cursor)] = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        nonlocal db_time
+        db_time += time.perf_counter() - started_at.pop(id(cursor))
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    db = SessionLocal()
+    try:
+        for user_id in user_ids[:10]:
+            query_func(user_id, db)  # прогрев кэша компиляции
+        db_time = 0.0
+        started = time.perf_counter()
+        for i in range(iterations):
+            query_func(user_ids[i % len(user_ids)], db)
+        total = time.perf_counter() - started
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", before)
+        event.remove(engine, "after_cursor_execute", after)
+    return total / iterations * 1e6, db_time / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=50, help="доходов на пользователя")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    user_ids = seed(args.users, args.rows)
+    print(f"{'вариант':<12}{'всего, мкс':>14}{'в БД, мкс':>14}{'Python, мкс':>14}")
+    for name, query_func in (("ORM Query", legacy_monthly_income), ("Core select", get_monthly_income)):
+        total, db_time = measure(query_func, user_ids, args.iterations)
+        print(f"{name:<12}{total:>14.1f}{db_time:>14.1f}{total - db_time:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
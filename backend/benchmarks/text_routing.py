@@ -0,0 +1,110 @@
+"""
+Замер стоимости маршрутизации одного текстового сообщения.
+
+Проходит по обработчикам сообщений всех роутеров в том порядке, в котором
+их подключает main.py, и проверяет фильтры так же, как это делает aiogram,
+но без вызова самих обработчиков. Сравниваются:
+- «цепочка lambda»: каждая кнопка — отдельный обработчик с фильтром
+  message.text == "...", плюс прежний фильтр диапазона дат " " in message.text;
+- «реестр»: текущая схема с одним обработчиком и поиском в словаре.
+
+Запуск из каталога backend:
+    python -m benchmarks.text_routing [--iterations 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("TELEGRAM_TOKEN", "42:BENCHMARK")
+
+from aiogram import Bot  # noqa: E402
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject  # noqa: E402
+from aiogram.types import Chat, Message, User  # noqa: E402
+
+from filters.text_commands import text_commands, router as text_commands_router  # noqa: E402
+from main import dp  # noqa: E402
+
+
+def current_chain() -> list:
+    """Обработчики сообщений всех роутеров в порядке проверки."""
+    return [handler for router in dp.chain_tail for handler in router.message.handlers]
+
+
+def legacy_chain() -> list:
+    """Та же цепочка, но с отдельным lambda-обработчиком на каждую кнопку."""
+    chain = []
+    for router in dp.chain_tail:
+        if router is text_commands_router:
+            for text in text_commands._commands:
+                chain.append(HandlerObject(
+                    callback=lambda message: None,
+                    filters=[FilterObject(callback=lambda message, text=text: message.text == text)],
+                ))
+            continue
+        for handler in router.message.handlers:
+            if handler.callback.__name__ == "handle_date_range":
+                handler = HandlerObject(
+                    callback=handler.callback,
+                    filters=[FilterObject(callback=lambda message: " " in message.text)],
+                )
+            chain.append(handler)
+    return chain
+
+
+async def route(chain: list, message: Message, kwargs: dict):
+    """Возвращает первый обработчик, фильтры которого пропустили сообщение."""
+    for handler in chain:
+        check, _ = await handler.check(message, **kwargs)
+        if check:
+            return handler
+    return None
+
+
+def make_message(text: str) -> Message:
+    return Message(
+        message_id=1,
+        date=datetime.now(),
+        chat=Chat(id=1, type="private"),
+        from_user=User(id=1, is_bot=False, first_name="Benchmark"),
+        text=text,
+    )
+
+
+async def measure(chain: list, message: Message, kwargs: dict, iterations: int) -> float:
+    """Среднее время маршрутизации одного сообщения в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await route(chain, message, kwargs)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int):
+    bot = Bot(os.environ["TELEGRAM_TOKEN"])
+    kwargs = {"bot": bot, "raw_state": None}
+    chains = {"цепочка lambda": legacy_chain(), "реестр": current_chain()}
+    texts = list(text_commands._commands) + ["01.01.2026 31.01.2026", "обед в кафе"]
+
+    print(f"Обработчиков сообщений: {', '.join(f'{name} — {len(chain)}' for name, chain in chains.items())}")
+    print(f"{'текст':<26}" + "".join(f"{name + ', мкс':>22}" for name in chains))
+    totals = dict.fromkeys(chains, 0.0)
+    for text in texts:
+        message = make_message(text)
+        row = f"{text:<26}"
+        for name, chain in chains.items():
+            cost = await measure(chain, message, kwargs, iterations)
+            totals[name] += cost
+            row += f"{cost:>22.2f}"
+        print(row)
+    print(f"{'среднее':<26}" + "".join(f"{totals[name] / len(texts):>22.2f}" for name in chains))
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,17 @@
+import os
+
+from aiogram.filters import Filter
+from aiogram.types import Message
+
+
+class AdminFilter(Filter):
+    """
+    Пропускает только сообщения администратора бота (TELEGRAM_ADMIN_ID).
+
+    Переменная окружения читается при каждой проверке: модули обработчиков
+    импортируются раньше, чем загружается .env.
+    """
+
+    async def __call__(self, message: Message) -> bool:
+        admin_id = os.getenv("TELEGRAM_ADMIN_ID")
+        return bool(admin_id) and str(message.from_user.id) == admin_id.strip()
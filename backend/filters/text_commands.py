@@ -0,0 +1,108 @@
+import logging
+
+from typing import Any, Callable, Dict, Optional
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.filters import Filter
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Команда доступна в любом состоянии FSM
+ANY_STATE = "*"
+
+
+def _state_keys(state) -> list:
+    """Преобразует состояние (State, StatesGroup, строку, None или их список) в ключи словаря."""
+    if isinstance(state, (list, tuple, set)):
+        return [key for item in state for key in _state_keys(item)]
+    if isinstance(state, type) and issubclass(state, StatesGroup):
+        return [item.state for item in state.__all_states__]
+    if isinstance(state, State):
+        return [state.state]
+    return [state]
+
+
+class TextCommandRegistry:
+    """
+    Реестр текстовых команд (кнопок reply-клавиатуры).
+
+    Вместо цепочки lambda-фильтров по всем роутерам текст сообщения ищется
+    в словаре {текст кнопки: {состояние: обработчик}} за O(1). Обработчик,
+    зарегистрированный для текущего состояния FSM, имеет приоритет над
+    обработчиком для любого состояния (ANY_STATE).
+    """
+
+    def __init__(self):
+        self._commands: Dict[str, Dict[Optional[str], HandlerObject]] = {}
+
+    def command(self, text: str, state=ANY_STATE, flags: Optional[Dict[str, Any]] = None):
+        """
+        Декоратор регистрации обработчика кнопки.
+
+        :param text: Точный текст кнопки.
+        :param state: Состояние FSM (State, StatesGroup, их список, None — без состояния,
+                      ANY_STATE — любое состояние).
+        :param flags: Флаги обработчика (например, {"throttling": "menu"}).
+        """
+        def decorator(callback: Callable) -> Callable:
+            handler = HandlerObject(callback=callback, flags=dict(flags or {}))
+            by_state = self._commands.setdefault(text, {})
+            for key in _state_keys(state):
+                if key in by_state:
+                    raise ValueError(f"Команда '{text}' для состояния {key} уже зарегистрирована")
+                by_state[key] = handler
+            return callback
+        return decorator
+
+    def resolve(self, text: Optional[str], raw_state: Optional[str] = None) -> Optional[HandlerObject]:
+        """
+        Находит обработчик для текста сообщения с учетом состояния FSM.
+
+        :param text: Текст сообщения.
+        :param raw_state: Текущее состояние FSM.
+        :return: Обработчик или None.
+        """
+        by_state = self._commands.get(text)
+        if by_state is None:
+            return None
+        return by_state.get(raw_state) or by_state.get(ANY_STATE)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._commands
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+
+class TextCommandFilter(Filter):
+    """Фильтр, пропускающий сообщения с текстом зарегистрированной кнопки."""
+
+    def __init__(self, registry: TextCommandRegistry):
+        self.registry = registry
+
+    async def __call__(self, message: Message, raw_state: Optional[str] = None):
+        handler = self.registry.resolve(message.text, raw_state)
+        if handler is None:
+            return False
+        return {"text_command": handler}
+
+
+text_commands = TextCommandRegistry()
+
+router = Router()
+
+
+@router.message(TextCommandFilter(text_commands))
+async def dispatch_text_command(message: Message, text_command: HandlerObject, **kwargs):
+    """
+    Единственный обработчик всех текстовых команд: вызывает найденный в реестре обработчик.
+
+    Обработчику передаются только те аргументы, которые он объявил.
+
+    :param message: Объект сообщения от пользователя.
+    :param text_command: Обработчик, найденный фильтром.
+    """
+    return await text_command.call(message, **kwargs)
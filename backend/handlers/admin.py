@@ -0,0 +1,93 @@
+import html
+import logging
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+from tabulate import tabulate
+
+from filters.admin import AdminFilter
+from utils.analytics import get_dashboard, ANALYTICS_CACHE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.filter(AdminFilter())
+
+KIND_TITLES = {
+    "income": "💰 Доходы",
+    "expense": "💸 Расходы",
+}
+
+
+async def _load_dashboard(message: Message):
+    """Возвращает сводную статистику или None, если ее не удалось посчитать (ответ уже отправлен)."""
+    try:
+        return await get_dashboard()
+    except Exception as e:
+        logger.error("Ошибка при расчете статистики администратора: %s", e, exc_info=True)
+        await message.answer("❌ Не удалось посчитать статистику.")
+        return None
+
+
+def _footer(dashboard) -> str:
+    return f"\n\n<i>Посчитано в {dashboard.computed_at:%H:%M:%S}, обновляется раз в {ANALYTICS_CACHE_SECONDS // 60} мин.</i>"
+
+
+@router.message(Command("admin"))
+async def show_admin_overview(message: Message):
+    """
+    Обработчик команды /admin. Показывает активных пользователей, регистрации и перцентили активности.
+
+    :param message: Объект сообщения от администратора.
+    """
+    dashboard = await _load_dashboard(message)
+    if dashboard is None:
+        return
+    today, week, month = dashboard.registrations
+    text = (
+        f"📊 <b>Статистика на {dashboard.day:%d.%m.%Y}</b>\n\n"
+        f"👥 DAU / WAU / MAU: {dashboard.dau} / {dashboard.wau} / {dashboard.mau}\n"
+        f"🆕 Регистрации (день / 7 дней / 30 дней): {today} / {week} / {month}\n"
+        f"🧮 Операций на активного пользователя за 30 дней: p50 {dashboard.p50:.0f}, p99 {dashboard.p99:.0f}\n\n"
+        "/admin_volume — операции по дням\n"
+        "/admin_categories — популярные категории"
+    )
+    await message.answer(text + _footer(dashboard))
+
+
+@router.message(Command("admin_volume"))
+async def show_admin_volume(message: Message):
+    """
+    Обработчик команды /admin_volume. Показывает количество и суммы операций по дням.
+
+    :param message: Объект сообщения от администратора.
+    """
+    dashboard = await _load_dashboard(message)
+    if dashboard is None:
+        return
+    table = tabulate(
+        [[f"{day:%d.%m}", count, f"{income:.0f}", f"{expense:.0f}"]
+         for day, count, income, expense in dashboard.volume],
+        ["День", "Операций", "Доходы", "Расходы"],
+    )
+    await message.answer(f"📈 <b>Операции по дням</b>\n<pre>{html.escape(table)}</pre>" + _footer(dashboard))
+
+
+@router.message(Command("admin_categories"))
+async def show_admin_categories(message: Message):
+    """
+    Обработчик команды /admin_categories. Показывает категории с наибольшими суммами за 30 дней.
+
+    :param message: Объект сообщения от администратора.
+    """
+    dashboard = await _load_dashboard(message)
+    if dashboard is None:
+        return
+    parts = ["🏆 <b>Популярные категории за 30 дней</b>"]
+    for kind, rows in dashboard.top_categories.items():
+        parts.append(f"\n{KIND_TITLES[kind]}:")
+        if not rows:
+            parts.append("—")
+        parts.extend(f"📌 {html.escape(name)}: {amount:.2f} ₽ ({count} операций)" for name, count, amount in rows)
+    await message.answer("\n".join(parts) + _footer(dashboard))
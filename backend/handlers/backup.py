@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import tempfile
+
+from datetime import datetime
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, FSInputFile
+
+from keyboards.keyboards import registered_main
+from utils.backup import write_backup, restore_backup
+from utils.exceptions import BackupError
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Telegram не позволяет ботам скачивать файлы больше 20 МБ
+MAX_BACKUP_FILE_SIZE = 20 * 1024 * 1024
+
+
+class RestoreStates(StatesGroup):
+    """
+    Класс состояний для восстановления из резервной копии.
+
+    Состояния:
+    - waiting_for_file: Ожидание файла резервной копии.
+    """
+    waiting_for_file = State()
+
+
+def _temp_path(suffix: str) -> str:
+    """Создает пустой временный файл и возвращает путь к нему."""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+
+@router.message(Command("backup"), flags={"throttling": "stats"})
+async def send_backup(message: Message):
+    """
+    Обработчик команды /backup. Отправляет пользователю файл со всеми его данными.
+
+    :param message: Объект сообщения от пользователя.
+    """
+    path = _temp_path(".jsonl.gz")
+    try:
+        counts = await asyncio.to_thread(write_backup, message.from_user.id, path)
+        await message.answer_document(
+            FSInputFile(path, filename=f"coinkeeper_{datetime.today().date()}.jsonl.gz"),
+            caption=(f"💾 Резервная копия: доходов — {counts['income']}, расходов — {counts['expense']}.\n"
+                     f"Чтобы восстановить данные, отправьте команду /restore и этот файл."))
+    except BackupError:
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+    except Exception as e:
+        logger.error("Ошибка при создании резервной копии: %s", e)
+        await message.answer("❌ Не удалось создать резервную копию. Попробуйте позже.")
+    finally:
+        os.remove(path)
+
+
+@router.message(Command("restore"))
+async def start_restore(message: Message, state: FSMContext):
+    """
+    Обработчик команды /restore. Просит прислать файл резервной копии.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    await message.answer(
+        "📥 Отправьте файл резервной копии (.jsonl.gz), полученный командой /backup.\n"
+        "Операции, которые уже есть в базе, повторно не добавляются.")
+    await state.set_state(RestoreStates.waiting_for_file)
+
+
+@router.message(RestoreStates.waiting_for_file, lambda message: message.document is not None,
+                flags={"throttling": "stats"})
+async def process_restore_file(message: Message, state: FSMContext):
+    """
+    Проверяет присланный файл и восстанавливает из него данные пользователя.
+
+    :param message: Объект сообщения с документом.
+    :param state: Состояние FSM.
+    """
+    if message.document.file_size and message.document.file_size > MAX_BACKUP_FILE_SIZE:
+        await message.answer("❌ Файл слишком большой (больше 20 МБ).")
+        return
+
+    await state.clear()
+    path = _temp_path(".jsonl.gz")
+    try:
+        await message.bot.download(message.document, destination=path)
+        result = await asyncio.to_thread(restore_backup, message.from_user.id, path)
+    except BackupError as e:
+        logger.info("Файл резервной копии отклонен: %s", e)
+        await message.answer(f"❌ Файл не принят: {e}. Данные не изменены.")
+        return
+    except Exception as e:
+        logger.error("Ошибка при восстановлении из резервной копии: %s", e)
+        await message.answer("❌ Не удалось восстановить данные. Попробуйте позже.")
+        return
+    finally:
+        os.remove(path)
+
+    await message.answer(
+        f"✅ Данные восстановлены. Добавлено доходов: {result['income']}, расходов: {result['expense']}.\n"
+        f"👛 Баланс: {result['balance']} рублей",
+        reply_markup=registered_main)
+
+
+@router.message(RestoreStates.waiting_for_file)
+async def cancel_restore(message: Message, state: FSMContext):
+    """
+    Любое сообщение без файла отменяет восстановление.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    await state.clear()
+    await message.answer("🚫 Восстановление отменено.", reply_markup=registered_main)
@@ -0,0 +1,170 @@
+import logging
+
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import select
+
+from models.database import get_db, get_read_db
+from models.categories import ExpenseCategory
+from models.user import User
+from keyboards.keyboards import registered_main, get_expense_categories_keyboard
+from utils.budgets import get_budgets, set_budget
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Количество делений шкалы расходования бюджета
+PROGRESS_BAR_WIDTH = 10
+
+budget_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="➕ Установить бюджет", callback_data="budget_set")],
+        [InlineKeyboardButton(text="⬅ Назад", callback_data="back")],
+    ]
+)
+
+
+class BudgetStates(StatesGroup):
+    """
+    Класс состояний настройки бюджета.
+
+    Состояния:
+    - waiting_for_limit: Ожидание ввода лимита на месяц для выбранной категории.
+    """
+    waiting_for_limit = State()
+
+
+def _progress_bar(spent: Decimal, month_limit: Decimal) -> str:
+    """Шкала расходования бюджета из PROGRESS_BAR_WIDTH делений."""
+    filled = min(PROGRESS_BAR_WIDTH, int(spent * PROGRESS_BAR_WIDTH / month_limit)) if month_limit > 0 else 0
+    return "▰" * filled + "▱" * (PROGRESS_BAR_WIDTH - filled)
+
+
+def _format_budgets(budgets) -> str:
+    """
+    Формирует текст обзора бюджетов.
+
+    :param budgets: Список BudgetRow.
+    :return: Текст сообщения.
+    """
+    if not budgets:
+        return "💼 Бюджеты не заданы. Установите месячный лимит для категории расходов."
+    lines = [f"💼 Бюджеты на {date.today():%m.%Y}:", ""]
+    for budget in budgets:
+        percent = int(budget.spent * 100 / budget.month_limit) if budget.month_limit > 0 else 0
+        mark = "🚨" if percent >= 100 else "⚠️" if percent >= 80 else "✅"
+        lines.append(f"{mark} {budget.category}: {budget.spent:.2f} из {budget.month_limit:.2f} ₽ ({percent}%)")
+        lines.append(_progress_bar(budget.spent, budget.month_limit))
+    return "\n".join(lines)
+
+
+@router.message(Command("budget"))
+async def show_budgets(message: Message):
+    """
+    Обработчик команды /budget. Показывает бюджеты категорий и траты за текущий месяц.
+
+    :param message: Объект сообщения от пользователя.
+    """
+    db = next(get_read_db())
+    user_id = db.execute(select(User.id).where(User.tg_id == message.from_user.id)).scalar()
+    if user_id is None:
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        return
+
+    await message.answer(_format_budgets(get_budgets(db, user_id, date.today())), reply_markup=budget_menu)
+
+
+@router.callback_query(lambda c: c.data == "budget_set")
+async def choose_budget_category(callback_query: CallbackQuery):
+    """
+    Предлагает выбрать категорию расходов для бюджета.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    db = next(get_read_db())
+    await callback_query.message.edit_text(
+        "Выберите категорию расходов:",
+        reply_markup=get_expense_categories_keyboard(db, callback_prefix="budget_category_"))
+    await callback_query.answer()
+
+
+@router.callback_query(lambda c: c.data.startswith("budget_category_"))
+async def process_budget_category(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Запоминает выбранную категорию и запрашивает лимит.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    category_data = callback_query.data.removeprefix("budget_category_")
+    if not category_data.isdigit():
+        logger.error("Некорректные данные категории бюджета: %s", callback_query.data)
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    db = next(get_read_db())
+    name = db.execute(select(ExpenseCategory.name).where(ExpenseCategory.id == int(category_data))).scalar()
+    if name is None:
+        await callback_query.answer("❌ Категория не найдена. Попробуйте снова.")
+        return
+
+    await state.set_state(BudgetStates.waiting_for_limit)
+    await state.update_data(category_id=int(category_data), category_name=name)
+    await callback_query.message.edit_text(
+        f"Введите лимит расходов на месяц для категории «{name}» (0 — удалить бюджет):")
+    await callback_query.answer()
+
+
+@router.message(BudgetStates.waiting_for_limit)
+async def process_budget_limit(message: Message, state: FSMContext):
+    """
+    Сохраняет лимит бюджета выбранной категории.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    try:
+        month_limit = Decimal((message.text or "").replace(",", ".").strip())
+    except InvalidOperation:
+        await message.answer("❌ Ошибка! Введите корректную сумму.")
+        return
+    if not month_limit.is_finite() or month_limit < 0:
+        await message.answer("❌ Сумма не может быть отрицательной.")
+        return
+
+    data = await state.get_data()
+    db = next(get_db())
+    try:
+        user_id = db.execute(select(User.id).where(User.tg_id == message.from_user.id)).scalar()
+        if user_id is None:
+            await state.clear()
+            await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+            return
+        set_budget(db, user_id, data["category_id"], month_limit.quantize(Decimal("0.01")), date.today())
+        db.commit()
+        budgets = get_budgets(db, user_id, date.today())
+    except Exception as e:
+        db.rollback()
+        logger.error("Ошибка при сохранении бюджета: %s", e)
+        await message.answer("❌ Произошла ошибка при сохранении бюджета. Попробуйте снова.")
+        return
+    finally:
+        db.close()
+
+    await state.clear()
+    if month_limit > 0:
+        logger.info("Пользователь %s установил бюджет категории %s: %s", user_id, data["category_id"], month_limit)
+        await message.answer(f"✅ Бюджет категории «{data['category_name']}» установлен.",
+                             reply_markup=registered_main)
+    else:
+        logger.info("Пользователь %s удалил бюджет категории %s", user_id, data["category_id"])
+        await message.answer(f"🗑 Бюджет категории «{data['category_name']}» удален.",
+                             reply_markup=registered_main)
+    await message.answer(_format_budgets(budgets), reply_markup=budget_menu)
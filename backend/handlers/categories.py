@@ -0,0 +1,35 @@
+import logging
+
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+from models.database import get_read_db
+from keyboards.keyboards import get_categories_keyboard
+from utils.categories import CATEGORY_KINDS
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+
+@router.callback_query(lambda c: c.data.startswith("catnav_"), flags={"throttling": "menu"})
+async def navigate_categories(callback_query: CallbackQuery):
+    """
+    Переходит на другой уровень дерева категорий в той же клавиатуре.
+
+    callback_data имеет вид "catnav_<kind>_<id>_<callback_prefix>", где id = 0
+    означает верхний уровень, а callback_prefix сохраняется, чтобы выбор
+    категории попал в тот же обработчик (доход, расход или регулярная операция).
+
+    :param callback_query: Объект callback-запроса.
+    """
+    _, kind, parent_data, callback_prefix = callback_query.data.split("_", 3)
+    if kind not in CATEGORY_KINDS or not parent_data.isdigit():
+        logger.error("Некорректные данные навигации по категориям: %s", callback_query.data)
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    db = next(get_read_db())
+    keyboard = get_categories_keyboard(db, kind, callback_prefix, int(parent_data) or None)
+    await callback_query.message.edit_reply_markup(reply_markup=keyboard)
+    await callback_query.answer()
@@ -0,0 +1,63 @@
+import logging
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery
+
+from models.database import get_db
+from models.user import User
+from keyboards.keyboards import digest_menu
+from utils.digest import DIGEST_PERIODS
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+
+@router.message(Command("digest"))
+async def show_digest_menu(message: Message):
+    """
+    Обработчик команды /digest. Показывает текущую настройку сводки и меню выбора периода.
+
+    :param message: Объект сообщения от пользователя.
+    """
+    db = next(get_db())
+    user = db.query(User).filter(User.tg_id == message.from_user.id).first()
+    if not user:
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        return
+
+    if user.digest_period:
+        text = f"🔔 Сейчас вы получаете сводку {DIGEST_PERIODS[user.digest_period]}.\nВыберите новый период:"
+    else:
+        text = "🔕 Сводка отключена. Как часто присылать вам сводку доходов и расходов?"
+    await message.answer(text, reply_markup=digest_menu)
+
+
+@router.callback_query(lambda c: c.data.startswith("digest_set_"))
+async def set_digest_period(callback_query: CallbackQuery):
+    """
+    Сохраняет выбранный период сводки.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    period = callback_query.data.removeprefix("digest_set_")
+    if period != "off" and period not in DIGEST_PERIODS:
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    db = next(get_db())
+    user = db.query(User).filter(User.tg_id == callback_query.from_user.id).first()
+    if not user:
+        await callback_query.answer("❌ Вы не зарегистрированы.")
+        return
+
+    user.digest_period = None if period == "off" else period
+    db.commit()
+    logger.info("Пользователь %s выбрал период сводки: %s", user.id, period)
+
+    if user.digest_period:
+        await callback_query.message.edit_text(f"🔔 Вы будете получать сводку {DIGEST_PERIODS[period]}.")
+    else:
+        await callback_query.message.edit_text("🔕 Сводка отключена.")
+    await callback_query.answer()
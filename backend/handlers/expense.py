@@ -1,7 +1,6 @@
 import logging
 import calendar
 
-from decimal import Decimal
 from aiogram.fsm.state import State, StatesGroup
 from datetime import datetime
 from aiogram import Router
@@ -9,11 +8,12 @@ from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, C
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.orm import Session
 
+from filters.text_commands import text_commands
 from models.database import get_db
-from models.expense import Expense
 from models.categories import ExpenseCategory
 from models.user import User
 from keyboards.keyboards import registered_main, get_expense_categories_keyboard, transaction_menu
+from utils.transactions import record_transaction
 
 logger = logging.getLogger(__name__)
 
@@ -64,7 +64,7 @@ def get_days_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-@router.message(lambda message: message.text == "Добавить расход")
+@text_commands.command("Добавить расход")
 async def start_add_expense(message: Message, state: FSMContext):
     """
     Начинает процесс добавления расхода. Переводит пользователя в состояние ожидания ввода суммы.
@@ -109,7 +109,7 @@ async def process_expense_category_callback(callback_query: CallbackQuery, state
     category_data = callback_query.data.split('_')[2]
 
     if not category_data.isdigit():
-        logger.error(f"Некорректный ID категории: {category_data}")
+        logger.error("Некорректный ID категории: %s", category_data)
         await callback_query.answer("❌ Ошибка! Попробуйте снова.")
         return
 
@@ -117,7 +117,7 @@ async def process_expense_category_callback(callback_query: CallbackQuery, state
     category = db.query(ExpenseCategory).filter(ExpenseCategory.id == category_id).first()
 
     if not category:
-        logger.error(f"Категория расхода с ID {category_id} не найдена.")
+        logger.error("Категория расхода с ID %s не найдена.", category_id)
         await callback_query.answer("❌ Категория расхода не найдена. Попробуйте снова.")
         return
     
@@ -128,8 +128,9 @@ async def process_expense_category_callback(callback_query: CallbackQuery, state
         return
 
     await state.update_data(category_id=category.id)
-    await callback_query.message.answer(f"Вы выбрали категорию расхода: {category.name}")
-    await callback_query.message.answer("Выберите день месяца или введите его вручную:", reply_markup=get_days_keyboard())
+    await callback_query.message.answer(
+        f"Вы выбрали категорию расхода: {category.name}\nВыберите день месяца или введите его вручную:",
+        reply_markup=get_days_keyboard())
     await state.set_state(ExpenseStates.waiting_for_date)
 
 
@@ -148,11 +149,10 @@ async def process_day_callback(callback_query: CallbackQuery, state: FSMContext)
 
         await state.update_data(date=expense_date)
         await callback_query.message.edit_reply_markup(reply_markup=None)
-        await callback_query.message.answer(f"Вы выбрали {day} число.")
-        await callback_query.message.answer("Введите описание расхода (например, 'Оплата магазина'):")
+        await callback_query.message.answer(f"Вы выбрали {day} число.\nВведите описание расхода (например, 'Оплата магазина'):")
         await state.set_state(ExpenseStates.waiting_for_description)
     except ValueError as e:
-        logger.error(f"Ошибка при выборе дня: {e}")
+        logger.error("Ошибка при выборе дня: %s", e)
         await callback_query.answer("❌ Некорректный день для текущего месяца.")
 
 
@@ -207,7 +207,7 @@ async def process_expense_description(message: Message, state: FSMContext):
         category = db.query(ExpenseCategory).filter(ExpenseCategory.id == category_id).first()
 
         if not category:
-            logger.error(f"Категория с ID {category_id} не найдена.")
+            logger.error("Категория с ID %s не найдена.", category_id)
             await message.answer("❌ Ошибка. Категория не найдена.")
             return
 
@@ -217,17 +217,15 @@ async def process_expense_description(message: Message, state: FSMContext):
             await message.answer("❌ Вы не зарегистрированы.")
             return
 
-        new_expense = Expense(user_id=user.id, category_id=category.id, amount=amount, date=expense_date, description=description)
-        db.add(new_expense)
-        user.balance -= Decimal(amount)
+        record_transaction(db, user.id, "expense", category.id, amount, expense_date, description, user.active_group_id)
         db.commit()
 
-        logger.info(f"Добавлен расход: {amount} ₽, {category.name}, {expense_date}, {description}")
+        logger.info("Добавлен расход: %s ₽, %s, %s, %s", amount, category.name, expense_date, description)
         await message.answer(f"✅ Расход {amount} ₽ добавлен! Категория: {category.name}, Дата: {expense_date}")
         await state.clear()
         await message.answer("Выберите следующее действие:", reply_markup=registered_main)
     except Exception as e:
-        logger.error(f"Ошибка при добавлении расхода: {e}")
+        logger.error("Ошибка при добавлении расхода: %s", e)
         await message.answer("❌ Произошла ошибка при добавлении расхода. Попробуйте снова.")
 
 
@@ -240,8 +238,9 @@ async def back_to_main_menu(callback_query: CallbackQuery):
     """
     await callback_query.message.answer("Вы вернулись в главное меню.", reply_markup=registered_main)
     await callback_query.message.delete()
+    await callback_query.answer()
 
-@router.message(lambda message: message.text == "❌ Отмена")
+@text_commands.command("❌ Отмена", state=ExpenseStates)
 async def cancel_expense(message: Message, state: FSMContext):
     """
     Обрабатывает отмену операции. Очищает состояние FSM и возвращает пользователя в главное меню.
@@ -0,0 +1,219 @@
+import html
+import logging
+
+from datetime import datetime
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, CallbackQuery
+
+from models.database import get_db, get_read_db
+from keyboards.keyboards import group_menu, no_group_menu
+from utils.db_operations import get_month_range, get_week_range
+from utils.formatting import escape_markdown_v2, format_category_totals
+from utils.groups import create_group, join_group, leave_group, get_active_group, get_group_totals
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Максимальная длина названия группы
+MAX_GROUP_NAME_LENGTH = 64
+
+
+class GroupStates(StatesGroup):
+    """
+    Класс состояний для работы с общим бюджетом.
+
+    Состояния:
+    - waiting_for_name: Ожидание названия новой группы.
+    - waiting_for_code: Ожидание кода приглашения.
+    """
+    waiting_for_name = State()
+    waiting_for_code = State()
+
+
+@router.message(Command("group"))
+async def show_group_menu(message: Message):
+    """
+    Обработчик команды /group. Показывает активную группу пользователя или предлагает создать ее.
+
+    :param message: Объект сообщения от пользователя.
+    """
+    db = next(get_read_db())
+    group = get_active_group(db, message.from_user.id)
+    if group is None:
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        return
+
+    if group.group_id is None:
+        await message.answer(
+            "👨‍👩‍👧 Общий бюджет позволяет вести учет вместе с семьей или соседями.\n"
+            "Создайте группу или вступите в существующую по коду приглашения.",
+            reply_markup=no_group_menu)
+        return
+
+    await message.answer(
+        f"👨‍👩‍👧 Группа «{html.escape(group.name)}», участников: {group.members}.\n"
+        f"Новые доходы и расходы относятся к этой группе.",
+        reply_markup=group_menu)
+
+
+@router.callback_query(lambda c: c.data == "group_create")
+async def start_create_group(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Запрашивает название новой группы.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    await callback_query.message.answer("Введите название группы (например, «Семья»):")
+    await state.set_state(GroupStates.waiting_for_name)
+    await callback_query.answer()
+
+
+@router.message(GroupStates.waiting_for_name)
+async def process_group_name(message: Message, state: FSMContext):
+    """
+    Создает группу с введенным названием.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    name = (message.text or "").strip()
+    if not name or len(name) > MAX_GROUP_NAME_LENGTH:
+        await message.answer(f"❌ Название должно быть от 1 до {MAX_GROUP_NAME_LENGTH} символов.")
+        return
+
+    db = next(get_db())
+    group = get_active_group(db, message.from_user.id)
+    if group is None:
+        await state.clear()
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        return
+
+    _, invite_code = create_group(db, group.user_id, name)
+    db.commit()
+    await state.clear()
+    await message.answer(
+        f"✅ Группа «{html.escape(name)}» создана. Новые операции будут относиться к ней.\n"
+        f"Код приглашения для участников: {invite_code}\n"
+        f"Его нужно ввести в /group → «Вступить по коду».")
+
+
+@router.callback_query(lambda c: c.data == "group_join")
+async def start_join_group(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Запрашивает код приглашения.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    await callback_query.message.answer("Введите код приглашения:")
+    await state.set_state(GroupStates.waiting_for_code)
+    await callback_query.answer()
+
+
+@router.message(GroupStates.waiting_for_code)
+async def process_invite_code(message: Message, state: FSMContext):
+    """
+    Добавляет пользователя в группу по коду приглашения.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    db = next(get_db())
+    group = get_active_group(db, message.from_user.id)
+    if group is None:
+        await state.clear()
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        return
+
+    joined = join_group(db, group.user_id, message.text or "")
+    if joined is None:
+        await message.answer("❌ Группа с таким кодом не найдена. Проверьте код и попробуйте снова.")
+        return
+    db.commit()
+    await state.clear()
+    await message.answer(
+        f"✅ Вы вступили в группу «{html.escape(joined.name)}». Новые операции будут относиться к ней.")
+
+
+@router.callback_query(lambda c: c.data == "group_invite")
+async def show_invite_code(callback_query: CallbackQuery):
+    """
+    Показывает код приглашения активной группы.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    db = next(get_read_db())
+    group = get_active_group(db, callback_query.from_user.id)
+    if group is None or group.group_id is None:
+        await callback_query.answer("❌ Вы не состоите в группе.")
+        return
+    await callback_query.message.answer(
+        f"🔗 Код приглашения в группу «{html.escape(group.name)}»: {group.invite_code}")
+    await callback_query.answer()
+
+
+@router.callback_query(lambda c: c.data == "group_leave")
+async def process_leave_group(callback_query: CallbackQuery):
+    """
+    Исключает пользователя из активной группы.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    db = next(get_db())
+    group = get_active_group(db, callback_query.from_user.id)
+    if group is None or group.group_id is None:
+        await callback_query.answer("❌ Вы не состоите в группе.")
+        return
+    leave_group(db, group.user_id, group.group_id)
+    db.commit()
+    await callback_query.message.edit_text(
+        f"🚪 Вы вышли из группы «{html.escape(group.name)}». Новые операции снова личные.")
+    await callback_query.answer()
+
+
+@router.callback_query(lambda c: c.data.startswith("group_stats_"), flags={"throttling": "stats"})
+async def show_group_stats(callback_query: CallbackQuery):
+    """
+    Показывает доходы и расходы группы за месяц или неделю по категориям и по участникам.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    period = callback_query.data.removeprefix("group_stats_")
+    today = datetime.today().date()
+    if period == "month":
+        start_date, end_date = get_month_range(today)
+        title = "за месяц"
+    else:
+        start_date, end_date = get_week_range(today)
+        title = "за неделю"
+
+    try:
+        with next(get_read_db()) as db:
+            group = get_active_group(db, callback_query.from_user.id)
+            if group is None or group.group_id is None:
+                await callback_query.answer("❌ Вы не состоите в группе.")
+                return
+            totals = get_group_totals(db, group.group_id, start_date, end_date)
+    except Exception as e:
+        logger.error("Ошибка при получении статистики группы для пользователя %s: %s",
+                     callback_query.from_user.id, e, exc_info=True)
+        await callback_query.message.answer("❌ Произошла ошибка при обработке запроса.")
+        return
+
+    period_text = f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
+    message = f"👨‍👩‍👧 \\*{escape_markdown_v2(group.name)}\\*\n\n"
+    for kind, label, icon in (("income", "Доходы", "💰"), ("expense", "Расходы", "💸")):
+        kind_totals = totals[kind]
+        message += format_category_totals(
+            f"{label} {title}", period_text, icon, kind_totals["total"], kind_totals["categories"])
+        for user_id, amount in kind_totals["members"].items():
+            message += f"👤 {escape_markdown_v2(totals['names'][user_id])}: {escape_markdown_v2(str(amount))}₽\n"
+        message += "\n"
+
+    await callback_query.message.answer(message, parse_mode="MarkdownV2")
+    await callback_query.answer()
@@ -1,7 +1,6 @@
 import logging
 import calendar
 
-from decimal import Decimal
 from aiogram.fsm.state import State, StatesGroup
 from datetime import datetime
 from aiogram import Router
@@ -9,11 +8,12 @@ from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, C
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.orm import Session
 
+from filters.text_commands import text_commands
 from models.database import get_db
-from models.income import Income
 from models.categories import IncomeCategory
 from models.user import User
 from keyboards.keyboards import registered_main, get_income_categories_keyboard, transaction_menu
+from utils.transactions import record_transaction
 
 logger = logging.getLogger(__name__)
 
@@ -63,7 +63,7 @@ def get_days_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 # ✅ 1. Начинаем процесс добавления дохода
-@router.message(lambda message: message.text == "Добавить доход")
+@text_commands.command("Добавить доход")
 async def start_add_income(message: Message, state: FSMContext):
     """
     Начинает процесс добавления дохода. Переводит пользователя в состояние ожидания ввода суммы.
@@ -103,12 +103,12 @@ async def process_income_category_callback(callback_query: CallbackQuery, state:
         db = next(get_db())  # Получаем сессию базы данных
         category_id = int(callback_query.data.split('_')[1])  # Извлекаем ID категории
         
-        logger.info(f"Выбранный ID категории дохода: {category_id}")
+        logger.info("Выбранный ID категории дохода: %s", category_id)
         
         category = db.query(IncomeCategory).filter(IncomeCategory.id == category_id).first()
 
         if not category:
-            logger.error(f"Категория с ID {category_id} не найдена.")
+            logger.error("Категория с ID %s не найдена.", category_id)
             await callback_query.message.answer("❌ Такая категория в доходах не найдена. Попробуйте снова.")
             return
 
@@ -120,15 +120,16 @@ async def process_income_category_callback(callback_query: CallbackQuery, state:
 
         # Сохраняем категорию в состояние
         await state.update_data(category=category.name)
-        await callback_query.message.answer(f"Вы выбрали категорию расхода: {category.name}")
-        # Предлагаем выбрать день
-        await callback_query.message.answer("Выберите день месяца или введите его вручную:", reply_markup=get_days_keyboard())
+        # Подтверждаем выбор и предлагаем выбрать день одним сообщением
+        await callback_query.message.answer(
+            f"Вы выбрали категорию дохода: {category.name}\nВыберите день месяца или введите его вручную:",
+            reply_markup=get_days_keyboard())
         await state.set_state(IncomeStates.waiting_for_date)
 
         # Удаляем сообщение о клавиатуре
         await callback_query.message.delete()
     except Exception as e:
-        logger.error(f"Ошибка при выборе категории: {e}")
+        logger.error("Ошибка при выборе категории: %s", e)
         await callback_query.message.answer("❌ Произошла ошибка. Попробуйте снова.")
 
 # ✅ 4. Обработка выбора дня через inline клавиатуру
@@ -148,14 +149,11 @@ async def process_day_callback(callback_query: CallbackQuery, state: FSMContext)
         # Удаляем клавиатуру с датами
         await callback_query.message.edit_reply_markup(reply_markup=None)
 
-        # Подтверждение выбора дня
-        await callback_query.message.answer(f"Вы выбрали {day} число.")
-
-        # Переходим к вводу описания
-        await callback_query.message.answer("Введите описание дохода (например, 'Зарплата за январь'):")
+        # Подтверждаем выбор дня и переходим к вводу описания
+        await callback_query.message.answer(f"Вы выбрали {day} число.\nВведите описание дохода (например, 'Зарплата за январь'):")
         await state.set_state(IncomeStates.waiting_for_description)
     except Exception as e:
-        logger.error(f"Ошибка при выборе дня: {e}")
+        logger.error("Ошибка при выборе дня: %s", e)
         await callback_query.message.answer("❌ Произошла ошибка. Попробуйте снова.")
 
 # ✅ 5. Ввод даты вручную
@@ -203,7 +201,7 @@ async def process_income_description(message: Message, state: FSMContext):
         db = next(get_db())
         category = db.query(IncomeCategory).filter(IncomeCategory.name == category_name).first()
         if not category:
-            logger.error(f"Категория с именем {category_name} не найдена.")
+            logger.error("Категория с именем %s не найдена.", category_name)
             await message.answer("❌ Ошибка. Категория не найдена.")
             return
 
@@ -213,20 +211,11 @@ async def process_income_description(message: Message, state: FSMContext):
             await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
             return
 
-        # Создаём запись в таблице доходов
-        new_income = Income(
-            user_id=user.id,
-            category_id=category.id,
-            amount=amount,
-            date=income_date,
-            description=description
-        )
-
-        db.add(new_income)
-        user.balance += Decimal(amount)
+        # Создаём запись в таблице доходов и обновляем баланс
+        record_transaction(db, user.id, "income", category.id, amount, income_date, description, user.active_group_id)
         db.commit()
 
-        logger.info(f"Добавлен доход: {amount} ₽, {category.name}, {income_date}, {description}")
+        logger.info("Добавлен доход: %s ₽, %s, %s, %s", amount, category.name, income_date, description)
         await message.answer(f"✅ Доход {amount} ₽ добавлен в категорию {category.name}! Дата: {income_date}, Описание: {description}")
 
         # Очищаем состояние FSM
@@ -235,7 +224,7 @@ async def process_income_description(message: Message, state: FSMContext):
         # Отправляем клавиатуру с основным меню
         await message.answer("Вы успешно добавили доход! Выберите следующее действие:", reply_markup=registered_main)
     except Exception as e:
-        logger.error(f"Ошибка при добавлении дохода: {e}")
+        logger.error("Ошибка при добавлении дохода: %s", e)
         await message.answer("❌ Произошла ошибка при добавлении дохода. Попробуйте снова.")
 
 # Обработчик для кнопки "Назад" (если нужно реализовать логику возврата)
@@ -244,9 +233,10 @@ async def back_to_main_menu(callback_query: CallbackQuery):
     """Обрабатывает нажатие кнопки "Назад". Возвращает пользователя в главное меню."""
     await callback_query.message.answer("Вы вернулись в главное меню.", reply_markup=registered_main)
     await callback_query.message.delete()
+    await callback_query.answer()
 
 
-@router.message(lambda message: message.text == "❌ Отмена")
+@text_commands.command("❌ Отмена")
 async def cancel_expense(message: Message, state: FSMContext):
     """
     Обрабатывает отмену операции. Очищает состояние FSM и возвращает пользователя в главное меню.
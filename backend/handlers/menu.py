@@ -6,7 +6,8 @@ from aiogram.types import Message
 from aiogram import Bot
 from aiogram.fsm.context import FSMContext
 
-from models.database import get_db
+from filters.text_commands import text_commands
+from models.database import get_db, get_read_db
 from models.user import User
 from keyboards.keyboards import main, registered_main, transaction_menu
 from handlers.register import RegistrationStates
@@ -14,7 +15,7 @@ from handlers.register import RegistrationStates
 
 router = Router()
 
-@router.message(lambda message: message.text == "О нас")  # Используем lambda-фильтр для проверки текста
+@text_commands.command("О нас", flags={"throttling": "menu"})
 async def about_handler(message: Message):
     """Обработчик кнопки 'О нас' с логированием ошибок"""
     try:
@@ -33,12 +34,12 @@ async def about_handler(message: Message):
         await message.answer(text, parse_mode="Markdown")
     
     except Exception as e:
-        logging.error(f"Ошибка в about_handler: {str(e)}", exc_info=True)  
+        logging.error("Ошибка в about_handler: %s", e, exc_info=True)  
         await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
 
 
 # Обработчик нажатия на кнопку "Регистрация"
-@router.message(lambda message: message.text == "Регистрация")  # Фильтр для кнопки
+@text_commands.command("Регистрация")  # Фильтр для кнопки
 async def start_register(message: Message, state: FSMContext, bot: Bot):
     """Обработчик кнопки Регистрации """
     db = next(get_db())
@@ -55,10 +56,10 @@ async def start_register(message: Message, state: FSMContext, bot: Bot):
         await state.set_state(RegistrationStates.waiting_for_name)
 
 
-@router.message(lambda message: message.text == "Профиль")
+@text_commands.command("Профиль")
 async def profile_handler(message: Message, bot: Bot):
     """Обработчик кнопки Профиль """
-    db = next(get_db())
+    db = next(get_read_db())
 
     # Проверяем, зарегистрирован ли пользователь
     user = db.query(User).filter(User.tg_id == message.from_user.id).first()
@@ -87,7 +88,7 @@ async def profile_handler(message: Message, bot: Bot):
             reply_markup=main
         )
 
-@router.message(lambda message: message.text == "Добавить транзакцию")
+@text_commands.command("Добавить транзакцию", flags={"throttling": "menu"})
 async def add_transaction_handler(message: Message, bot: Bot):
     """Обработчик нажатия на 'Добавить транзакцию'"""
     text = "Выберите тип транзакции:"
@@ -98,7 +99,7 @@ async def add_transaction_handler(message: Message, bot: Bot):
     )
 
 # Обработчик кнопки "⬅ Назад"
-@router.message(lambda message: message.text == "⬅ Назад")
+@text_commands.command("⬅ Назад", flags={"throttling": "menu"})
 async def back_to_main_menu(message: Message, bot: Bot):
     """Возвращает пользователя в главное меню"""
     await bot.send_message(
@@ -1,21 +1,31 @@
-import re
 import logging
+import re
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from aiogram import Router
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, InlineKeyboardMarkup, CallbackQuery
 from tabulate import tabulate
 
+from filters.text_commands import text_commands
 from utils.db_operations import get_daily_income, get_weekly_income, get_monthly_income, get_income_in_date_range
 from utils.db_operations import get_daily_expenses, get_weekly_expenses, get_monthly_expenses, get_expenses_in_date_range
-from models.database import get_db
-from models.user import User
+from utils.db_operations import get_month_range, get_week_range, get_user_id
+from utils.formatting import escape_markdown_v2, format_category_totals, format_forecast
+from utils.forecast import forecast_month
+from models.database import get_read_db
+from utils.context_store import ContextStore
+from keyboards.keyboards import stats_menu, income_stats_menu, expenses_stats_menu
 
 logger = logging.getLogger(__name__)
 
 router = Router()
-# Глобальный словарь для хранения контекста (доходы или расходы)
-user_context = {}
+# Текст корневого меню статистики
+STATS_MENU_TEXT = "Выберите, что вы хотите посмотреть:"
+# Диапазон дат для фильтра статистики: "ДД.ММ.ГГГГ ДД.ММ.ГГГГ"
+DATE_RANGE_RE = re.compile(r"\s*\d{1,2}\.\d{1,2}\.\d{4}\s+\d{1,2}\.\d{1,2}\.\d{4}\s*")
+# Что пользователь фильтрует по датам (доходы или расходы); контекст живет 10 минут
+user_context = ContextStore("date_filter", ttl=600)
 
 # Функция для получения пользователя
 def get_user_from_db(db, tg_id):
@@ -24,82 +34,78 @@ def get_user_from_db(db, tg_id):
 
     :param db: Сессия базы данных.
     :param tg_id: Telegram ID пользователя.
-    :return: Объект пользователя или None, если пользователь не найден.
+    :return: Строка с атрибутом id или None, если пользователь не найден.
     """
-    return db.query(User).filter(User.tg_id == tg_id).first()
+    return get_user_id(db, tg_id)
 
 
-# Функция для экранирования MarkdownV2
-def escape_markdown_v2(text: str) -> str:
-    """Escapes special characters for proper rendering in MarkdownV2."""
-    # Список символов, которые нужно экранировать
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
+async def edit_menu(callback_query: CallbackQuery, text: str, reply_markup: InlineKeyboardMarkup):
+    """
+    Показывает меню в том же сообщении вместо отправки нового.
+
+    Повторное нажатие той же кнопки (сообщение не изменилось) не считается ошибкой.
 
-    # Экранируем все специальные символы
-    text = re.sub(r'([{}])'.format(re.escape(escape_chars)), r'\\\1', text)
+    :param callback_query: Объект callback-запроса.
+    :param text: Текст меню.
+    :param reply_markup: Клавиатура меню.
+    """
+    try:
+        await callback_query.message.edit_text(text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+    finally:
+        await callback_query.answer()
 
-    return text
 
 # Обработчик кнопки "Статистика"
-@router.message(lambda message: message.text == "Статистика")
+@text_commands.command("Статистика", flags={"throttling": "menu"})
 async def show_statistics_menu(message: Message):
     """
     Обработчик команды "Статистика". Показывает меню выбора статистики (доходы или расходы).
     """
-    stats_inline_keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="📊 Статистика по доходам", callback_data="income_stats")],
-            [InlineKeyboardButton(text="💸 Статистика по расходам", callback_data="expenses_stats")],
-            [InlineKeyboardButton(text="⬅ Назад", callback_data="back")]
-        ]
-    )
-    await message.answer("Выберите, что вы хотите посмотреть:", reply_markup=stats_inline_keyboard)
+    await message.answer(STATS_MENU_TEXT, reply_markup=stats_menu)
+
+
+# Обработчик кнопки "⬅ Назад" в подменю статистики
+@router.callback_query(lambda c: c.data == "stats_menu", flags={"throttling": "menu"})
+async def back_to_statistics_menu(callback_query: CallbackQuery):
+    """
+    Возвращает сообщение с подменю статистики к выбору доходов или расходов.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    await edit_menu(callback_query, STATS_MENU_TEXT, stats_menu)
+
 
 # Обработчик для кнопки "Статистика по доходам"
-@router.callback_query(lambda c: c.data == "income_stats")
+@router.callback_query(lambda c: c.data == "income_stats", flags={"throttling": "menu"})
 async def show_income_stats_menu(callback_query: CallbackQuery):
     """
     Обработчик кнопки "Статистика по доходам". Показывает меню выбора статистики по доходам.
 
     :param callback_query: Объект callback-запроса.
     """
-    income_stats_inline_keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="💰 Доходы за день", callback_data="daily_income")],
-            [InlineKeyboardButton(text="📅 Доходы за неделю", callback_data="weekly_income")],
-            [InlineKeyboardButton(text="📆 Доходы за месяц", callback_data="monthly_income")],
-            [InlineKeyboardButton(text="🔎 Фильтр по датам (с и по)", callback_data="date_filter_income")],
-            [InlineKeyboardButton(text="⬅ Назад", callback_data="back")]
-        ]
-    )
-    await callback_query.message.answer("Выберите, что вы хотите посмотреть по доходам:", reply_markup=income_stats_inline_keyboard)
+    await edit_menu(callback_query, "Выберите, что вы хотите посмотреть по доходам:", income_stats_menu)
 
 # Обработчик для кнопки "Статистика по расходам"
-@router.callback_query(lambda c: c.data == "expenses_stats")
+@router.callback_query(lambda c: c.data == "expenses_stats", flags={"throttling": "menu"})
 async def show_expenses_stats_menu(callback_query: CallbackQuery):
     """
     Обработчик кнопки "Статистика по расходам". Показывает меню выбора статистики по расходам.
 
     :param callback_query: Объект callback-запроса.
     """
-    expenses_stats_inline_keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="💸 Расходы за день", callback_data="daily_expenses")],
-            [InlineKeyboardButton(text="📅 Расходы за неделю", callback_data="weekly_expenses")],
-            [InlineKeyboardButton(text="📆 Расходы за месяц", callback_data="monthly_expenses")],
-            [InlineKeyboardButton(text="🔎 Фильтр по датам (с и по)", callback_data="date_filter_expenses")],
-            [InlineKeyboardButton(text="⬅ Назад", callback_data="back")]
-        ]
-    )
-    await callback_query.message.answer("Выберите, что вы хотите посмотреть по расходам:", reply_markup=expenses_stats_inline_keyboard)
-
-
-@router.callback_query(lambda c: c.data == "daily_income")
+    await edit_menu(callback_query, "Выберите, что вы хотите посмотреть по расходам:", expenses_stats_menu)
+
+
+@router.callback_query(lambda c: c.data == "daily_income", flags={"throttling": "stats"})
 async def show_daily_income(callback_query: CallbackQuery):
     """Обработчик кнопки "Доходы за день". Показывает доходы за текущий день по категориям и деталям."""
+    await callback_query.answer()
     try:
         # Получаем данные из базы данных
-        with next(get_db()) as db:
+        with next(get_read_db()) as db:
             user = get_user_from_db(db, callback_query.from_user.id)
 
             if not user:
@@ -116,11 +122,7 @@ async def show_daily_income(callback_query: CallbackQuery):
                 return
 
             # Формируем сообщение с общими доходами
-            income_message = f"📅 \\*Доходы за день\\* \\({escape_markdown_v2(today.strftime('%d.%m.%Y'))}\\):\n💰 {escape_markdown_v2(str(total_income))}₽\n\n"
-
-            # Формируем список доходов по категориям
-            for category, amount in category_incomes.items():
-                income_message += f'📌 \\*{escape_markdown_v2(category)}\\*: {escape_markdown_v2(str(amount))}₽\n'
+            income_message = format_category_totals("Доходы за день", today.strftime('%d.%m.%Y'), "💰", total_income, category_incomes)
 
             # Формируем таблицу с детальной информацией
             if detailed_incomes:
@@ -141,24 +143,23 @@ async def show_daily_income(callback_query: CallbackQuery):
             await callback_query.message.answer(income_message, parse_mode="MarkdownV2")
             
     except Exception as e:
-        logger.error(f"Ошибка при обработке доходов за день для пользователя {callback_query.from_user.id}: {e}", exc_info=True)
+        logger.error("Ошибка при обработке доходов за день для пользователя %s: %s", callback_query.from_user.id, e, exc_info=True)
         await callback_query.message.answer("❌ Произошла ошибка при обработке запроса.")
 
 
 # Обработчик для вывода статистики за неделю для доходов
-@router.callback_query(lambda c: c.data == "weekly_income")
+@router.callback_query(lambda c: c.data == "weekly_income", flags={"throttling": "stats"})
 async def show_weekly_income(callback_query: CallbackQuery):
     """Обработчик кнопки "Доходы за неделю". Показывает доходы за текущую неделю по категориям и деталям."""
+    await callback_query.answer()
     try:
-        with next(get_db()) as db:
+        with next(get_read_db()) as db:
             user = get_user_from_db(db, callback_query.from_user.id)
             if not user:
                 await callback_query.message.answer("❌ Пользователь не найден.")
                 return
 
-            today = datetime.today().date()
-            start_of_week = today - timedelta(days=today.weekday())
-            end_of_week = start_of_week + timedelta(days=6)
+            start_of_week, end_of_week = get_week_range(datetime.today().date())
 
             total_income, category_incomes, detailed_incomes = get_weekly_income(user.id, db)
 
@@ -167,11 +168,7 @@ async def show_weekly_income(callback_query: CallbackQuery):
                 return
 
             # Заголовок с общей суммой (экранируем для MarkdownV2)
-            income_message = f"📅 \\*Доходы за неделю\\* \\({escape_markdown_v2(start_of_week.strftime('%d.%m.%Y'))} \\- {escape_markdown_v2(end_of_week.strftime('%d.%m.%Y'))}\\):\n💰 {escape_markdown_v2(str(total_income))}₽\n\n"
-            
-            # Список категорий с общей суммой (экранируем для MarkdownV2)
-            for category, amount in category_incomes.items():
-                income_message += f'📌 \\*{escape_markdown_v2(category)}\\*: {escape_markdown_v2(str(amount))}₽\n'
+            income_message = format_category_totals("Доходы за неделю", f"{start_of_week.strftime('%d.%m.%Y')} - {end_of_week.strftime('%d.%m.%Y')}", "💰", total_income, category_incomes)
 
             # Формируем таблицу для детальной информации (без экранирования, так как это код)
             if detailed_incomes:
@@ -191,23 +188,22 @@ async def show_weekly_income(callback_query: CallbackQuery):
 
             await callback_query.message.answer(income_message, parse_mode="MarkdownV2")
     except Exception as e:
-        logger.error(f"Ошибка при обработке доходов за неделю для пользователя {callback_query.from_user.id}: {e}")
+        logger.error("Ошибка при обработке доходов за неделю для пользователя %s: %s", callback_query.from_user.id, e)
         await callback_query.message.answer("❌ Произошла ошибка при обработке запроса.")
 
 
-@router.callback_query(lambda c: c.data == "monthly_income")
+@router.callback_query(lambda c: c.data == "monthly_income", flags={"throttling": "stats"})
 async def show_monthly_income(callback_query: CallbackQuery):
     """Обработчик кнопки "Доходы за месяц". Показывает детальную статистику доходов за текущий месяц."""
+    await callback_query.answer()
     try:
-        with next(get_db()) as db:
+        with next(get_read_db()) as db:
             user = get_user_from_db(db, callback_query.from_user.id)
             if not user:
                 await callback_query.message.answer("❌ Пользователь не найден.")
                 return
 
-            today = datetime.today().date()
-            start_of_month = today.replace(day=1)
-            end_of_month = (start_of_month.replace(month=today.month % 12 + 1, day=1) - timedelta(days=1))
+            start_of_month, end_of_month = get_month_range(datetime.today().date())
 
             total_income, category_incomes, detailed_incomes = get_monthly_income(user.id, db)
 
@@ -216,11 +212,7 @@ async def show_monthly_income(callback_query: CallbackQuery):
                 return
 
             # Заголовок с общей суммой (экранируем для MarkdownV2)
-            income_message = f"📆 \\*Доходы за месяц\\* \\({escape_markdown_v2(start_of_month.strftime('%d.%m.%Y'))} \\- {escape_markdown_v2(end_of_month.strftime('%d.%m.%Y'))}\\):\n💰 {escape_markdown_v2(str(total_income))}₽\n\n"
-
-            # Список категорий с общей суммой (экранируем для MarkdownV2)
-            for category, amount in category_incomes.items():
-                income_message += f'📌 \\*{escape_markdown_v2(category)}\\*: {escape_markdown_v2(str(amount))}₽\n'
+            income_message = format_category_totals("Доходы за месяц", f"{start_of_month.strftime('%d.%m.%Y')} - {end_of_month.strftime('%d.%m.%Y')}", "💰", total_income, category_incomes, heading_icon="📆")
 
             # Формируем таблицу для детальной информации (без экранирования, так как это код)
             if detailed_incomes:
@@ -240,16 +232,17 @@ async def show_monthly_income(callback_query: CallbackQuery):
 
             await callback_query.message.answer(income_message, parse_mode="MarkdownV2")
     except Exception as e:
-        logger.error(f"Ошибка при обработке доходов за месяц для пользователя {callback_query.from_user.id}: {e}")
+        logger.error("Ошибка при обработке доходов за месяц для пользователя %s: %s", callback_query.from_user.id, e)
         await callback_query.message.answer("❌ Произошла ошибка при обработке запроса.")
 
 
-@router.callback_query(lambda c: c.data == "daily_expenses")
+@router.callback_query(lambda c: c.data == "daily_expenses", flags={"throttling": "stats"})
 async def show_daily_expenses(callback_query: CallbackQuery):
     """Обработчик кнопки "Расходы за день". Показывает расходы за текущий день по категориям и деталям."""
+    await callback_query.answer()
     try:
         # Получаем данные из базы данных
-        with next(get_db()) as db:
+        with next(get_read_db()) as db:
             user = get_user_from_db(db, callback_query.from_user.id)
 
             if not user:
@@ -266,11 +259,7 @@ async def show_daily_expenses(callback_query: CallbackQuery):
                 return
 
             # Формируем сообщение с общими расходами
-            expense_message = f"📅 \\*Расходы за день\\* \\({escape_markdown_v2(today.strftime('%d.%m.%Y'))}\\):\n💸 {escape_markdown_v2(str(total_expense))}₽\n\n"
-
-            # Формируем список расходов по категориям
-            for category, amount in category_expenses.items():
-                expense_message += f'📌 \\*{escape_markdown_v2(category)}\\*: {escape_markdown_v2(str(amount))}₽\n'
+            expense_message = format_category_totals("Расходы за день", today.strftime('%d.%m.%Y'), "💸", total_expense, category_expenses)
 
             # Формируем таблицу с детальной информацией
             if detailed_expenses:
@@ -291,23 +280,22 @@ async def show_daily_expenses(callback_query: CallbackQuery):
             await callback_query.message.answer(expense_message, parse_mode="MarkdownV2")
             
     except Exception as e:
-        logger.error(f"Ошибка при обработке расходов за день для пользователя {callback_query.from_user.id}: {e}", exc_info=True)
+        logger.error("Ошибка при обработке расходов за день для пользователя %s: %s", callback_query.from_user.id, e, exc_info=True)
         await callback_query.message.answer("❌ Произошла ошибка при обработке запроса.")
 
 
-@router.callback_query(lambda c: c.data == "weekly_expenses")
+@router.callback_query(lambda c: c.data == "weekly_expenses", flags={"throttling": "stats"})
 async def show_weekly_expenses(callback_query: CallbackQuery):
     """Обработчик кнопки "Расходы за неделю". Показывает расходы за текущую неделю по категориям и деталям."""
+    await callback_query.answer()
     try:
-        with next(get_db()) as db:
+        with next(get_read_db()) as db:
             user = get_user_from_db(db, callback_query.from_user.id)
             if not user:
                 await callback_query.message.answer("❌ Пользователь не найден.")
                 return
 
-            today = datetime.today().date()
-            start_of_week = today - timedelta(days=today.weekday())
-            end_of_week = start_of_week + timedelta(days=6)
+            start_of_week, end_of_week = get_week_range(datetime.today().date())
 
             total_expense, category_expenses, detailed_expenses = get_weekly_expenses(user.id, db)
 
@@ -316,11 +304,7 @@ async def show_weekly_expenses(callback_query: CallbackQuery):
                 return
 
             # Заголовок с общей суммой (экранируем для MarkdownV2)
-            expense_message = f"📅 \\*Расходы за неделю\\* \\({escape_markdown_v2(start_of_week.strftime('%d.%m.%Y'))} \\- {escape_markdown_v2(end_of_week.strftime('%d.%m.%Y'))}\\):\n💸 {escape_markdown_v2(str(total_expense))}₽\n\n"
-            
-            # Список категорий с общей суммой (экранируем для MarkdownV2)
-            for category, amount in category_expenses.items():
-                expense_message += f'📌 \\*{escape_markdown_v2(category)}\\*: {escape_markdown_v2(str(amount))}₽\n'
+            expense_message = format_category_totals("Расходы за неделю", f"{start_of_week.strftime('%d.%m.%Y')} - {end_of_week.strftime('%d.%m.%Y')}", "💸", total_expense, category_expenses)
 
             # Формируем таблицу для детальной информации (без экранирования, так как это код)
             if detailed_expenses:
@@ -340,24 +324,23 @@ async def show_weekly_expenses(callback_query: CallbackQuery):
 
             await callback_query.message.answer(expense_message, parse_mode="MarkdownV2")
     except Exception as e:
-        logger.error(f"Ошибка при обработке расходов за неделю для пользователя {callback_query.from_user.id}: {e}")
+        logger.error("Ошибка при обработке расходов за неделю для пользователя %s: %s", callback_query.from_user.id, e)
         await callback_query.message.answer("❌ Произошла ошибка при обработке запроса.")
 
 
 
-@router.callback_query(lambda c: c.data == "monthly_expenses")
+@router.callback_query(lambda c: c.data == "monthly_expenses", flags={"throttling": "stats"})
 async def show_monthly_expenses(callback_query: CallbackQuery):
     """Обработчик кнопки "Расходы за месяц". Показывает детальную статистику расходов за текущий месяц."""
+    await callback_query.answer()
     try:
-        with next(get_db()) as db:
+        with next(get_read_db()) as db:
             user = get_user_from_db(db, callback_query.from_user.id)
             if not user:
                 await callback_query.message.answer("❌ Пользователь не найден.")
                 return
 
-            today = datetime.today().date()
-            start_of_month = today.replace(day=1)
-            end_of_month = (start_of_month.replace(month=today.month % 12 + 1, day=1) - timedelta(days=1))
+            start_of_month, end_of_month = get_month_range(datetime.today().date())
 
             total_expense, category_expenses, detailed_expenses = get_monthly_expenses(user.id, db)
 
@@ -366,11 +349,16 @@ async def show_monthly_expenses(callback_query: CallbackQuery):
                 return
 
             # Заголовок с общей суммой (экранируем для MarkdownV2)
-            expense_message = f"📆 \\*Расходы за месяц\\* \\({escape_markdown_v2(start_of_month.strftime('%d.%m.%Y'))} \\- {escape_markdown_v2(end_of_month.strftime('%d.%m.%Y'))}\\):\n💸 {escape_markdown_v2(str(total_expense))}₽\n\n"
+            expense_message = format_category_totals("Расходы за месяц", f"{start_of_month.strftime('%d.%m.%Y')} - {end_of_month.strftime('%d.%m.%Y')}", "💸", total_expense, category_expenses, heading_icon="📆")
 
-            # Список категорий с общей суммой (экранируем для MarkdownV2)
-            for category, amount in category_expenses.items():
-                expense_message += f'📌 \\*{escape_markdown_v2(category)}\\*: {escape_markdown_v2(str(amount))}₽\n'
+            # Прогноз на конец месяца (если истории трат достаточно)
+            try:
+                forecast = forecast_month(db, user.id, datetime.today().date())
+            except Exception as e:
+                logger.error("Ошибка при прогнозе расходов пользователя %s: %s", callback_query.from_user.id, e)
+                forecast = None
+            if forecast is not None:
+                expense_message += format_forecast(forecast)
 
             # Формируем таблицу для детальной информации (без экранирования, так как это код)
             if detailed_expenses:
@@ -390,39 +378,43 @@ async def show_monthly_expenses(callback_query: CallbackQuery):
 
             await callback_query.message.answer(expense_message, parse_mode="MarkdownV2")
     except Exception as e:
-        logger.error(f"Ошибка при обработке расходов за месяц для пользователя {callback_query.from_user.id}: {e}")
+        logger.error("Ошибка при обработке расходов за месяц для пользователя %s: %s", callback_query.from_user.id, e)
         await callback_query.message.answer("❌ Произошла ошибка при обработке запроса.")
 
 
 # Обработчик для кнопки "Фильтр по датам (с и по)" для расходов
-@router.callback_query(lambda c: c.data == "date_filter_expenses")
+@router.callback_query(lambda c: c.data == "date_filter_expenses", flags={"throttling": "menu"})
 async def ask_for_expenses_date_range(callback_query: CallbackQuery):
     """
     Обработчик кнопки "Фильтр по датам (с и по)" для расходов. Запрашивает у пользователя ввод диапазона дат.
     """
+    await callback_query.answer()
     user_id = callback_query.from_user.id
-    user_context[user_id] = "expenses"  # Сохраняем контекст "расходы"
+    user_context.set(user_id, "expenses")  # Сохраняем контекст "расходы"
     await callback_query.message.answer("Введите диапазон дат для расходов в формате ДД.ММ.ГГГГ ДД.ММ.ГГГГ (например, 01.01.2023 31.01.2023):")
 
 # Обработчик для кнопки "Фильтр по датам (с и по)" для доходов
-@router.callback_query(lambda c: c.data == "date_filter_income")
+@router.callback_query(lambda c: c.data == "date_filter_income", flags={"throttling": "menu"})
 async def ask_for_income_date_range(callback_query: CallbackQuery):
     """
     Обработчик кнопки "Фильтр по датам (с и по)" для доходов. Запрашивает у пользователя ввод диапазона дат.
     """
+    await callback_query.answer()
     user_id = callback_query.from_user.id
-    user_context[user_id] = "income"  # Сохраняем контекст "доходы"
+    user_context.set(user_id, "income")  # Сохраняем контекст "доходы"
     await callback_query.message.answer("Введите диапазон дат для доходов в формате ДД.ММ.ГГГГ ДД.ММ.ГГГГ (например, 01.01.2023 31.01.2023):")
 
 
-@router.message(lambda message: " " in message.text)
+@router.message(lambda message: message.text is not None and DATE_RANGE_RE.fullmatch(message.text),
+                flags={"throttling": "stats"})
 async def handle_date_range(message: Message):
     """
     Обработчик ввода диапазона дат. Выводит статистику по доходам или расходам за указанный период.
     """
     try:
         user_id = message.from_user.id
-        if user_id not in user_context:
+        context = user_context.get(user_id)
+        if context is None:
             await message.answer("❌ Контекст не найден. Пожалуйста, выберите 'Фильтр по датам' снова.")
             return
 
@@ -438,11 +430,11 @@ async def handle_date_range(message: Message):
             await message.answer("❌ Неверный формат даты. Пожалуйста, используйте формат ДД.ММ.ГГГГ ДД.ММ.ГГГГ.")
             return
 
-        db = next(get_db())
+        db = next(get_read_db())
         user = get_user_from_db(db, user_id)
         if user:
             # Проверка контекста (доходы или расходы)
-            if user_context[user_id] == "income":
+            if context == "income":
                 total_income, category_income, detailed_incomes = get_income_in_date_range(user.id, start_date, end_date, db)
                 # Формируем сообщение
                 income_message = f"📆 *Доходы с {escape_markdown_v2(start_date.strftime('%d.%m.%Y'))} по {escape_markdown_v2(end_date.strftime('%d.%m.%Y'))}:*\n💰 {escape_markdown_v2(str(total_income))} ₽\n\n"
@@ -467,7 +459,7 @@ async def handle_date_range(message: Message):
 
                 await message.answer(income_message, parse_mode="MarkdownV2")
 
-            elif user_context[user_id] == "expenses":
+            elif context == "expenses":
                 total_expense, category_expenses, detailed_expenses = get_expenses_in_date_range(user.id, start_date, end_date, db)
                 # Формируем сообщение
                 expense_message = f"📆 *Расходы с {escape_markdown_v2(start_date.strftime('%d.%m.%Y'))} по {escape_markdown_v2(end_date.strftime('%d.%m.%Y'))}:*\n💸 {escape_markdown_v2(str(total_expense))} ₽\n\n"
@@ -496,7 +488,7 @@ async def handle_date_range(message: Message):
             else:
                 await message.answer("❌ Неверный контекст.")
             # Очищаем контекст после обработки
-            del user_context[user_id]
+            user_context.pop(user_id)
         else:
             await message.answer("❌ Пользователь не найден.")
     except ValueError:
@@ -0,0 +1,256 @@
+import html
+import logging
+
+from datetime import date
+from decimal import Decimal
+
+from aiogram import Router, F
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import select
+
+from models.database import get_db
+from models.user import User
+from keyboards.keyboards import registered_main, get_income_categories_keyboard, get_expense_categories_keyboard
+from handlers.income import IncomeStates
+from handlers.expense import ExpenseStates
+from utils.quick_add import QUICK_ADD_RE, parse_quick_add, parse_batch, is_batch, category_catalog
+from utils.transactions import record_transaction, record_transactions
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+KIND_TITLES = {
+    "income": "Доход",
+    "expense": "Расход",
+}
+# Ограничение Telegram на длину текста сообщения
+MAX_MESSAGE_LENGTH = 4096
+
+
+class QuickAddStates(StatesGroup):
+    """
+    Класс состояний быстрого ввода.
+
+    Состояния:
+    - waiting_for_category: Ожидание выбора категории, если по тексту подходит несколько.
+    """
+    waiting_for_category = State()
+
+
+def _candidates_keyboard(candidates) -> InlineKeyboardMarkup:
+    """
+    Создает inline-клавиатуру с подходящими категориями.
+
+    :param candidates: Список (ID, название) категорий.
+    :return: InlineKeyboardMarkup с кнопками категорий и кнопкой "Отмена".
+    """
+    buttons = [[InlineKeyboardButton(text=name, callback_data=f"quick_category_{category_id}")]
+               for category_id, name in candidates]
+    buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="quick_cancel")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def _save(db, user, kind: str, category_id: int, category_name: str, amount: Decimal, entry_date: date,
+          description: str) -> str:
+    """
+    Записывает операцию и возвращает текст подтверждения.
+
+    :return: Текст ответа пользователю.
+    """
+    record_transaction(db, user.id, kind, category_id, amount, entry_date, description, user.active_group_id)
+    db.commit()
+    logger.info("Быстрый ввод (%s): %s ₽, %s, %s, %s", kind, amount, category_name, entry_date, description)
+    return (f"✅ {KIND_TITLES[kind]} {amount} ₽ добавлен! "
+            f"Категория: {category_name}, Дата: {entry_date:%d.%m.%Y}")
+
+
+def _batch_summary(lines) -> str:
+    """
+    Формирует итоговое сообщение пакетного ввода.
+
+    :param lines: Результаты разбора строк (BatchLine).
+    :return: Текст со списком принятых и отклоненных строк.
+    """
+    accepted = [line for line in lines if line.error is None]
+    rejected = [line for line in lines if line.error is not None]
+    parts = [f"📥 Принято: {len(accepted)}, отклонено: {len(rejected)}"]
+    if accepted:
+        parts.append("")
+        parts.extend(
+            f"✅ {line.number}. {'+' if line.entry.kind == 'income' else '-'}{line.entry.amount} ₽, "
+            f"{line.category_name}, {line.entry.date:%d.%m.%Y}"
+            for line in accepted)
+    if rejected:
+        parts.append("")
+        # Текст строки обрезается до экранирования, чтобы не разрезать HTML-сущность
+        parts.extend(f"❌ {line.number}. {html.escape(line.text[:64])} — {html.escape(line.error)}"
+                     for line in rejected)
+    # Лишние строки отбрасываются целиком: обрезка посередине могла бы разрезать сущность
+    truncated = False
+    while len("\n".join(parts)) > MAX_MESSAGE_LENGTH - len("\n…"):
+        parts.pop()
+        truncated = True
+    if truncated:
+        parts.append("…")
+    return "\n".join(parts)
+
+
+@router.message(StateFilter(None), lambda message: is_batch(message.text))
+async def quick_add_batch(message: Message):
+    """
+    Обрабатывает пакетный ввод: несколько строк в формате быстрого ввода в одном сообщении.
+
+    Все корректные строки записываются одной транзакцией, в ответ отправляется
+    одно сообщение со списком принятых и отклоненных строк.
+
+    :param message: Объект сообщения от пользователя.
+    """
+    db = next(get_db())
+    user = db.execute(
+        select(User.id, User.active_group_id).where(User.tg_id == message.from_user.id)
+    ).first()
+    if user is None:
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        return
+
+    try:
+        lines = parse_batch(db, message.text, date.today())
+    except ValueError as e:
+        await message.answer(f"❌ {e}.")
+        return
+
+    rows = [(line.entry.kind, line.category_id, line.entry.amount, line.entry.date, line.description)
+            for line in lines if line.error is None]
+    try:
+        record_transactions(db, user.id, rows, user.active_group_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Ошибка при пакетном вводе: %s", e)
+        await message.answer("❌ Произошла ошибка при добавлении операций. Попробуйте снова.")
+        return
+
+    logger.info("Пакетный ввод: принято %s из %s строк", len(rows), len(lines))
+    await message.answer(_batch_summary(lines), reply_markup=registered_main)
+
+
+@router.message(StateFilter(None), F.text.regexp(QUICK_ADD_RE))
+async def quick_add(message: Message, state: FSMContext):
+    """
+    Обрабатывает сообщение быстрого ввода ("-450 кафе обед вчера", "+50000 зарплата").
+
+    Если категория определена однозначно, операция записывается сразу. При
+    нескольких подходящих категориях предлагается выбрать одну из них, а если
+    категория не найдена — запускается обычный пошаговый ввод.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    try:
+        entry = parse_quick_add(message.text, date.today())
+    except ValueError as e:
+        await message.answer(f"❌ {e}.")
+        return
+    if entry is None:
+        return
+
+    db = next(get_db())
+    user = db.execute(
+        select(User.id, User.active_group_id).where(User.tg_id == message.from_user.id)
+    ).first()
+    if user is None:
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        return
+
+    candidates, size = category_catalog.match(db, entry.kind, entry.words)
+    description = " ".join(entry.words[size:]) or None
+
+    if len(candidates) == 1:
+        category_id, category_name = candidates[0]
+        try:
+            text = _save(db, user, entry.kind, category_id, category_name, entry.amount, entry.date, description)
+        except Exception as e:
+            db.rollback()
+            logger.error("Ошибка при быстром вводе: %s", e)
+            await message.answer("❌ Произошла ошибка при добавлении операции. Попробуйте снова.")
+            return
+        await message.answer(text, reply_markup=registered_main)
+        return
+
+    if candidates:
+        await state.set_state(QuickAddStates.waiting_for_category)
+        await state.update_data(kind=entry.kind, amount=str(entry.amount), date=entry.date.isoformat(),
+                                description=description)
+        await message.answer("Уточните категорию:", reply_markup=_candidates_keyboard(candidates))
+        return
+
+    # Категория не найдена — продолжаем обычным вводом с уже известной суммой
+    await state.update_data(amount=float(entry.amount))
+    if entry.kind == "income":
+        await message.answer("Выберите категорию дохода:", reply_markup=get_income_categories_keyboard(db))
+        await state.set_state(IncomeStates.waiting_for_category)
+    else:
+        await message.answer("Выберите категорию расхода:", reply_markup=get_expense_categories_keyboard(db))
+        await state.set_state(ExpenseStates.waiting_for_category)
+
+
+@router.callback_query(QuickAddStates.waiting_for_category, lambda c: c.data.startswith("quick_category_"))
+async def process_quick_category(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Записывает операцию быстрого ввода с выбранной категорией.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    category_data = callback_query.data.split("_")[2]
+    data = await state.get_data()
+    if not category_data.isdigit() or "kind" not in data:
+        logger.error("Некорректные данные быстрого ввода: %s", callback_query.data)
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    db = next(get_db())
+    kind = data["kind"]
+    names = {category_id: name for category_id, name, _ in category_catalog.entries(db, kind)}
+    category_id = int(category_data)
+    if category_id not in names:
+        await callback_query.answer("❌ Категория не найдена. Попробуйте снова.")
+        return
+
+    user = db.execute(
+        select(User.id, User.active_group_id).where(User.tg_id == callback_query.from_user.id)
+    ).first()
+    if user is None:
+        await callback_query.message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        await state.clear()
+        return
+
+    try:
+        text = _save(db, user, kind, category_id, names[category_id], Decimal(data["amount"]),
+                     date.fromisoformat(data["date"]), data.get("description"))
+    except Exception as e:
+        db.rollback()
+        logger.error("Ошибка при быстром вводе: %s", e)
+        await callback_query.answer("❌ Произошла ошибка при добавлении операции.")
+        return
+
+    await state.clear()
+    await callback_query.message.edit_text(text)
+    await callback_query.answer()
+
+
+@router.callback_query(QuickAddStates.waiting_for_category, lambda c: c.data == "quick_cancel")
+async def cancel_quick_add(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Отменяет быстрый ввод.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    await state.clear()
+    await callback_query.message.edit_text("🚫 Операция отменена.")
+    await callback_query.answer()
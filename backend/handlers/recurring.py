@@ -0,0 +1,255 @@
+import html
+import logging
+
+from datetime import datetime
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, CallbackQuery
+
+from models.database import get_db
+from models.categories import IncomeCategory, ExpenseCategory
+from models.recurring import RecurringRule
+from models.user import User
+from keyboards.keyboards import (
+    registered_main, recurring_kind_menu, get_recurring_rules_keyboard,
+    get_income_categories_keyboard, get_expense_categories_keyboard)
+from utils.schedule import parse_schedule, first_run_date
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+SCHEDULE_HELP = (
+    "Введите расписание в формате «день_месяца месяц день_недели», как в cron.\n"
+    "Примеры:\n"
+    "1 * * — каждое 1-е число месяца\n"
+    "10,25 * * — 10-го и 25-го числа\n"
+    "* * 1 — каждый понедельник\n"
+    "@daily, @weekly, @monthly — каждый день, неделю, месяц"
+)
+
+
+class RecurringStates(StatesGroup):
+    """
+    Класс состояний для добавления регулярной операции.
+
+    Состояния:
+    - waiting_for_kind: Ожидание выбора типа операции (доход или расход).
+    - waiting_for_amount: Ожидание ввода суммы.
+    - waiting_for_category: Ожидание выбора категории.
+    - waiting_for_schedule: Ожидание ввода расписания.
+    - waiting_for_description: Ожидание ввода описания.
+    """
+    waiting_for_kind = State()
+    waiting_for_amount = State()
+    waiting_for_category = State()
+    waiting_for_schedule = State()
+    waiting_for_description = State()
+
+
+@router.message(Command("recurring"))
+async def show_recurring_rules(message: Message):
+    """
+    Показывает список регулярных операций пользователя с кнопками удаления и добавления.
+
+    :param message: Объект сообщения от пользователя.
+    """
+    db = next(get_db())
+    user = db.query(User).filter(User.tg_id == message.from_user.id).first()
+    if not user:
+        await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+        return
+
+    rules = db.query(RecurringRule) \
+        .filter(RecurringRule.user_id == user.id, RecurringRule.is_active.is_(True)) \
+        .order_by(RecurringRule.next_run) \
+        .all()
+
+    if rules:
+        lines = [
+            f"{'💰' if rule.kind == 'income' else '💸'} {rule.amount} ₽ — "
+            f"{html.escape(rule.description or 'без описания')}, "
+            f"расписание «{html.escape(rule.schedule)}», следующая дата {rule.next_run.strftime('%d.%m.%Y')}"
+            for rule in rules
+        ]
+        text = "🔁 Ваши регулярные операции:\n\n" + "\n".join(lines)
+    else:
+        text = "🔁 У вас пока нет регулярных операций."
+
+    await message.answer(text, reply_markup=get_recurring_rules_keyboard(rules))
+
+
+@router.callback_query(lambda c: c.data == "recurring_add")
+async def start_add_recurring(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Начинает добавление регулярной операции с выбора ее типа.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    await callback_query.message.answer("Выберите тип регулярной операции:", reply_markup=recurring_kind_menu)
+    await state.set_state(RecurringStates.waiting_for_kind)
+
+
+@router.callback_query(lambda c: c.data.startswith("recurring_kind_"))
+async def process_recurring_kind(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Сохраняет тип регулярной операции и запрашивает сумму.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    kind = callback_query.data.removeprefix("recurring_kind_")
+    await state.update_data(kind=kind)
+    await callback_query.message.answer("Введите сумму операции:")
+    await state.set_state(RecurringStates.waiting_for_amount)
+
+
+@router.message(RecurringStates.waiting_for_amount)
+async def process_recurring_amount(message: Message, state: FSMContext):
+    """
+    Сохраняет сумму регулярной операции и предлагает выбрать категорию.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    try:
+        amount = float(message.text)
+        if amount <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        await message.answer("❌ Ошибка! Введите корректную сумму.")
+        return
+
+    await state.update_data(amount=amount)
+    data = await state.get_data()
+    db = next(get_db())
+    if data.get("kind") == "income":
+        keyboard = get_income_categories_keyboard(db, callback_prefix="recurring_category_")
+    else:
+        keyboard = get_expense_categories_keyboard(db, callback_prefix="recurring_category_")
+    await message.answer("Выберите категорию:", reply_markup=keyboard)
+    await state.set_state(RecurringStates.waiting_for_category)
+
+
+@router.callback_query(lambda c: c.data.startswith("recurring_category_"))
+async def process_recurring_category(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Сохраняет категорию регулярной операции и запрашивает расписание.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    category_data = callback_query.data.removeprefix("recurring_category_")
+    if not category_data.isdigit():
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    data = await state.get_data()
+    model = IncomeCategory if data.get("kind") == "income" else ExpenseCategory
+    db = next(get_db())
+    category = db.query(model).filter(model.id == int(category_data)).first()
+    if not category:
+        await callback_query.answer("❌ Категория не найдена. Попробуйте снова.")
+        return
+
+    await state.update_data(category_id=category.id)
+    await callback_query.message.edit_reply_markup(reply_markup=None)
+    await callback_query.message.answer(f"Вы выбрали категорию: {category.name}\n\n{SCHEDULE_HELP}")
+    await state.set_state(RecurringStates.waiting_for_schedule)
+
+
+@router.message(RecurringStates.waiting_for_schedule)
+async def process_recurring_schedule(message: Message, state: FSMContext):
+    """
+    Проверяет и сохраняет расписание регулярной операции, запрашивает описание.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    schedule = (message.text or "").strip()
+    try:
+        parse_schedule(schedule)
+        next_run = first_run_date(schedule, datetime.today().date())
+    except ValueError as e:
+        await message.answer(f"❌ Некорректное расписание: {html.escape(str(e))}\n\n{SCHEDULE_HELP}")
+        return
+
+    if next_run is None:
+        await message.answer("❌ По этому расписанию операция никогда не выполнится. Введите другое.")
+        return
+
+    await state.update_data(schedule=schedule, next_run=next_run)
+    await message.answer("Введите описание операции (например, 'Аренда квартиры'):")
+    await state.set_state(RecurringStates.waiting_for_description)
+
+
+@router.message(RecurringStates.waiting_for_description)
+async def process_recurring_description(message: Message, state: FSMContext):
+    """
+    Сохраняет регулярную операцию в базе данных.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    try:
+        data = await state.get_data()
+        db = next(get_db())
+        user = db.query(User).filter(User.tg_id == message.from_user.id).first()
+        if not user:
+            await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+            await state.clear()
+            return
+
+        rule = RecurringRule(
+            user_id=user.id,
+            kind=data["kind"],
+            category_id=data["category_id"],
+            amount=data["amount"],
+            description=message.text,
+            schedule=data["schedule"],
+            next_run=data["next_run"],
+        )
+        db.add(rule)
+        db.commit()
+
+        logger.info("Добавлена регулярная операция %s пользователя %s: %s", rule.id, user.id, rule.schedule)
+        await message.answer(
+            f"✅ Регулярная операция добавлена! Первая дата: {rule.next_run.strftime('%d.%m.%Y')}",
+            reply_markup=registered_main)
+    except Exception as e:
+        logger.error("Ошибка при добавлении регулярной операции: %s", e)
+        await message.answer("❌ Произошла ошибка при добавлении регулярной операции. Попробуйте снова.")
+    finally:
+        await state.clear()
+
+
+@router.callback_query(lambda c: c.data.startswith("recurring_delete_"))
+async def delete_recurring_rule(callback_query: CallbackQuery):
+    """
+    Отключает регулярную операцию пользователя.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    rule_data = callback_query.data.removeprefix("recurring_delete_")
+    if not rule_data.isdigit():
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    db = next(get_db())
+    user = db.query(User).filter(User.tg_id == callback_query.from_user.id).first()
+    rule = None
+    if user:
+        rule = db.query(RecurringRule) \
+            .filter(RecurringRule.id == int(rule_data), RecurringRule.user_id == user.id) \
+            .first()
+    if not rule:
+        await callback_query.answer("❌ Регулярная операция не найдена.")
+        return
+
+    rule.is_active = False
+    db.commit()
+    await callback_query.answer("🗑 Регулярная операция удалена.")
+    await callback_query.message.edit_reply_markup(reply_markup=None)
@@ -44,11 +44,13 @@ async def help_handler(message: Message) -> None:
             "/register - Регистрация в приложении\n"
             "/contact - Наши контактные данные\n"
             "/profile - Ваш профиль - имя и номер телефона\n\n"
+            "Быстрый ввод одним сообщением: «-450 кафе обед вчера» или «+50000 зарплата»\n"
+            "Несколько операций можно отправить одним сообщением, по одной на строку\n\n"
         )
         await message.answer(help_text, reply_markup=kb)
 
     except Exception as e:
-        logging.error(f"Ошибка в help_handler: {str(e)}", exc_info=True)
+        logging.error("Ошибка в help_handler: %s", e, exc_info=True)
         await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
 
 
@@ -67,7 +69,7 @@ async def contact_handler(message: Message) -> None:
         await message.answer(contact_text, reply_markup=kb)
 
     except Exception as e:
-        logging.error(f"Ошибка в contact_handler: {str(e)}", exc_info=True)
+        logging.error("Ошибка в contact_handler: %s", e, exc_info=True)
         await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
 
 
@@ -77,8 +79,8 @@ async def error_handler(event: AiogramError):
     Глобальный обработчик исключений для всех ошибок.
     """
     # Логируем ошибку
-    logging.error(f"Ошибка: {str(event)}")
+    logging.error("Ошибка: %s", event)
 
     # Если это кастомное исключение, можно добавить дополнительную логику
     if isinstance(event, HomeworkBotError):
-        logging.error(f"Кастомная ошибка: {str(event)}")
+        logging.error("Кастомная ошибка: %s", event)
@@ -0,0 +1,367 @@
+import html
+import logging
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+
+from filters.text_commands import text_commands
+from models.database import get_db, get_read_db
+from keyboards.keyboards import registered_main
+from utils.context_store import ContextStore
+from utils.db_operations import get_user_id
+from utils.transactions import (
+    list_transactions, get_transaction, update_transaction, delete_transaction, restore_transaction,
+)
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Сколько операций показывать на одной странице
+PAGE_SIZE = 10
+# Сколько кнопок операций в одном ряду клавиатуры
+BUTTONS_PER_ROW = 5
+# Сколько секунд после удаления операцию можно восстановить
+UNDO_SECONDS = 60
+# Тип операции <-> код в callback_data (длина callback_data ограничена 64 байтами)
+KIND_CODES = {
+    "income": "i",
+    "expense": "e",
+}
+CODE_KINDS = {code: kind for kind, code in KIND_CODES.items()}
+SIGNS = {
+    "income": "+",
+    "expense": "−",
+}
+# Удаленные операции, которые еще можно восстановить: tg_id -> (тип, строка)
+undo_buffer = ContextStore("undo", ttl=UNDO_SECONDS)
+
+
+class TransactionStates(StatesGroup):
+    """
+    Класс состояний для изменения операции.
+
+    Состояния:
+    - waiting_for_amount: Ожидание новой суммы.
+    - waiting_for_description: Ожидание нового описания.
+    """
+    waiting_for_amount = State()
+    waiting_for_description = State()
+
+
+def _parse_ref(data: str, prefix: str):
+    """
+    Разбирает callback_data вида "<prefix><код типа>_<ID>".
+
+    :return: Кортеж (тип, ID) или None, если данные некорректны.
+    """
+    code, _, transaction_id = data.removeprefix(prefix).partition("_")
+    if code not in CODE_KINDS or not transaction_id.isdigit():
+        return None
+    return CODE_KINDS[code], int(transaction_id)
+
+
+def _parse_cursor(data: str):
+    """
+    Разбирает курсор страницы из callback_data "txlist_<ГГГГММДД>_<код типа>_<ID>".
+
+    :return: Кортеж (дата, тип, ID) или None для первой страницы.
+    :raises ValueError: Если курсор некорректен.
+    """
+    value = data.removeprefix("txlist_")
+    if value == "0":
+        return None
+    day, code, transaction_id = value.split("_")
+    return datetime.strptime(day, "%Y%m%d").date(), CODE_KINDS[code], int(transaction_id)
+
+
+def _format_row(row) -> str:
+    """Строка операции для списка и карточки операции."""
+    text = f"{row.date:%d.%m.%Y} {SIGNS[row.kind]}{row.amount:.2f} ₽, {html.escape(row.category or '—')}"
+    if row.description:
+        text += f" — {html.escape(row.description)}"
+    return text
+
+
+def _page(rows, has_more: bool, first_page: bool):
+    """
+    Формирует текст и клавиатуру страницы списка операций.
+
+    :return: Кортеж (текст, клавиатура).
+    """
+    if not rows:
+        return "📭 Операций пока нет.", None
+
+    lines = ["📒 Мои операции (новые сначала):", ""]
+    lines.extend(f"{number}. {_format_row(row)}" for number, row in enumerate(rows, 1))
+    lines.extend(["", "Нажмите номер операции, чтобы изменить или удалить ее."])
+
+    buttons = []
+    for start in range(0, len(rows), BUTTONS_PER_ROW):
+        buttons.append([
+            InlineKeyboardButton(text=str(number), callback_data=f"tx_{KIND_CODES[row.kind]}_{row.id}")
+            for number, row in enumerate(rows[start:start + BUTTONS_PER_ROW], start + 1)
+        ])
+    navigation = []
+    if not first_page:
+        navigation.append(InlineKeyboardButton(text="⏮ В начало", callback_data="txlist_0"))
+    if has_more:
+        last = rows[-1]
+        navigation.append(InlineKeyboardButton(
+            text="Дальше ▶", callback_data=f"txlist_{last.date:%Y%m%d}_{KIND_CODES[last.kind]}_{last.id}"))
+    if navigation:
+        buttons.append(navigation)
+    return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def _item_keyboard(kind: str, transaction_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура действий с операцией."""
+    ref = f"{KIND_CODES[kind]}_{transaction_id}"
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="✏️ Сумма", callback_data=f"txamount_{ref}"),
+         InlineKeyboardButton(text="📝 Описание", callback_data=f"txdesc_{ref}")],
+        [InlineKeyboardButton(text="🗑 Удалить", callback_data=f"txdel_{ref}")],
+        [InlineKeyboardButton(text="⬅ К списку", callback_data="txlist_0")],
+    ])
+
+
+# Клавиатура после удаления операции
+undo_keyboard = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="↩️ Отменить удаление", callback_data="txundo")],
+    [InlineKeyboardButton(text="⬅ К списку", callback_data="txlist_0")],
+])
+
+
+async def _edit(callback_query: CallbackQuery, text: str, reply_markup: InlineKeyboardMarkup = None):
+    """Заменяет текст сообщения; повторное нажатие той же кнопки не считается ошибкой."""
+    try:
+        await callback_query.message.edit_text(text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+
+
+@text_commands.command("Мои операции", flags={"throttling": "menu"})
+async def show_transactions(message: Message):
+    """
+    Обработчик кнопки "Мои операции". Показывает первую страницу доходов и расходов.
+
+    :param message: Объект сообщения от пользователя.
+    """
+    with next(get_read_db()) as db:
+        user = get_user_id(db, message.from_user.id)
+        if user is None:
+            await message.answer("❌ Вы не зарегистрированы. Пройдите регистрацию.")
+            return
+        rows, has_more = list_transactions(db, user.id, PAGE_SIZE)
+
+    text, keyboard = _page(rows, has_more, first_page=True)
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(lambda c: c.data.startswith("txlist_"), flags={"throttling": "menu"})
+async def show_transactions_page(callback_query: CallbackQuery):
+    """
+    Показывает страницу списка операций в том же сообщении.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    try:
+        after = _parse_cursor(callback_query.data)
+    except (KeyError, ValueError):
+        logger.error("Некорректный курсор списка операций: %s", callback_query.data)
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    with next(get_read_db()) as db:
+        user = get_user_id(db, callback_query.from_user.id)
+        if user is None:
+            await callback_query.answer("❌ Вы не зарегистрированы.")
+            return
+        rows, has_more = list_transactions(db, user.id, PAGE_SIZE, after)
+
+    text, keyboard = _page(rows, has_more, first_page=after is None)
+    await _edit(callback_query, text, keyboard)
+    await callback_query.answer()
+
+
+@router.callback_query(lambda c: c.data.startswith("tx_"), flags={"throttling": "menu"})
+async def show_transaction(callback_query: CallbackQuery):
+    """
+    Показывает операцию и действия с ней.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    ref = _parse_ref(callback_query.data, "tx_")
+    if ref is None:
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    with next(get_read_db()) as db:
+        user = get_user_id(db, callback_query.from_user.id)
+        row = get_transaction(db, user.id, *ref) if user else None
+    if row is None:
+        await callback_query.answer("❌ Операция не найдена.")
+        return
+
+    await _edit(callback_query, f"🧾 {_format_row(row)}", _item_keyboard(*ref))
+    await callback_query.answer()
+
+
+@router.callback_query(lambda c: c.data.startswith(("txamount_", "txdesc_")))
+async def start_edit_transaction(callback_query: CallbackQuery, state: FSMContext):
+    """
+    Запрашивает новую сумму или новое описание операции.
+
+    :param callback_query: Объект callback-запроса.
+    :param state: Состояние FSM.
+    """
+    prefix, _, _ = callback_query.data.partition("_")
+    ref = _parse_ref(callback_query.data, f"{prefix}_")
+    if ref is None:
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    await state.update_data(kind=ref[0], transaction_id=ref[1])
+    if prefix == "txamount":
+        await state.set_state(TransactionStates.waiting_for_amount)
+        await callback_query.message.answer("Введите новую сумму:")
+    else:
+        await state.set_state(TransactionStates.waiting_for_description)
+        await callback_query.message.answer("Введите новое описание:")
+    await callback_query.answer()
+
+
+async def _save_edit(message: Message, state: FSMContext, **values):
+    """
+    Сохраняет изменение операции из состояния FSM и показывает результат.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    :param values: Новые значения (amount и/или description).
+    """
+    data = await state.get_data()
+    await state.clear()
+    db = next(get_db())
+    try:
+        user = get_user_id(db, message.from_user.id)
+        row = update_transaction(db, user.id, data["kind"], data["transaction_id"], **values) if user else None
+        if row is None:
+            db.rollback()
+            await message.answer("❌ Операция не найдена.", reply_markup=registered_main)
+            return
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Ошибка при изменении операции: %s", e)
+        await message.answer("❌ Произошла ошибка при изменении операции. Попробуйте снова.")
+        return
+    finally:
+        db.close()
+
+    await message.answer(f"✅ Операция изменена:\n{_format_row(row)}",
+                         reply_markup=_item_keyboard(row.kind, row.id))
+
+
+@router.message(TransactionStates.waiting_for_amount)
+async def process_new_amount(message: Message, state: FSMContext):
+    """
+    Обрабатывает ввод новой суммы операции.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    try:
+        amount = Decimal((message.text or "").replace(",", ".").strip())
+    except InvalidOperation:
+        await message.answer("❌ Ошибка! Введите корректную сумму.")
+        return
+    if not amount.is_finite() or amount <= 0:
+        await message.answer("❌ Сумма должна быть больше нуля.")
+        return
+    await _save_edit(message, state, amount=amount.quantize(Decimal("0.01")))
+
+
+@router.message(TransactionStates.waiting_for_description)
+async def process_new_description(message: Message, state: FSMContext):
+    """
+    Обрабатывает ввод нового описания операции.
+
+    :param message: Объект сообщения от пользователя.
+    :param state: Состояние FSM.
+    """
+    description = (message.text or "").strip()
+    if not description:
+        await message.answer("❌ Описание не может быть пустым.")
+        return
+    await _save_edit(message, state, description=description)
+
+
+@router.callback_query(lambda c: c.data.startswith("txdel_"))
+async def process_delete_transaction(callback_query: CallbackQuery):
+    """
+    Удаляет операцию и предлагает отменить удаление в течение UNDO_SECONDS секунд.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    ref = _parse_ref(callback_query.data, "txdel_")
+    if ref is None:
+        await callback_query.answer("❌ Ошибка! Попробуйте снова.")
+        return
+
+    db = next(get_db())
+    try:
+        user = get_user_id(db, callback_query.from_user.id)
+        row = delete_transaction(db, user.id, *ref) if user else None
+        if row is None:
+            await callback_query.answer("❌ Операция не найдена.")
+            return
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Ошибка при удалении операции: %s", e)
+        await callback_query.answer("❌ Произошла ошибка при удалении операции.")
+        return
+    finally:
+        db.close()
+
+    undo_buffer.set(callback_query.from_user.id, (ref[0], row))
+    await _edit(callback_query, f"🗑 Операция удалена. Отменить можно в течение {UNDO_SECONDS} секунд.",
+                undo_keyboard)
+    await callback_query.answer()
+
+
+@router.callback_query(lambda c: c.data == "txundo")
+async def process_undo_delete(callback_query: CallbackQuery):
+    """
+    Восстанавливает последнюю удаленную операцию, если срок отмены не истек.
+
+    :param callback_query: Объект callback-запроса.
+    """
+    entry = undo_buffer.pop(callback_query.from_user.id, None)
+    if entry is None:
+        await callback_query.answer("⌛ Время для отмены истекло.")
+        await callback_query.message.edit_reply_markup(reply_markup=None)
+        return
+
+    kind, row = entry
+    db = next(get_db())
+    try:
+        restore_transaction(db, kind, row)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Ошибка при восстановлении операции: %s", e)
+        await callback_query.answer("❌ Не удалось восстановить операцию.")
+        return
+    finally:
+        db.close()
+
+    await _edit(callback_query, "↩️ Операция восстановлена.", _item_keyboard(kind, row["id"]))
+    await callback_query.answer()
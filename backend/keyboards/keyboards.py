@@ -1,6 +1,7 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from sqlalchemy.orm import Session
-from models.categories import IncomeCategory, ExpenseCategory
+from sqlalchemy import select, exists
+from sqlalchemy.orm import Session, aliased
+from utils.categories import CATEGORY_KINDS
 
 
 # Основная клавиатура для неавторизованных пользователей
@@ -19,6 +20,7 @@ registered_main = ReplyKeyboardMarkup(
         [KeyboardButton(text='Профиль')],
         [KeyboardButton(text='Статистика')],
         [KeyboardButton(text='Добавить транзакцию')],
+        [KeyboardButton(text='Мои операции')],
         [KeyboardButton(text='О нас')],
     ],
     resize_keyboard=True
@@ -34,33 +36,154 @@ transaction_menu = ReplyKeyboardMarkup(
     resize_keyboard=True
 )
 
-def get_income_categories_keyboard(db: Session):
+def get_categories_keyboard(db: Session, kind: str, callback_prefix: str, parent_id: int = None):
     """
-    Создает клавиатуру с категориями доходов.
+    Создает клавиатуру с одним уровнем дерева категорий.
+
+    Категория без подкатегорий выбирается сразу (callback_data
+    "<callback_prefix><id>"). Категория с подкатегориями открывает следующий
+    уровень (callback_data "catnav_<kind>_<id>_<callback_prefix>", см.
+    handlers/categories.py), где ее можно выбрать целиком или уточнить.
 
     :param db: Сессия базы данных.
-    :return: InlineKeyboardMarkup с кнопками категорий доходов.
+    :param kind: Тип операций ("income" или "expense").
+    :param callback_prefix: Префикс callback_data кнопок категорий.
+    :param parent_id: ID категории, подкатегории которой показываются (None — верхний уровень).
+    :return: InlineKeyboardMarkup с кнопками категорий.
     """
-    categories = db.query(IncomeCategory).all()
-    buttons = [[InlineKeyboardButton(text=category.name, callback_data=f"category_{category.id}")] for category in categories]
-    buttons.append([InlineKeyboardButton(text="⬅ Назад", callback_data="back")])
+    model, _ = CATEGORY_KINDS[kind]
+    child = aliased(model)
+    categories = db.execute(
+        select(model.id, model.name, exists().where(child.parent_id == model.id))
+        .where(model.parent_id.is_(None) if parent_id is None else model.parent_id == parent_id)
+        .order_by(model.id)
+    ).all()
+
+    buttons = []
+    back_data = "back"
+    if parent_id is not None:
+        parent = db.execute(select(model.name, model.parent_id).where(model.id == parent_id)).first()
+        if parent is not None:
+            buttons.append([InlineKeyboardButton(
+                text=f"✅ {parent.name} (вся категория)", callback_data=f"{callback_prefix}{parent_id}")])
+            back_data = f"catnav_{kind}_{parent.parent_id or 0}_{callback_prefix}"
+
+    for category_id, name, has_children in categories:
+        if has_children:
+            buttons.append([InlineKeyboardButton(
+                text=f"{name} ›", callback_data=f"catnav_{kind}_{category_id}_{callback_prefix}")])
+        else:
+            buttons.append([InlineKeyboardButton(text=name, callback_data=f"{callback_prefix}{category_id}")])
+    buttons.append([InlineKeyboardButton(text="⬅ Назад", callback_data=back_data)])
     buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="back")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-def get_expense_categories_keyboard(db):
+
+def get_income_categories_keyboard(db: Session, callback_prefix: str = "category_", parent_id: int = None):
+    """
+    Создает клавиатуру с категориями доходов.
+
+    :param db: Сессия базы данных.
+    :param callback_prefix: Префикс callback_data кнопок категорий.
+    :param parent_id: ID категории, подкатегории которой показываются (None — верхний уровень).
+    :return: InlineKeyboardMarkup с кнопками категорий доходов.
+    """
+    return get_categories_keyboard(db, "income", callback_prefix, parent_id)
+
+def get_expense_categories_keyboard(db, callback_prefix: str = "expense_category_", parent_id: int = None):
     """
     Создает клавиатуру с категориями расходов.
 
     :param db: Сессия базы данных.
+    :param callback_prefix: Префикс callback_data кнопок категорий.
+    :param parent_id: ID категории, подкатегории которой показываются (None — верхний уровень).
     :return: InlineKeyboardMarkup с кнопками категорий расходов.
     """
-    categories = db.query(ExpenseCategory).all()
+    return get_categories_keyboard(db, "expense", callback_prefix, parent_id)
+
+
+# Меню статистики (выбор доходов или расходов)
+stats_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="📊 Статистика по доходам", callback_data="income_stats")],
+        [InlineKeyboardButton(text="💸 Статистика по расходам", callback_data="expenses_stats")],
+        [InlineKeyboardButton(text="⬅ Назад", callback_data="back")],
+    ]
+)
+
+# Меню статистики по доходам
+income_stats_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="💰 Доходы за день", callback_data="daily_income")],
+        [InlineKeyboardButton(text="📅 Доходы за неделю", callback_data="weekly_income")],
+        [InlineKeyboardButton(text="📆 Доходы за месяц", callback_data="monthly_income")],
+        [InlineKeyboardButton(text="🔎 Фильтр по датам (с и по)", callback_data="date_filter_income")],
+        [InlineKeyboardButton(text="⬅ Назад", callback_data="stats_menu")],
+    ]
+)
+
+# Меню статистики по расходам
+expenses_stats_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="💸 Расходы за день", callback_data="daily_expenses")],
+        [InlineKeyboardButton(text="📅 Расходы за неделю", callback_data="weekly_expenses")],
+        [InlineKeyboardButton(text="📆 Расходы за месяц", callback_data="monthly_expenses")],
+        [InlineKeyboardButton(text="🔎 Фильтр по датам (с и по)", callback_data="date_filter_expenses")],
+        [InlineKeyboardButton(text="⬅ Назад", callback_data="stats_menu")],
+    ]
+)
+
+# Клавиатура выбора типа регулярной операции
+recurring_kind_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="💰 Доход", callback_data="recurring_kind_income")],
+        [InlineKeyboardButton(text="💸 Расход", callback_data="recurring_kind_expense")],
+        [InlineKeyboardButton(text="❌ Отмена", callback_data="back")],
+    ]
+)
+
+
+def get_recurring_rules_keyboard(rules):
+    """
+    Создает клавиатуру со списком регулярных операций пользователя.
 
+    :param rules: Список объектов RecurringRule.
+    :return: InlineKeyboardMarkup с кнопками удаления правил и кнопкой добавления.
+    """
     buttons = [
-        [InlineKeyboardButton(text=category.name, callback_data=f"expense_category_{category.id}")]
-        for category in categories
+        [InlineKeyboardButton(
+            text=f"🗑 {rule.description or rule.schedule} ({rule.amount} ₽)",
+            callback_data=f"recurring_delete_{rule.id}")]
+        for rule in rules
     ]
+    buttons.append([InlineKeyboardButton(text="➕ Добавить", callback_data="recurring_add")])
     buttons.append([InlineKeyboardButton(text="⬅ Назад", callback_data="back")])
-    buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="back")])
-
     return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+# Клавиатура настройки периодической сводки
+digest_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="📅 Ежедневно", callback_data="digest_set_daily")],
+        [InlineKeyboardButton(text="🗓 Еженедельно", callback_data="digest_set_weekly")],
+        [InlineKeyboardButton(text="📆 Ежемесячно", callback_data="digest_set_monthly")],
+        [InlineKeyboardButton(text="🔕 Отключить", callback_data="digest_set_off")],
+    ]
+)
+
+# Клавиатура общего бюджета для участника группы
+group_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="📆 Статистика за месяц", callback_data="group_stats_month")],
+        [InlineKeyboardButton(text="🗓 Статистика за неделю", callback_data="group_stats_week")],
+        [InlineKeyboardButton(text="🔗 Код приглашения", callback_data="group_invite")],
+        [InlineKeyboardButton(text="🚪 Выйти из группы", callback_data="group_leave")],
+    ]
+)
+
+# Клавиатура общего бюджета для пользователя без группы
+no_group_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="➕ Создать группу", callback_data="group_create")],
+        [InlineKeyboardButton(text="🔑 Вступить по коду", callback_data="group_join")],
+    ]
+)
@@ -1,3 +1,6 @@
+from utils.profiling import startup_profiler
+
+import argparse
 import asyncio
 import logging
 import os
@@ -7,30 +10,99 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
+startup_profiler.mark('import: aiogram')
+
 from utils.commands import set_commands
 from handlers.start import router as start_router
 from handlers.register import router as register_router
 from handlers.income import router as income_router
 from handlers.expense import router as expense_router
 from handlers.operations import router as operations_router
+from handlers.recurring import router as recurring_router
+from handlers.digest import router as digest_router
+from handlers.backup import router as backup_router
+from handlers.categories import router as categories_router
+from handlers.groups import router as groups_router
+from handlers.quick_add import router as quick_add_router
+from handlers.transactions import router as transactions_router
+from handlers.budgets import router as budgets_router
+from handlers.admin import router as admin_router
 from utils.exceptions import HomeworkBotError
-from models.init_db import init_db
+from models.init_db import check_migrations, warm_up_pool, init_sqlite_db
+from models.database import get_engine
 from handlers.menu import router as menu_router
+from filters.text_commands import router as text_commands_router
+from utils.scheduler import scheduler
+from utils.recurring import materialize_due_rules
+from utils.digest import send_due_digests
+from utils.partitions import ensure_future_partitions
+from utils.archive import archive_transactions
+from utils.categories import sync_all_closures
+from utils.reconcile import reconcile_balances
+from utils.anomalies import refresh_baselines
+from utils.analytics import rollup_days
+from utils.sender import init_sender
+from utils.metrics import metrics
+from middlewares.throttling import ThrottlingMiddleware, ConcurrencyLimitMiddleware
+from utils.logging_config import setup_logging, LoggingContextMiddleware, HandlerNameMiddleware
+
+startup_profiler.mark('import: handlers, models, utils')
 
 # Загружаем переменные окружения
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_ADMIN_ID = os.getenv('TELEGRAM_ADMIN_ID')
+# Интервал проверки регулярных операций, в секундах
+RECURRING_INTERVAL = int(os.getenv('RECURRING_INTERVAL', 300))
+# Час, начиная с которого рассылаются сводки
+DIGEST_HOUR = int(os.getenv('DIGEST_HOUR', 20))
+# Как часто (в секундах) писать метрики в лог
+METRICS_INTERVAL = int(os.getenv('METRICS_INTERVAL', 60))
+# Как часто (в секундах) проверять наличие месячных секций
+PARTITIONS_INTERVAL = int(os.getenv('PARTITIONS_INTERVAL', 6 * 60 * 60))
+# Как часто (в секундах) переносить старые операции в архив
+ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', 24 * 60 * 60))
+# Как часто (в секундах) сверять балансы с суммой операций и исправлять ли расхождения
+RECONCILE_INTERVAL = int(os.getenv('RECONCILE_INTERVAL', 6 * 60 * 60))
+RECONCILE_FIX = os.getenv('RECONCILE_FIX', '').lower() in ('1', 'true', 'yes')
+# Как часто (в секундах) пересчитывать обычные траты для поиска необычных расходов
+ANOMALY_INTERVAL = int(os.getenv('ANOMALY_INTERVAL', 24 * 60 * 60))
+# Как часто (в секундах) дописывать сводные таблицы админской статистики
+ANALYTICS_INTERVAL = int(os.getenv('ANALYTICS_INTERVAL', 60 * 60))
 
 dp = Dispatcher()
 dp.include_router(start_router)
 dp.include_router(register_router)
+# Все кнопки reply-клавиатуры обрабатываются одним обработчиком через реестр
+dp.include_router(text_commands_router)
 dp.include_router(menu_router)
+dp.include_router(categories_router)
 dp.include_router(income_router)
 dp.include_router(expense_router)
+dp.include_router(recurring_router)
+dp.include_router(digest_router)
+dp.include_router(backup_router)
+dp.include_router(groups_router)
+dp.include_router(transactions_router)
+dp.include_router(budgets_router)
+dp.include_router(admin_router)
+# Быстрый ввод ("-450 кафе обед вчера") только вне пошаговых сценариев
+dp.include_router(quick_add_router)
 dp.include_router(operations_router)
 
+# Ограничение числа одновременно обрабатываемых обновлений и частоты запросов пользователей
+dp.update.outer_middleware(LoggingContextMiddleware())
+dp.update.outer_middleware(ConcurrencyLimitMiddleware())
+throttling_middleware = ThrottlingMiddleware()
+dp.message.middleware(throttling_middleware)
+dp.callback_query.middleware(throttling_middleware)
+handler_name_middleware = HandlerNameMiddleware()
+dp.message.middleware(handler_name_middleware)
+dp.callback_query.middleware(handler_name_middleware)
+
+startup_profiler.mark('dispatcher setup')
+
 def check_tokens():
     """Проверяет наличие всех необходимых токенов."""
     missing_tokens = [
@@ -39,7 +111,7 @@ def check_tokens():
         }.items() if not value
     ]
     if missing_tokens:
-        logging.critical(f'Отсутствуют токены: {", ".join(missing_tokens)}')
+        logging.critical('Отсутствуют токены: %s', ", ".join(missing_tokens))
         return False
     return True
 
@@ -52,40 +124,78 @@ async def start_bot(bot: Bot):
             text='Бот запущен'
         )
     except HomeworkBotError as e:
-        logging.error(f"Ошибка бота: {str(e)}")
+        logging.error("Ошибка бота: %s", e)
 
 dp.startup.register(start_bot)
 
 
-async def main() -> None:
+def prepare_database():
+    """Проверяет ревизию схемы и прогревает пул соединений (выполняется в отдельном потоке)."""
+    if get_engine().dialect.name == 'sqlite':
+        init_sqlite_db()
+    check_migrations()
+    startup_profiler.mark('db: migration check')
+    sync_all_closures()
+    startup_profiler.mark('db: category tree check')
+    warm_up_pool()
+    startup_profiler.mark('db: pool warm-up')
+
+
+async def main(profile_startup: bool = False) -> None:
     """
     Основная асинхронная функция для запуска бота.
+
+    :param profile_startup: Вывести длительность этапов запуска и завершить работу.
     """
     if not check_tokens():
         exit()
 
-    init_db()
     bot = Bot(
         token=TELEGRAM_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 
-    await set_commands(bot)
-    await dp.start_polling(bot)
+    # Проверка БД и установка команд бота не зависят друг от друга
+    await asyncio.gather(
+        asyncio.to_thread(prepare_database),
+        set_commands(bot),
+    )
+    startup_profiler.mark('db + set_commands (параллельно)')
+
+    if profile_startup:
+        print(startup_profiler.report())
+        await bot.session.close()
+        return
+
+    sender = init_sender(bot)
+    scheduler.add_job('recurring', RECURRING_INTERVAL, materialize_due_rules)
+    scheduler.add_job('digest', 600, send_due_digests, sender, DIGEST_HOUR)
+    scheduler.add_job('partitions', PARTITIONS_INTERVAL, ensure_future_partitions)
+    scheduler.add_job('archive', ARCHIVE_INTERVAL, archive_transactions)
+    scheduler.add_job('reconcile', RECONCILE_INTERVAL, reconcile_balances, RECONCILE_FIX)
+    scheduler.add_job('anomalies', ANOMALY_INTERVAL, refresh_baselines)
+    scheduler.add_job('analytics', ANALYTICS_INTERVAL, rollup_days)
+    scheduler.add_job('metrics', METRICS_INTERVAL, metrics.log_snapshot, jitter=0)
+    scheduler.start()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await scheduler.stop()
+        await sender.stop()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='CoinKeeperBot')
+    parser.add_argument(
+        '--profile-startup', action='store_true',
+        help='вывести длительность этапов импорта и запуска и завершить работу')
+    args = parser.parse_args()
+    log_listener = setup_logging()
     try:
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(),
-                logging.FileHandler("coin_keeper_bot.log", encoding="utf-8")
-            ]
-        )
-        asyncio.run(main())
+        asyncio.run(main(profile_startup=args.profile_startup))
     except KeyboardInterrupt:
         print("Бот отключен")
     except HomeworkBotError as e:
-        logging.error(f"Произошла ошибка бота: {str(e)}")
+        logging.error("Произошла ошибка бота: %s", e)
     except Exception as e:
-        logging.error(f"Неизвестная ошибка: {str(e)}")
+        logging.error("Неизвестная ошибка: %s", e)
+    finally:
+        log_listener.stop()
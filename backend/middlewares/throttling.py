@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject, CallbackQuery
+
+from utils.context_store import ContextStore
+from utils.metrics import metrics
+from utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Лимиты по классам обработчиков: (токенов в секунду, размер всплеска).
+# Класс задается флагом обработчика: flags={"throttling": "stats"}.
+THROTTLING_CLASSES = {
+    "stats": (0.5, 3),      # тяжелые запросы статистики
+    "default": (1.0, 5),    # ввод данных, добавление операций
+    "menu": (3.0, 10),      # навигация по меню, без обращений к БД
+}
+# Классы обработчиков, одновременное выполнение которых ограничено общим семафором
+HEAVY_CLASSES = {"stats"}
+# Сколько тяжелых обработчиков может выполняться одновременно
+MAX_HEAVY_HANDLERS = int(os.getenv("MAX_HEAVY_HANDLERS", 8))
+# Сколько обновлений может обрабатываться одновременно
+MAX_IN_FLIGHT_UPDATES = int(os.getenv("MAX_IN_FLIGHT_UPDATES", 100))
+# Через сколько секунд простоя забываем лимит пользователя
+BUCKET_IDLE_TTL = 600
+MAX_BUCKETS = 50000
+
+PLEASE_WAIT_TEXT = "⏳ Слишком много запросов, подождите немного."
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничивает частоту запросов пользователя и нагрузку от тяжелых обработчиков.
+
+    Для каждой пары (пользователь, класс обработчика) ведется свое "ведро с
+    токенами". Тяжелые обработчики дополнительно ограничены общим семафором:
+    если все места заняты, запрос не ставится в очередь, а пользователь
+    получает ответ "подождите". Регистрируется как inner-middleware, чтобы
+    флаги обработчика были уже известны.
+    """
+
+    def __init__(self, classes: dict = None, max_heavy: int = MAX_HEAVY_HANDLERS):
+        self.classes = classes or THROTTLING_CLASSES
+        self.heavy = asyncio.Semaphore(max_heavy)
+        self._buckets = ContextStore("throttling", ttl=BUCKET_IDLE_TTL, max_size=MAX_BUCKETS, sliding=True)
+        self._heavy_active = 0
+        self._heavy_in_flight = metrics.gauge("throttling.heavy_in_flight")
+
+    def _bucket(self, user_id: int, throttling_class: str) -> TokenBucket:
+        key = (user_id, throttling_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, burst = self.classes.get(throttling_class, self.classes["default"])
+            bucket = TokenBucket(rate, burst)
+            self._buckets.set(key, bucket)
+        return bucket
+
+    @staticmethod
+    async def _reject(event: TelegramObject):
+        """Отвечает "подождите" на callback-запрос; сообщения отбрасываются молча."""
+        if isinstance(event, CallbackQuery):
+            await event.answer(PLEASE_WAIT_TEXT)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        # Для текстовых команд флаги берутся у обработчика из реестра
+        throttling_class = get_flag(data.get("text_command") or data, "throttling", default="default")
+        if self._bucket(user.id, throttling_class).reserve():
+            metrics.counter(f"throttling.dropped.{throttling_class}").inc()
+            logger.debug("Запрос пользователя %s (%s) отброшен: превышен лимит", user.id, throttling_class)
+            return await self._reject(event)
+
+        if throttling_class not in HEAVY_CLASSES:
+            return await handler(event, data)
+
+        if self.heavy.locked():
+            metrics.counter("throttling.saturated").inc()
+            logger.warning("Тяжелые обработчики перегружены, запрос пользователя %s отклонен", user.id)
+            return await self._reject(event)
+
+        async with self.heavy:
+            self._heavy_active += 1
+            self._heavy_in_flight.set(self._heavy_active)
+            try:
+                return await handler(event, data)
+            finally:
+                self._heavy_active -= 1
+                self._heavy_in_flight.set(self._heavy_active)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Ограничивает количество одновременно обрабатываемых обновлений.
+
+    dp.start_polling запускает отдельную задачу на каждое обновление без
+    ограничений; это outer-middleware не дает им одновременно нагружать БД.
+
+    :param limit: Максимальное количество обновлений в обработке.
+    """
+
+    def __init__(self, limit: int = MAX_IN_FLIGHT_UPDATES):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self._active = 0
+        self._in_flight = metrics.gauge("updates.in_flight")
+        self._waiting = metrics.counter("updates.waited_for_slot")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if self.semaphore.locked():
+            self._waiting.inc()
+        async with self.semaphore:
+            self._active += 1
+            self._in_flight.set(self._active)
+            try:
+                return await handler(event, data)
+            finally:
+                self._active -= 1
+                self._in_flight.set(self._active)
@@ -10,7 +10,7 @@ from alembic import context
 
 from models import (
     categories, expense,
-    income, user, init_db)
+    income, user, recurring, archive, group, reconciliation, budget, anomaly, analytics, init_db)
 from models.database import Base
 
 
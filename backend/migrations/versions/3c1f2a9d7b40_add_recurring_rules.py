@@ -0,0 +1,50 @@
+"""Add recurring_rules
+
+Revision ID: 3c1f2a9d7b40
+Revises: 67741c2dc571
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c1f2a9d7b40"
+down_revision: Union[str, None] = "67741c2dc571"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recurring_rules",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.DECIMAL(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("schedule", sa.String(length=64), nullable=False),
+        sa.Column("next_run", sa.Date(), nullable=False),
+        sa.Column("last_run", sa.Date(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), server_default=sa.text("true"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_recurring_rules_id"), "recurring_rules", ["id"], unique=False)
+    op.create_index(op.f("ix_recurring_rules_user_id"), "recurring_rules", ["user_id"], unique=False)
+    op.create_index(
+        "ix_recurring_rules_next_run_active", "recurring_rules", ["next_run"],
+        unique=False, postgresql_where=sa.text("is_active"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_recurring_rules_next_run_active", table_name="recurring_rules")
+    op.drop_index(op.f("ix_recurring_rules_user_id"), table_name="recurring_rules")
+    op.drop_index(op.f("ix_recurring_rules_id"), table_name="recurring_rules")
+    op.drop_table("recurring_rules")
@@ -0,0 +1,56 @@
+"""Add category hierarchy and closure tables
+
+Revision ID: 5a9c3e1b7d28
+Revises: d41a7c8e2f65
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5a9c3e1b7d28"
+down_revision: Union[str, None] = "d41a7c8e2f65"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CATEGORY_TABLES = {
+    "income_categories": "income_category_closure",
+    "expense_categories": "expense_category_closure",
+}
+
+
+def upgrade() -> None:
+    for table, closure in CATEGORY_TABLES.items():
+        op.add_column(table, sa.Column("parent_id", sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column("level", sa.Integer(), server_default=sa.text("0"), nullable=False))
+        op.create_foreign_key(f"{table}_parent_id_fkey", table, table, ["parent_id"], ["id"])
+        op.create_index(op.f(f"ix_{table}_parent_id"), table, ["parent_id"], unique=False)
+
+        op.create_table(
+            closure,
+            sa.Column("ancestor_id", sa.Integer(), nullable=False),
+            sa.Column("descendant_id", sa.Integer(), nullable=False),
+            sa.Column("depth", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["ancestor_id"], [f"{table}.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["descendant_id"], [f"{table}.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+        )
+        op.create_index(op.f(f"ix_{closure}_descendant_id"), closure, ["descendant_id"], unique=False)
+
+        # Существующие категории — верхнего уровня: у каждой только путь к самой себе
+        op.execute(f"INSERT INTO {closure} (ancestor_id, descendant_id, depth) SELECT id, id, 0 FROM {table}")
+
+
+def downgrade() -> None:
+    for table, closure in CATEGORY_TABLES.items():
+        op.drop_index(op.f(f"ix_{closure}_descendant_id"), table_name=closure)
+        op.drop_table(closure)
+        op.drop_index(op.f(f"ix_{table}_parent_id"), table_name=table)
+        op.drop_constraint(f"{table}_parent_id_fkey", table, type_="foreignkey")
+        op.drop_column(table, "level")
+        op.drop_column(table, "parent_id")
@@ -0,0 +1,31 @@
+"""Add user digest settings
+
+Revision ID: 8d2e4b6a1f93
+Revises: 3c1f2a9d7b40
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d2e4b6a1f93"
+down_revision: Union[str, None] = "3c1f2a9d7b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("digest_period", sa.String(length=16), nullable=True))
+    op.add_column("users", sa.Column("digest_last_sent", sa.Date(), nullable=True))
+    op.create_index(op.f("ix_users_digest_period"), "users", ["digest_period"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_users_digest_period"), table_name="users")
+    op.drop_column("users", "digest_last_sent")
+    op.drop_column("users", "digest_period")
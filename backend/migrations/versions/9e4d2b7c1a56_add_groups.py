@@ -0,0 +1,72 @@
+"""Add groups (shared budgets)
+
+Revision ID: 9e4d2b7c1a56
+Revises: 5a9c3e1b7d28
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9e4d2b7c1a56"
+down_revision: Union[str, None] = "5a9c3e1b7d28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRANSACTION_TABLES = ("incomes", "expenses")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "groups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("invite_code", sa.String(length=16), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("invite_code"),
+    )
+    op.create_index(op.f("ix_groups_id"), "groups", ["id"], unique=False)
+
+    op.create_table(
+        "group_members",
+        sa.Column("group_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("role", sa.String(length=16), nullable=False),
+        sa.Column("joined_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["group_id"], ["groups.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("group_id", "user_id"),
+    )
+    op.create_index(op.f("ix_group_members_user_id"), "group_members", ["user_id"], unique=False)
+
+    op.add_column("users", sa.Column("active_group_id", sa.Integer(), nullable=True))
+    op.create_foreign_key("users_active_group_id_fkey", "users", "groups", ["active_group_id"], ["id"])
+
+    for table in TRANSACTION_TABLES:
+        op.add_column(table, sa.Column("group_id", sa.Integer(), nullable=True))
+        op.create_foreign_key(f"{table}_group_id_fkey", table, "groups", ["group_id"], ["id"])
+        op.create_index(
+            f"ix_{table}_group_id_date", table, ["group_id", "date"], unique=False,
+            postgresql_where=sa.text("group_id IS NOT NULL"))
+
+
+def downgrade() -> None:
+    for table in TRANSACTION_TABLES:
+        op.drop_index(f"ix_{table}_group_id_date", table_name=table)
+        op.drop_constraint(f"{table}_group_id_fkey", table, type_="foreignkey")
+        op.drop_column(table, "group_id")
+
+    op.drop_constraint("users_active_group_id_fkey", "users", type_="foreignkey")
+    op.drop_column("users", "active_group_id")
+    op.drop_index(op.f("ix_group_members_user_id"), table_name="group_members")
+    op.drop_table("group_members")
+    op.drop_index(op.f("ix_groups_id"), table_name="groups")
+    op.drop_table("groups")
@@ -0,0 +1,40 @@
+"""Add expense_baselines
+
+Revision ID: a7c3e9d1f052
+Revises: f3d9a1b6c284
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c3e9d1f052"
+down_revision: Union[str, None] = "f3d9a1b6c284"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "expense_baselines",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("median", sa.Float(), nullable=False),
+        sa.Column("std", sa.Float(), nullable=False),
+        sa.Column("monthly_avg", sa.Float(), nullable=False),
+        sa.Column("spike_month", sa.Date(), nullable=True),
+        sa.Column("computed_on", sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["category_id"], ["expense_categories.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "category_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("expense_baselines")
@@ -0,0 +1,63 @@
+"""Add analytics rollups and users.created_at
+
+Revision ID: b5e1d8c4a697
+Revises: a7c3e9d1f052
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e1d8c4a697"
+down_revision: Union[str, None] = "a7c3e9d1f052"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Колонка добавляется без значения по умолчанию, чтобы существующие
+    # пользователи не посчитались зарегистрированными в день миграции
+    op.add_column("users", sa.Column("created_at", sa.DateTime(), nullable=True))
+    op.alter_column("users", "created_at", server_default=sa.text("now()"))
+    op.create_index(op.f("ix_users_created_at"), "users", ["created_at"], unique=False)
+
+    op.create_table(
+        "analytics_daily_totals",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("registrations", sa.Integer(), nullable=False),
+        sa.Column("active_users", sa.Integer(), nullable=False),
+        sa.Column("transactions", sa.BigInteger(), nullable=False),
+        sa.Column("income_amount", sa.DECIMAL(), nullable=False),
+        sa.Column("expense_amount", sa.DECIMAL(), nullable=False),
+        sa.Column("rolled_up_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("day"),
+    )
+    op.create_table(
+        "analytics_daily_users",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("transactions", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "user_id"),
+    )
+    op.create_table(
+        "analytics_daily_categories",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("transactions", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.DECIMAL(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "kind", "category_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_daily_categories")
+    op.drop_table("analytics_daily_users")
+    op.drop_table("analytics_daily_totals")
+    op.drop_index(op.f("ix_users_created_at"), table_name="users")
+    op.drop_column("users", "created_at")
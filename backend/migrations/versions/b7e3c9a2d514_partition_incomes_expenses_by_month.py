@@ -0,0 +1,85 @@
+"""Partition incomes and expenses by month
+
+Revision ID: b7e3c9a2d514
+Revises: 8d2e4b6a1f93
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e3c9a2d514"
+down_revision: Union[str, None] = "8d2e4b6a1f93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (
+    ("incomes", "income_categories"),
+    ("expenses", "expense_categories"),
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        # Секционирование поддерживается только в PostgreSQL, остальным базам хватает индекса
+        for table, _ in TABLES:
+            op.create_index(f"ix_{table}_user_id_date", table, ["user_id", "date"], unique=False)
+        return
+
+    # Ключ секционирования входит в первичный ключ и не может быть NULL.
+    # Подставлять дату за пользователя нельзя: такие строки нужно исправить вручную.
+    bind = op.get_bind()
+    null_dates = {
+        table: bind.execute(sa.text(f"SELECT count(*) FROM {table} WHERE date IS NULL")).scalar()
+        for table, _ in TABLES
+    }
+    if any(null_dates.values()):
+        raise RuntimeError(
+            "Строки без даты не могут попасть в секции: "
+            + ", ".join(f"{table} — {count}" for table, count in null_dates.items() if count)
+            + ". Заполните date у этих строк и повторите миграцию."
+        )
+
+    for table, categories_table in TABLES:
+        legacy = f"{table}_default"
+        # Старая таблица целиком становится секцией DEFAULT, данные не копируются.
+        # Строки из нее переносятся в месячные секции утилитой utils/partitions.py.
+        op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {table}_pkey")
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_id")
+        op.execute(f"ALTER TABLE {legacy} ALTER COLUMN date SET NOT NULL")
+
+        op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (date)")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, date)")
+        op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+        op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY (category_id) REFERENCES {categories_table} (id)")
+        op.execute(f"CREATE INDEX ix_{table}_id ON {table} (id)")
+        op.execute(f"CREATE INDEX ix_{table}_user_id_date ON {table} (user_id, date)")
+
+        op.execute(f"ALTER TABLE {table} ATTACH PARTITION {legacy} DEFAULT")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for table, _ in TABLES:
+            op.drop_index(f"ix_{table}_user_id_date", table_name=table)
+        return
+
+    for table, categories_table in TABLES:
+        plain = f"{table}_plain"
+        op.execute(f"CREATE TABLE {plain} (LIKE {table} INCLUDING DEFAULTS)")
+        op.execute(f"ALTER TABLE {plain} ALTER COLUMN date DROP NOT NULL")
+        op.execute(f"INSERT INTO {plain} SELECT * FROM {table}")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {plain}.id")
+        op.execute(f"DROP TABLE {table} CASCADE")
+        op.execute(f"ALTER TABLE {plain} RENAME TO {table}")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+        op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+        op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY (category_id) REFERENCES {categories_table} (id)")
+        op.execute(f"CREATE INDEX ix_{table}_id ON {table} (id)")
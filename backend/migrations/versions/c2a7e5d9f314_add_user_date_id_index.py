@@ -0,0 +1,34 @@
+"""Extend user/date index of incomes and expenses with id
+
+Revision ID: c2a7e5d9f314
+Revises: 9e4d2b7c1a56
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c2a7e5d9f314"
+down_revision: Union[str, None] = "9e4d2b7c1a56"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRANSACTION_TABLES = ("incomes", "expenses")
+
+
+def upgrade() -> None:
+    # Индекс (user_id, date, id) покрывает и запросы по (user_id, date), и постраничный список операций
+    for table in TRANSACTION_TABLES:
+        op.create_index(f"ix_{table}_user_id_date_id", table, ["user_id", "date", "id"], unique=False)
+        op.drop_index(f"ix_{table}_user_id_date", table_name=table)
+
+
+def downgrade() -> None:
+    for table in TRANSACTION_TABLES:
+        op.create_index(f"ix_{table}_user_id_date", table, ["user_id", "date"], unique=False)
+        op.drop_index(f"ix_{table}_user_id_date_id", table_name=table)
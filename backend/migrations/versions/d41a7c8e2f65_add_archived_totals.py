@@ -0,0 +1,41 @@
+"""Add archived_totals
+
+Revision ID: d41a7c8e2f65
+Revises: b7e3c9a2d514
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d41a7c8e2f65"
+down_revision: Union[str, None] = "b7e3c9a2d514"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "archived_totals",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=True),
+        sa.Column("amount", sa.DECIMAL(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "kind", "month", "category_id", name="uq_archived_totals_user_kind_month_category"),
+    )
+    op.create_index(op.f("ix_archived_totals_id"), "archived_totals", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_archived_totals_id"), table_name="archived_totals")
+    op.drop_table("archived_totals")
@@ -0,0 +1,41 @@
+"""Add reconciliation_runs
+
+Revision ID: e8b4f2c7a913
+Revises: c2a7e5d9f314
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8b4f2c7a913"
+down_revision: Union[str, None] = "c2a7e5d9f314"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reconciliation_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("full", sa.Boolean(), nullable=False),
+        sa.Column("income_max_id", sa.BigInteger(), nullable=False),
+        sa.Column("expense_max_id", sa.BigInteger(), nullable=False),
+        sa.Column("checked", sa.Integer(), nullable=False),
+        sa.Column("mismatched", sa.Integer(), nullable=False),
+        sa.Column("fixed", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_reconciliation_runs_id"), "reconciliation_runs", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_reconciliation_runs_id"), table_name="reconciliation_runs")
+    op.drop_table("reconciliation_runs")
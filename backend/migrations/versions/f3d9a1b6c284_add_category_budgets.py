@@ -0,0 +1,42 @@
+"""Add category_budgets
+
+Revision ID: f3d9a1b6c284
+Revises: e8b4f2c7a913
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3d9a1b6c284"
+down_revision: Union[str, None] = "e8b4f2c7a913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "category_budgets",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("month_limit", sa.DECIMAL(), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("spent", sa.DECIMAL(), server_default=sa.text("0"), nullable=False),
+        sa.Column("alerted", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["category_id"], ["expense_categories.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "category_id", name="uq_category_budgets_user_category"),
+    )
+    op.create_index(op.f("ix_category_budgets_id"), "category_budgets", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_category_budgets_id"), table_name="category_budgets")
+    op.drop_table("category_budgets")
@@ -0,0 +1,72 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, DECIMAL, func
+
+from models.database import Base
+
+
+class DailyTotals(Base):
+    """
+    Итоги дня по всем пользователям (сводная таблица аналитики, см. utils/analytics.py).
+
+    Атрибуты:
+    - day: День.
+    - registrations: Сколько пользователей зарегистрировалось.
+    - active_users: Сколько пользователей записали хотя бы одну операцию.
+    - transactions: Количество операций.
+    - income_amount: Сумма доходов.
+    - expense_amount: Сумма расходов.
+    - rolled_up_at: Когда день был посчитан.
+    """
+    __tablename__ = "analytics_daily_totals"
+
+    day = Column(Date, primary_key=True)
+    registrations = Column(Integer, nullable=False, default=0)
+    active_users = Column(Integer, nullable=False, default=0)
+    transactions = Column(BigInteger, nullable=False, default=0)
+    income_amount = Column(DECIMAL, nullable=False, default=0)
+    expense_amount = Column(DECIMAL, nullable=False, default=0)
+    rolled_up_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<DailyTotals {self.day}, {self.active_users}, {self.transactions}>"
+
+
+class DailyUserActivity(Base):
+    """
+    Количество операций пользователя за день (для DAU/WAU/MAU и перцентилей).
+
+    Атрибуты:
+    - day: День.
+    - user_id: ID пользователя.
+    - transactions: Количество операций пользователя за день.
+    """
+    __tablename__ = "analytics_daily_users"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    transactions = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<DailyUserActivity {self.day}, {self.user_id}, {self.transactions}>"
+
+
+class DailyCategoryTotals(Base):
+    """
+    Количество и сумма операций категории за день по всем пользователям.
+
+    Атрибуты:
+    - day: День.
+    - kind: Тип операций ("income" или "expense").
+    - category_id: ID категории.
+    - transactions: Количество операций.
+    - amount: Сумма операций.
+    """
+    __tablename__ = "analytics_daily_categories"
+
+    day = Column(Date, primary_key=True)
+    kind = Column(String(16), primary_key=True)
+    category_id = Column(Integer, primary_key=True)
+    transactions = Column(Integer, nullable=False)
+    amount = Column(DECIMAL, nullable=False)
+
+    def __repr__(self):
+        return f"<DailyCategoryTotals {self.day}, {self.kind}, {self.category_id}, {self.amount}>"
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+
+from models.database import Base
+
+
+class ExpenseBaseline(Base):
+    """
+    Обычные траты пользователя в категории расходов (для поиска аномалий).
+
+    Строки пересчитываются ночной задачей по истории расходов (см.
+    utils/anomalies.py), новый расход сравнивается с ними при записи.
+
+    Атрибуты:
+    - user_id: Идентификатор пользователя.
+    - category_id: Идентификатор категории расходов.
+    - samples: Количество расходов, по которым посчитана статистика.
+    - median: Медиана суммы расхода.
+    - std: Стандартное отклонение суммы расхода.
+    - monthly_avg: Средние траты в категории за месяц по трем предыдущим месяцам.
+    - spike_month: Первое число месяца, о всплеске трат за который уже отправлено уведомление.
+    - computed_on: Дата пересчета.
+    """
+    __tablename__ = "expense_baselines"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    category_id = Column(Integer, ForeignKey("expense_categories.id", ondelete="CASCADE"), primary_key=True)
+    samples = Column(Integer, nullable=False)
+    median = Column(Float, nullable=False)
+    std = Column(Float, nullable=False)
+    monthly_avg = Column(Float, nullable=False)
+    spike_month = Column(Date)
+    computed_on = Column(Date, nullable=False)
+
+    def __repr__(self):
+        return f"<ExpenseBaseline {self.user_id}, {self.category_id}, {self.median}±{self.std}>"
@@ -0,0 +1,38 @@
+from sqlalchemy import (
+    Column, Integer, DECIMAL, ForeignKey,
+    Date, String, UniqueConstraint)
+
+from models.database import Base
+
+
+class ArchivedTotal(Base):
+    """
+    Итоги по операциям, перенесенным в архивные файлы (см. utils/archive.py).
+
+    Сами операции после архивации хранятся на диске, а в базе остаются
+    суммы по месяцам и категориям.
+
+    Атрибуты:
+    - id: Уникальный идентификатор записи.
+    - user_id: Идентификатор пользователя.
+    - kind: Тип операций: "income" (доходы) или "expense" (расходы).
+    - month: Первое число месяца.
+    - category_id: Идентификатор категории дохода или расхода (в зависимости от kind).
+    - amount: Сумма операций за месяц в категории.
+    - count: Количество операций.
+    """
+    __tablename__ = "archived_totals"
+    __table_args__ = (
+        UniqueConstraint("user_id", "kind", "month", "category_id", name="uq_archived_totals_user_kind_month_category"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(16), nullable=False)
+    month = Column(Date, nullable=False)
+    category_id = Column(Integer)
+    amount = Column(DECIMAL, nullable=False)
+    count = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<ArchivedTotal {self.user_id}, {self.kind}, {self.month}, {self.amount}>"
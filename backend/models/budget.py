@@ -0,0 +1,39 @@
+from sqlalchemy import (
+    Column, Integer, DECIMAL, ForeignKey,
+    Date, UniqueConstraint, text)
+
+from models.database import Base
+
+
+class CategoryBudget(Base):
+    """
+    Месячный бюджет пользователя на категорию расходов со счетчиком трат.
+
+    Счетчик spent изменяется в той же транзакции, что и каждый расход
+    категории или ее подкатегорий (см. utils/budgets.py), и относится к
+    месяцу month; с первым расходом нового месяца счетчик обнуляется.
+
+    Атрибуты:
+    - id: Уникальный идентификатор бюджета.
+    - user_id: Идентификатор пользователя.
+    - category_id: Идентификатор категории расходов.
+    - month_limit: Лимит трат на месяц.
+    - month: Первое число месяца, к которому относится счетчик.
+    - spent: Потрачено за месяц month.
+    - alerted: Порог (в процентах), о достижении которого уже отправлено уведомление (0 — не отправлялось).
+    """
+    __tablename__ = "category_budgets"
+    __table_args__ = (
+        UniqueConstraint("user_id", "category_id", name="uq_category_budgets_user_category"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("expense_categories.id", ondelete="CASCADE"), nullable=False)
+    month_limit = Column(DECIMAL, nullable=False)
+    month = Column(Date, nullable=False)
+    spent = Column(DECIMAL, nullable=False, default=0, server_default=text("0"))
+    alerted = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    def __repr__(self):
+        return f"<CategoryBudget {self.user_id}, {self.category_id}, {self.spent}/{self.month_limit}>"
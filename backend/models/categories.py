@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, ForeignKey, text
 from sqlalchemy.orm import relationship
 
 from models.database import Base
@@ -11,12 +11,16 @@ class IncomeCategory(Base):
     Атрибуты:
     - id: Уникальный идентификатор категории.
     - name: Название категории.
+    - parent_id: Идентификатор родительской категории (None — категория верхнего уровня).
+    - level: Уровень вложенности (0 — верхний уровень).
     - incomes: Связь с моделью Income (доходы).
     """
     __tablename__ = 'income_categories'
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
+    parent_id = Column(Integer, ForeignKey('income_categories.id'), index=True)
+    level = Column(Integer, nullable=False, default=0, server_default=text("0"))
 
     # Добавляем связь с Income
     incomes = relationship("Income", back_populates="category")
@@ -32,14 +36,62 @@ class ExpenseCategory(Base):
     Атрибуты:
     - id: Уникальный идентификатор категории.
     - name: Название категории.
+    - parent_id: Идентификатор родительской категории (None — категория верхнего уровня).
+    - level: Уровень вложенности (0 — верхний уровень).
     - expenses: Связь с моделью Expense (расходы).
     """
     __tablename__ = "expense_categories"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
+    parent_id = Column(Integer, ForeignKey('expense_categories.id'), index=True)
+    level = Column(Integer, nullable=False, default=0, server_default=text("0"))
 
     expenses = relationship("Expense", back_populates="category")  # Добавляем связь
 
     def __repr__(self):
         return f"<ExpenseCategory {self.id}, {self.name}>"
+
+
+class IncomeCategoryClosure(Base):
+    """
+    Таблица замыкания дерева категорий доходов.
+
+    Для каждой категории хранит пары со всеми ее предками, включая саму
+    категорию (depth = 0), поэтому суммы по поддереву считаются одним
+    соединением без рекурсивных запросов. Заполняется utils/categories.py.
+
+    Атрибуты:
+    - ancestor_id: Идентификатор категории-предка.
+    - descendant_id: Идентификатор категории-потомка.
+    - depth: Расстояние между ними в дереве.
+    """
+    __tablename__ = "income_category_closure"
+
+    ancestor_id = Column(Integer, ForeignKey('income_categories.id', ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey('income_categories.id', ondelete="CASCADE"), primary_key=True,
+                           index=True)
+    depth = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<IncomeCategoryClosure {self.ancestor_id} -> {self.descendant_id}, {self.depth}>"
+
+
+class ExpenseCategoryClosure(Base):
+    """
+    Таблица замыкания дерева категорий расходов (см. IncomeCategoryClosure).
+
+    Атрибуты:
+    - ancestor_id: Идентификатор категории-предка.
+    - descendant_id: Идентификатор категории-потомка.
+    - depth: Расстояние между ними в дереве.
+    """
+    __tablename__ = "expense_category_closure"
+
+    ancestor_id = Column(Integer, ForeignKey('expense_categories.id', ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey('expense_categories.id', ondelete="CASCADE"), primary_key=True,
+                           index=True)
+    depth = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<ExpenseCategoryClosure {self.ancestor_id} -> {self.descendant_id}, {self.depth}>"
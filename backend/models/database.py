@@ -1,34 +1,237 @@
 import os
 import logging
+import threading
+import time
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, Insert, Update, Delete, Select
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+
+from utils.logging_config import user_id_var
 
 load_dotenv()
 
-# Создаем строку подключения к PostgreSQL
+# Строка подключения: PostgreSQL или SQLite (sqlite:///coinkeeper.db)
 DATABASE_URL = os.getenv('DATABASE_URL')  # Используем значение из .env
+# Необязательная реплика для чтения статистики
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+# Сколько секунд после записи чтения пользователя идут в основную базу
+STICKY_WRITE_SECONDS = float(os.getenv('STICKY_WRITE_SECONDS', 5))
+# Сколько секунд транзакция SQLite ждет освобождения базы другим писателем (busy_timeout)
+SQLITE_WRITE_TIMEOUT = float(os.getenv('SQLITE_WRITE_TIMEOUT', 30))
 
-logging.basicConfig(level=logging.DEBUG)
-logging.info("Таблицы успешно созданы.")
+# Настройки SQLite: WAL позволяет читать во время записи, synchronous=NORMAL
+# в режиме WAL не теряет целостность и не делает fsync на каждый коммит
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    "cache_size": -64000,  # 64 МБ
+    "mmap_size": 256 * 1024 * 1024,
+}
 
-try:
-    logging.debug("Подключаемся к базе данных...")
-    engine = create_engine(DATABASE_URL)  # Убираем connect_args для PostgreSQL
-    with engine.connect() as connection:
-        logging.debug("Успешное подключение!")
-        result = connection.execute(text("SELECT 1"))  # Используем text()
-        logging.debug(f"Результат: {result.fetchone()}")
-except Exception as e:
-    logging.error(f"Произошла ошибка: {str(e)}")
+logger = logging.getLogger(__name__)
 
 # Создаем базовый класс для моделей
 Base = declarative_base()
 
+_engine = None
+_replica_engine = None
+_sqlite_reader_engine = None
+_engine_lock = threading.Lock()
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite."""
+    # Транзакции начинает SQLAlchemy (см. _begin_immediate), а не драйвер sqlite3
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(SQLITE_WRITE_TIMEOUT * 1000)}")
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def _begin_immediate(connection):
+    """
+    Начинает транзакцию SQLite сразу с блокировкой записи.
+
+    Писатели ждут друг друга внутри SQLite (busy_timeout), а не получают
+    "database is locked" при попытке повысить читающую транзакцию до пишущей.
+    """
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _begin_deferred(connection):
+    """Начинает читающую транзакцию SQLite: в режиме WAL она не ждет писателей."""
+    connection.exec_driver_sql("BEGIN")
+
+
+def _create_engine(url: str, read_only: bool = False) -> Engine:
+    """
+    Создает движок для PostgreSQL или SQLite.
+
+    :param url: Строка подключения.
+    :param read_only: Движок только для чтения (для SQLite — транзакции без блокировки записи).
+    :return: Движок SQLAlchemy.
+    """
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": SQLITE_WRITE_TIMEOUT})
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        event.listen(engine, "begin", _begin_deferred if read_only else _begin_immediate)
+        return engine
+    return create_engine(url, pool_pre_ping=True)
+
+
+def get_engine() -> Engine:
+    """
+    Возвращает движок базы данных, создавая его при первом обращении.
+
+    Импорт модуля не открывает соединений: движок и пул создаются только
+    тогда, когда они действительно нужны (например, не создаются при
+    генерации миграций или импорте моделей).
+
+    :return: Движок SQLAlchemy.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise RuntimeError("Не задана переменная окружения DATABASE_URL")
+                _engine = _create_engine(DATABASE_URL)
+                logger.debug("Создан движок базы данных")
+    return _engine
+
+
+def _get_sqlite_reader_engine() -> Engine:
+    """
+    Возвращает движок для чтения основной базы SQLite.
+
+    Его транзакции начинаются с BEGIN (DEFERRED) и в режиме WAL не берут
+    блокировку записи, поэтому открытая читающая сессия не задерживает писателей.
+
+    :return: Движок SQLAlchemy.
+    """
+    global _sqlite_reader_engine
+    if _sqlite_reader_engine is None:
+        with _engine_lock:
+            if _sqlite_reader_engine is None:
+                _sqlite_reader_engine = _create_engine(DATABASE_URL, read_only=True)
+                logger.debug("Создан движок чтения SQLite")
+    return _sqlite_reader_engine
+
+
+def get_replica_engine() -> Engine:
+    """
+    Возвращает движок реплики для чтения.
+
+    Если DATABASE_REPLICA_URL не задана, для PostgreSQL возвращается основной
+    движок, а для SQLite — движок чтения той же базы, транзакции которого
+    не берут блокировку записи.
+
+    :return: Движок SQLAlchemy.
+    """
+    global _replica_engine
+    if not DATABASE_REPLICA_URL:
+        if get_engine().dialect.name == "sqlite":
+            return _get_sqlite_reader_engine()
+        return get_engine()
+    if _replica_engine is None:
+        with _engine_lock:
+            if _replica_engine is None:
+                _replica_engine = _create_engine(DATABASE_REPLICA_URL, read_only=True)
+                logger.debug("Создан движок реплики базы данных")
+    return _replica_engine
+
+
+# Пользователи, недавно записавшие данные: {tg_id: момент окончания привязки к основной базе}
+_sticky_until = {}
+
+
+def mark_user_write(tg_id: int):
+    """
+    Привязывает чтения пользователя к основной базе на STICKY_WRITE_SECONDS,
+    чтобы он сразу видел свои изменения, даже если реплика отстает.
+
+    :param tg_id: Telegram ID пользователя.
+    """
+    now = time.monotonic()
+    if len(_sticky_until) > 10000:
+        for key in [key for key, until in _sticky_until.items() if until <= now]:
+            del _sticky_until[key]
+    _sticky_until[tg_id] = now + STICKY_WRITE_SECONDS
+
+
+def is_user_sticky(tg_id: int) -> bool:
+    """Проверяет, должны ли чтения пользователя сейчас идти в основную базу."""
+    until = _sticky_until.get(tg_id)
+    return until is not None and until > time.monotonic()
+
+
+def _is_write(clause) -> bool:
+    """Проверяет, что запрос изменяет данные или блокирует строки для изменения (FOR UPDATE)."""
+    if isinstance(clause, (Insert, Update, Delete)):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is not None
+
+
+class RoutingSession(Session):
+    """
+    Сессия, направляющая запросы в основную базу или на реплику.
+
+    На реплику уходят только чтения из сессий, открытых через get_read_db(),
+    и только если текущий пользователь ничего не записывал последние
+    STICKY_WRITE_SECONDS секунд. Все остальное идет в основную базу.
+
+    В режиме SQLite чтения до первой записи в транзакции выполняются через
+    движок чтения (BEGIN без блокировки), а запись, SELECT ... FOR UPDATE
+    и явное получение соединения (db.connection()) — через основной движок,
+    транзакции которого начинаются с BEGIN IMMEDIATE: писатели выполняются
+    по очереди средствами самой SQLite. После первой записи все запросы
+    сессии идут в основной движок, чтобы видеть незафиксированные изменения.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or clause is None or _is_write(clause):
+            self.info["has_writes"] = True
+            return get_engine()
+        if self.info.get("has_writes"):
+            return get_engine()
+        if self.info.get("read_only") and not is_user_sticky(user_id_var.get()):
+            return get_replica_engine()
+        if get_engine().dialect.name == "sqlite":
+            return _get_sqlite_reader_engine()
+        return get_engine()
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_sticky_after_commit(session):
+    if session.info.pop("has_writes", False):
+        tg_id = user_id_var.get()
+        if tg_id is not None:
+            mark_user_write(tg_id)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_flush(session):
+    session.info.pop("has_writes", None)
+
+
+class LazySessionmaker(sessionmaker):
+    """Фабрика сессий, которая привязывается к движку при создании первой сессии."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
 # Создаем сессию для работы с БД
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = LazySessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
 
 # Функция для получения сессии
 def get_db():
@@ -41,4 +244,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    """
+    Генератор сессии только для чтения (статистика, профиль).
+
+    При заданной DATABASE_REPLICA_URL запросы такой сессии выполняются на реплике.
+
+    :yield: Сессия базы данных.
+    """
+    db = SessionLocal(info={"read_only": True})
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, DECIMAL,
-    ForeignKey, Date, String, BigInteger)
+    ForeignKey, Date, String, BigInteger, Index, text)
 from sqlalchemy.orm import relationship
 
 from models.database import Base
@@ -14,6 +14,7 @@ class Expense(Base):
     - id: Уникальный идентификатор расхода.
     - user_id: Идентификатор пользователя, связанного с расходом.
     - category_id: Идентификатор категории расхода.
+    - group_id: Идентификатор общего бюджета (None — личная операция).
     - amount: Сумма расхода.
     - date: Дата расхода.
     - description: Описание расхода.
@@ -21,6 +22,14 @@ class Expense(Base):
     - category: Связь с моделью ExpenseCategory.
     """
     __tablename__ = "expenses"
+    # В PostgreSQL таблица секционирована по месяцам (date), см. utils/partitions.py
+    __table_args__ = (
+        Index("ix_expenses_user_id_date_id", "user_id", "date", "id"),
+        # Статистика общего бюджета: только операции, отнесенные к группе
+        Index(
+            "ix_expenses_group_id_date", "group_id", "date",
+            postgresql_where=text("group_id IS NOT NULL"), sqlite_where=text("group_id IS NOT NULL")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(BigInteger, ForeignKey("users.id"))
@@ -28,6 +37,7 @@ class Expense(Base):
     amount = Column(DECIMAL)
     date = Column(Date)
     description = Column(String)
+    group_id = Column(Integer, ForeignKey("groups.id"))
 
     user = relationship("User", back_populates="expenses")
     category = relationship("ExpenseCategory", back_populates="expenses")
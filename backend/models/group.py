@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy.orm import relationship
+
+from models.database import Base
+
+
+class Group(Base):
+    """
+    Модель общего бюджета (семьи, соседей по квартире и т.п.).
+
+    Атрибуты:
+    - id: Уникальный идентификатор группы.
+    - name: Название группы.
+    - owner_id: Идентификатор пользователя, создавшего группу.
+    - invite_code: Код приглашения, по которому в группу вступают другие пользователи.
+    - created_at: Дата и время создания.
+    - members: Связь с моделью GroupMember (участники).
+    """
+    __tablename__ = "groups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    invite_code = Column(String(16), nullable=False, unique=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    members = relationship("GroupMember", back_populates="group")
+
+    def __repr__(self):
+        return f"<Group {self.id}, {self.name}>"
+
+
+class GroupMember(Base):
+    """
+    Участие пользователя в группе.
+
+    Атрибуты:
+    - group_id: Идентификатор группы.
+    - user_id: Идентификатор пользователя.
+    - role: Роль: "owner" (создатель) или "member" (участник).
+    - joined_at: Дата и время вступления.
+    - group: Связь с моделью Group.
+    """
+    __tablename__ = "group_members"
+
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    role = Column(String(16), nullable=False, default="member")
+    joined_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    group = relationship("Group", back_populates="members")
+
+    def __repr__(self):
+        return f"<GroupMember {self.group_id}, {self.user_id}, {self.role}>"
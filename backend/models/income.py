@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DECIMAL, ForeignKey, Date, String
+from sqlalchemy import Column, Integer, DECIMAL, ForeignKey, Date, String, Index, text
 from sqlalchemy.orm import relationship
 
 from models.database import Base
@@ -12,6 +12,7 @@ class Income(Base):
     - id: Уникальный идентификатор дохода.
     - user_id: Идентификатор пользователя, связанного с доходом.
     - category_id: Идентификатор категории дохода.
+    - group_id: Идентификатор общего бюджета (None — личная операция).
     - amount: Сумма дохода.
     - date: Дата дохода.
     - description: Описание дохода.
@@ -19,6 +20,14 @@ class Income(Base):
     - category: Связь с моделью IncomeCategory.
     """
     __tablename__ = "incomes"
+    # В PostgreSQL таблица секционирована по месяцам (date), см. utils/partitions.py
+    __table_args__ = (
+        Index("ix_incomes_user_id_date_id", "user_id", "date", "id"),
+        # Статистика общего бюджета: только операции, отнесенные к группе
+        Index(
+            "ix_incomes_group_id_date", "group_id", "date",
+            postgresql_where=text("group_id IS NOT NULL"), sqlite_where=text("group_id IS NOT NULL")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -26,6 +35,7 @@ class Income(Base):
     amount = Column(DECIMAL)
     date = Column(Date)
     description = Column(String)
+    group_id = Column(Integer, ForeignKey("groups.id"))
 
     user = relationship("User", back_populates='incomes')
     category = relationship("IncomeCategory", back_populates="incomes")  # Убедись, что здесь back_populates
@@ -1,10 +1,28 @@
-from models.database import engine
+import logging
+import os
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
 from sqlalchemy import inspect
 
+from models.database import get_engine, get_replica_engine
 from models.user import User
 from models.income import Income
 from models.expense import Expense
 from models.categories import IncomeCategory, ExpenseCategory
+from models.recurring import RecurringRule
+from models.archive import ArchivedTotal
+from models.group import Group, GroupMember
+from models.reconciliation import ReconciliationRun
+from models.budget import CategoryBudget
+from models.anomaly import ExpenseBaseline
+from models.analytics import DailyTotals, DailyUserActivity, DailyCategoryTotals
+from utils.exceptions import HomeworkBotError
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
 
 
 def check_tables():
@@ -13,7 +31,7 @@ def check_tables():
 
     Выводит список всех таблиц в базе данных.
     """
-    inspector = inspect(engine)
+    inspector = inspect(get_engine())
     tables = inspector.get_table_names()
     print(f"Таблицы в базе данных: {tables}")
 
@@ -22,6 +40,75 @@ def check_tables():
 def init_db():
     """
     Инициализирует базу данных, создавая все таблицы, определенные в моделях.
+
+    Используется только для пустых баз без миграций; рабочая база
+    обновляется командой alembic upgrade head.
     """
     from models.database import Base
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
+
+
+def init_sqlite_db():
+    """
+    Создает схему в пустой базе SQLite и отмечает ее последней миграцией.
+
+    Миграции Alembic рассчитаны на PostgreSQL (секционирование, изменение
+    ограничений), поэтому для SQLite схема создается по моделям. Если база
+    уже инициализирована, ничего не делает.
+    """
+    engine = get_engine()
+    with engine.begin() as connection:
+        context = MigrationContext.configure(connection)
+        if context.get_current_heads():
+            return
+        from models.database import Base
+        Base.metadata.create_all(bind=connection)
+        config = Config()
+        config.set_main_option("script_location", MIGRATIONS_DIR)
+        context.stamp(ScriptDirectory.from_config(config), "heads")
+    logger.info("Создана схема базы данных SQLite")
+
+
+def get_head_revisions() -> set:
+    """
+    Возвращает head-ревизии Alembic из каталога migrations.
+
+    :return: Множество идентификаторов ревизий.
+    """
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def check_migrations():
+    """
+    Проверяет, что схема базы данных соответствует последней миграции.
+
+    Вместо create_all (который отражает все таблицы) читается одна строка
+    из alembic_version и сравнивается с head-ревизией.
+
+    :raises HomeworkBotError: Если база данных не обновлена до последней миграции.
+    """
+    with get_engine().connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    heads = get_head_revisions()
+    if current != heads:
+        raise HomeworkBotError(
+            f"Схема базы данных устарела (текущая ревизия: {', '.join(current) or 'нет'}, "
+            f"ожидается: {', '.join(heads)}). Выполните 'alembic upgrade head'."
+        )
+    logger.info("Схема базы данных актуальна: %s", ', '.join(heads))
+
+
+def warm_up_pool(size: int = 5):
+    """
+    Заранее открывает соединения пула (и пула реплики, если она задана),
+    чтобы первые запросы не ждали подключения.
+
+    :param size: Количество соединений.
+    """
+    for engine in {get_engine(), get_replica_engine()}:
+        pool_size = getattr(engine.pool, "size", lambda: size)()
+        connections = [engine.connect() for _ in range(min(size, pool_size))]
+        for connection in connections:
+            connection.close()
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, BigInteger, Boolean, DateTime, func
+
+from models.database import Base
+
+
+class ReconciliationRun(Base):
+    """
+    Запуск сверки балансов пользователей (см. utils/reconcile.py).
+
+    Следующая сверка проверяет только пользователей, у которых появились
+    операции с ID больше сохраненных здесь отметок.
+
+    Атрибуты:
+    - id: Уникальный идентификатор запуска.
+    - started_at: Дата и время начала сверки.
+    - finished_at: Дата и время окончания сверки.
+    - full: Проверялись все пользователи (а не только с новыми операциями).
+    - income_max_id: Максимальный ID дохода на момент начала сверки.
+    - expense_max_id: Максимальный ID расхода на момент начала сверки.
+    - checked: Сколько пользователей проверено.
+    - mismatched: У скольких пользователей баланс не совпал с операциями.
+    - fixed: Скольким пользователям баланс исправлен.
+    """
+    __tablename__ = "reconciliation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    started_at = Column(DateTime, nullable=False, server_default=func.now())
+    finished_at = Column(DateTime)
+    full = Column(Boolean, nullable=False, default=False)
+    income_max_id = Column(BigInteger, nullable=False, default=0)
+    expense_max_id = Column(BigInteger, nullable=False, default=0)
+    checked = Column(Integer, nullable=False, default=0)
+    mismatched = Column(Integer, nullable=False, default=0)
+    fixed = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ReconciliationRun {self.id}, checked={self.checked}, mismatched={self.mismatched}>"
@@ -0,0 +1,48 @@
+from sqlalchemy import (
+    Column, Integer, DECIMAL, ForeignKey,
+    Date, String, Boolean, Index, text)
+from sqlalchemy.orm import relationship
+
+from models.database import Base
+
+
+class RecurringRule(Base):
+    """
+    Модель регулярной операции (зарплата, аренда и т.п.).
+
+    Атрибуты:
+    - id: Уникальный идентификатор правила.
+    - user_id: Идентификатор пользователя, которому принадлежит правило.
+    - kind: Тип операции: "income" (доход) или "expense" (расход).
+    - category_id: Идентификатор категории дохода или расхода (в зависимости от kind).
+    - amount: Сумма операции.
+    - description: Описание, которое получит каждая созданная операция.
+    - schedule: Расписание в cron-подобном формате (см. utils/schedule.py).
+    - next_run: Ближайшая дата, на которую операция должна быть создана.
+    - last_run: Дата последней созданной операции.
+    - is_active: Признак активности правила.
+    - user: Связь с моделью User.
+    """
+    __tablename__ = "recurring_rules"
+    __table_args__ = (
+        # Планировщик выбирает только активные правила с наступившей датой
+        Index(
+            "ix_recurring_rules_next_run_active", "next_run",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    kind = Column(String(16), nullable=False)
+    category_id = Column(Integer, nullable=False)
+    amount = Column(DECIMAL, nullable=False)
+    description = Column(String)
+    schedule = Column(String(64), nullable=False)
+    next_run = Column(Date, nullable=False)
+    last_run = Column(Date)
+    is_active = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+
+    user = relationship("User")
+
+    def __repr__(self):
+        return f"<RecurringRule {self.id}, {self.kind}, {self.amount}, '{self.schedule}'>"
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, String, BigInteger, DECIMAL, Integer
+from sqlalchemy import Column, String, BigInteger, DECIMAL, Integer, Date, DateTime, ForeignKey, func
 from sqlalchemy.orm import relationship
 
 from models.database import Base
 from models.income import Income
 from models.expense import Expense
+from models.group import Group
 
 
 class User(Base):
@@ -17,6 +18,10 @@ class User(Base):
     - last_name: Фамилия пользователя.
     - contact: Контактная информация пользователя.
     - balance: Баланс пользователя.
+    - digest_period: Период рассылки сводки: "daily", "weekly", "monthly" или None (рассылка выключена).
+    - digest_last_sent: Дата последней отправленной сводки.
+    - active_group_id: Общий бюджет, к которому относятся новые операции пользователя (None — личный учет).
+    - created_at: Дата и время регистрации (None у пользователей, зарегистрированных до появления поля).
     - incomes: Связь с моделью Income (доходы).
     - expenses: Связь с моделью Expense (расходы).
     """
@@ -28,6 +33,10 @@ class User(Base):
     last_name = Column(String)
     contact = Column(String)
     balance = Column(DECIMAL, default=0.0)
+    digest_period = Column(String(16), index=True)
+    digest_last_sent = Column(Date)
+    active_group_id = Column(Integer, ForeignKey("groups.id", use_alter=True, name="users_active_group_id_fkey"))
+    created_at = Column(DateTime, server_default=func.now(), index=True)
 
     incomes = relationship("Income", back_populates="user")
     expenses = relationship("Expense", back_populates="user")
@@ -0,0 +1,107 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from utils import quick_add
+from utils.quick_add import parse_quick_add, parse_batch, MAX_BATCH_LINES
+
+TODAY = date(2024, 3, 15)
+
+# Справочник категорий вместо базы: (ID, название, название в нижнем регистре)
+CATALOG = {
+    "expense": [(1, "Кафе", "кафе"), (2, "Продукты", "продукты"), (3, "Такси", "такси"),
+                (4, "Продукты для дома", "продукты для дома")],
+    "income": [(10, "Зарплата", "зарплата")],
+}
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    monkeypatch.setattr(quick_add.category_catalog, "entries", lambda db, kind: CATALOG[kind])
+
+
+def test_expense_with_relative_date():
+    entry = parse_quick_add("-450 кафе обед вчера", TODAY)
+    assert entry == ("expense", Decimal("450"), date(2024, 3, 14), ["кафе", "обед"])
+
+
+def test_income_with_comma_amount():
+    entry = parse_quick_add("+50000,50 зарплата", TODAY)
+    assert entry.kind == "income"
+    assert entry.amount == Decimal("50000.50")
+    assert entry.date == TODAY
+
+
+def test_not_quick_add():
+    assert parse_quick_add("кафе 450", TODAY) is None
+    assert parse_quick_add("", TODAY) is None
+
+
+def test_zero_amount():
+    with pytest.raises(ValueError):
+        parse_quick_add("-0 кафе", TODAY)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("-100 кафе 10.03", date(2024, 3, 10)),
+    ("-100 кафе 10.3", date(2024, 3, 10)),
+    ("-100 кафе 01.02.2023", date(2023, 2, 1)),
+    ("-100 10.03 кафе", date(2024, 3, 10)),
+    # Дата без года в будущем относится к прошлому году
+    ("-100 кафе 31.12", date(2023, 12, 31)),
+])
+def test_numeric_date(text, expected):
+    entry = parse_quick_add(text, TODAY)
+    assert entry.date == expected
+    assert entry.words == ["кафе"]
+
+
+def test_number_in_description_is_not_date():
+    entry = parse_quick_add("-100 кофе 1.5 литра", TODAY)
+    assert entry.date == TODAY
+    assert entry.words == ["кофе", "1.5", "литра"]
+
+
+@pytest.mark.parametrize("text", [
+    "-100 кафе 31.02",
+    "-100 кафе 10.13",
+    "-100 кафе 29.02.2023",
+])
+def test_impossible_date(text):
+    with pytest.raises(ValueError, match="Некорректная дата"):
+        parse_quick_add(text, TODAY)
+
+
+def test_leap_day_moved_to_non_leap_year():
+    with pytest.raises(ValueError, match="Некорректная дата"):
+        parse_quick_add("-100 кафе 29.02", date(2024, 1, 10))
+
+
+def test_future_date():
+    with pytest.raises(ValueError, match="будущем"):
+        parse_quick_add("-100 кафе 01.01.2030", TODAY)
+
+
+def test_batch(catalog):
+    lines = parse_batch(None, "-450 кафе обед\n\n+1000 зарплата вчера\n-100 такс\nпривет\n-50 прод\n-10 кафе 31.02", TODAY)
+    assert [line.number for line in lines] == [1, 3, 4, 5, 6, 7]
+
+    cafe, salary, taxi, garbage, ambiguous, bad_date = lines
+    assert (cafe.category_id, cafe.description, cafe.error) == (1, "обед", None)
+    assert (salary.category_id, salary.description, salary.entry.date) == (10, None, date(2024, 3, 14))
+    assert taxi.category_name == "Такси"
+    assert garbage.entry is None and garbage.error
+    assert ambiguous.category_id is None and ambiguous.error.startswith("Неоднозначная категория")
+    assert bad_date.entry is None and "Некорректная дата" in bad_date.error
+
+
+def test_batch_unknown_category(catalog):
+    line, = parse_batch(None, "-450 зоопарк", TODAY)
+    assert line.entry is not None
+    assert line.error == "Категория не найдена"
+
+
+def test_batch_too_many_lines(catalog):
+    with pytest.raises(ValueError):
+        parse_batch(None, "\n".join(["-1 кафе"] * (MAX_BATCH_LINES + 1)), TODAY)
@@ -0,0 +1,376 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import NamedTuple, Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.orm import Session
+
+from models.analytics import DailyTotals, DailyUserActivity, DailyCategoryTotals
+from models.categories import IncomeCategory, ExpenseCategory
+from models.database import SessionLocal
+from models.expense import Expense
+from models.income import Income
+from models.user import User
+from utils.context_store import ContextStore
+from utils.reconcile import id_shards
+
+logger = logging.getLogger(__name__)
+
+# Сколько сегментов пользователей агрегируется одновременно (у каждого свое соединение)
+ANALYTICS_WORKERS = int(os.getenv("ANALYTICS_WORKERS", 4))
+# Размер сегмента по диапазону ID пользователей
+ANALYTICS_SHARD_SIZE = int(os.getenv("ANALYTICS_SHARD_SIZE", 50000))
+# Сколько секунд админская статистика берется из кэша
+ANALYTICS_CACHE_SECONDS = int(os.getenv("ANALYTICS_CACHE_SECONDS", 300))
+# За сколько дней считаются сводные таблицы при первом запуске
+ANALYTICS_BACKFILL_DAYS = 30
+# Сколько последних дней пересчитывается каждый раз (операции могут добавить задним числом)
+ANALYTICS_REFRESH_DAYS = 3
+# Окно MAU, перцентилей и топа категорий, в днях
+ANALYTICS_WINDOW_DAYS = 30
+# За сколько дней показывается объем операций
+VOLUME_DAYS = 14
+# Сколько категорий каждого типа в топе
+TOP_CATEGORIES = 5
+
+# Тип операции -> (модель операций, модель категорий)
+ANALYTICS_KINDS = {
+    "income": (Income, IncomeCategory),
+    "expense": (Expense, ExpenseCategory),
+}
+
+_users = User.__table__
+_totals = DailyTotals.__table__
+_daily_users = DailyUserActivity.__table__
+_daily_categories = DailyCategoryTotals.__table__
+
+# Готовые отчеты: ключ — дата, значение — Dashboard
+_dashboards = ContextStore("analytics", ttl=ANALYTICS_CACHE_SECONDS, max_size=4)
+
+
+class DayAggregate(NamedTuple):
+    """
+    Агрегаты одного дня (или сегмента пользователей за день).
+
+    Атрибуты:
+    - users: {ID пользователя: количество операций}.
+    - categories: {(тип, ID категории): [количество, сумма]}.
+    - registrations: Количество регистраций.
+    """
+    users: Dict[int, int]
+    categories: Dict[Tuple[str, int], list]
+    registrations: int
+
+
+class Dashboard(NamedTuple):
+    """
+    Сводная статистика для администратора.
+
+    Атрибуты:
+    - day: День, на который посчитан отчет.
+    - dau, wau, mau: Пользователи с операциями за день, 7 и 30 дней.
+    - registrations: Регистрации за день, 7 и 30 дней.
+    - p50, p99: Перцентили количества операций на активного пользователя за 30 дней.
+    - volume: [(день, операций, сумма доходов, сумма расходов)] по возрастанию дня.
+    - top_categories: {тип: [(название, операций, сумма)]}.
+    - computed_at: Время расчета.
+    """
+    day: date
+    dau: int
+    wau: int
+    mau: int
+    registrations: Tuple[int, int, int]
+    p50: float
+    p99: float
+    volume: List[Tuple[date, int, Decimal, Decimal]]
+    top_categories: Dict[str, List[Tuple[str, int, Decimal]]]
+    computed_at: datetime
+
+
+def aggregate_shard(day: date, low: int, high: int) -> DayAggregate:
+    """
+    Агрегирует операции и регистрации одного дня для пользователей с ID в [low, high).
+
+    Запросы ограничены днем (PostgreSQL читает только секцию его месяца) и
+    диапазоном ID пользователей (индекс (user_id, date, id)). Выполняется
+    в потоке пула в отдельной сессии.
+
+    :param day: День.
+    :param low: Начало диапазона ID пользователей (включительно).
+    :param high: Конец диапазона ID пользователей (не включительно).
+    :return: DayAggregate.
+    """
+    users = defaultdict(int)
+    categories = {}
+    db = SessionLocal()
+    try:
+        for kind, (model, _) in ANALYTICS_KINDS.items():
+            in_shard = (model.user_id >= low, model.user_id < high, model.date == day)
+            for user_id, count in db.execute(
+                select(model.user_id, func.count()).where(*in_shard).group_by(model.user_id)
+            ):
+                users[user_id] += count
+            for category_id, count, amount in db.execute(
+                select(model.category_id, func.count(), func.sum(model.amount))
+                .where(*in_shard).group_by(model.category_id)
+            ):
+                categories[(kind, category_id)] = [count, Decimal(amount or 0)]
+        registrations = db.execute(
+            select(func.count()).select_from(_users).where(
+                _users.c.id >= low, _users.c.id < high,
+                _users.c.created_at >= day, _users.c.created_at < day + timedelta(days=1))
+        ).scalar_one()
+    finally:
+        db.close()
+    return DayAggregate(dict(users), categories, registrations)
+
+
+def aggregate_day(day: date, workers: int = ANALYTICS_WORKERS,
+                  shard_size: int = ANALYTICS_SHARD_SIZE) -> DayAggregate:
+    """
+    Агрегирует день параллельно по сегментам пользователей и объединяет результаты.
+
+    :param day: День.
+    :param workers: Количество параллельно агрегируемых сегментов.
+    :param shard_size: Размер сегмента по диапазону ID пользователей.
+    :return: DayAggregate.
+    """
+    db = SessionLocal()
+    try:
+        low, high = db.execute(select(func.min(_users.c.id), func.max(_users.c.id))).one()
+    finally:
+        db.close()
+    if low is None:
+        return DayAggregate({}, {}, 0)
+
+    shards = id_shards(low, high, shard_size)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="analytics") as pool:
+        parts = list(pool.map(lambda shard: aggregate_shard(day, *shard), shards))
+
+    users, categories = {}, {}
+    for part in parts:
+        users.update(part.users)
+        for key, (count, amount) in part.categories.items():
+            total = categories.setdefault(key, [0, Decimal(0)])
+            total[0] += count
+            total[1] += amount
+    return DayAggregate(users, categories, sum(part.registrations for part in parts))
+
+
+def _save_day(db: Session, day: date, aggregate: DayAggregate) -> None:
+    """Заменяет строки сводных таблиц за день. Фиксирует транзакцию вызывающий код."""
+    for table in (_totals, _daily_users, _daily_categories):
+        db.execute(delete(table).where(table.c.day == day))
+    amounts = {kind: sum((amount for (k, _), (_, amount) in aggregate.categories.items() if k == kind), Decimal(0))
+               for kind in ANALYTICS_KINDS}
+    db.execute(insert(_totals).values(
+        day=day,
+        registrations=aggregate.registrations,
+        active_users=len(aggregate.users),
+        transactions=sum(aggregate.users.values()),
+        income_amount=amounts["income"],
+        expense_amount=amounts["expense"],
+        rolled_up_at=datetime.now(),
+    ))
+    if aggregate.users:
+        db.execute(insert(_daily_users), [
+            {"day": day, "user_id": user_id, "transactions": count}
+            for user_id, count in aggregate.users.items()
+        ])
+    if aggregate.categories:
+        db.execute(insert(_daily_categories), [
+            {"day": day, "kind": kind, "category_id": category_id, "transactions": count, "amount": amount}
+            for (kind, category_id), (count, amount) in aggregate.categories.items()
+            if category_id is not None
+        ])
+
+
+def rollup_days(today: date = None, workers: int = ANALYTICS_WORKERS,
+                shard_size: int = ANALYTICS_SHARD_SIZE) -> dict:
+    """
+    Заполняет сводные таблицы аналитики за завершившиеся дни.
+
+    Считаются дни после последнего посчитанного и заново — последние
+    ANALYTICS_REFRESH_DAYS дней; при первом запуске — ANALYTICS_BACKFILL_DAYS
+    дней. Каждый день агрегируется параллельно по сегментам пользователей и
+    записывается отдельной транзакцией. Функция синхронная и предназначена
+    для запуска в отдельном потоке из планировщика.
+
+    :param today: Текущая дата (по умолчанию — сегодня); сам день не считается.
+    :param workers: Количество параллельно агрегируемых сегментов.
+    :param shard_size: Размер сегмента по диапазону ID пользователей.
+    :return: {"days", "seconds"}.
+    """
+    today = today or datetime.today().date()
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        last = db.execute(select(func.max(_totals.c.day))).scalar()
+    finally:
+        db.close()
+    if last is None:
+        start = today - timedelta(days=ANALYTICS_BACKFILL_DAYS)
+    else:
+        start = min(last + timedelta(days=1), today - timedelta(days=ANALYTICS_REFRESH_DAYS))
+
+    days = 0
+    day = start
+    while day < today:
+        aggregate = aggregate_day(day, workers, shard_size)
+        db = SessionLocal()
+        try:
+            _save_day(db, day, aggregate)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        days += 1
+        day += timedelta(days=1)
+
+    report = {"days": days, "seconds": round(time.monotonic() - started, 3)}
+    logger.info("Сводные таблицы аналитики: %s", report)
+    return report
+
+
+def _category_names(db: Session, keys) -> dict:
+    """Названия категорий {(тип, ID): название}."""
+    names = {}
+    for kind, (_, category_model) in ANALYTICS_KINDS.items():
+        ids = {category_id for k, category_id in keys if k == kind}
+        if ids:
+            names.update(
+                ((kind, category_id), name) for category_id, name in db.execute(
+                    select(category_model.id, category_model.name).where(category_model.id.in_(ids)))
+            )
+    return names
+
+
+def build_dashboard(today: date = None) -> Dashboard:
+    """
+    Считает сводную статистику по сводным таблицам и текущему дню.
+
+    Завершившиеся дни читаются только из сводных таблиц; операции текущего
+    дня агрегируются параллельно по сегментам пользователей. Функция
+    синхронная: вызывайте ее через get_dashboard.
+
+    :param today: Текущая дата (по умолчанию — сегодня).
+    :return: Dashboard.
+    """
+    today = today or datetime.today().date()
+    live = aggregate_day(today)
+    window_start = today - timedelta(days=ANALYTICS_WINDOW_DAYS - 1)
+    week_start = today - timedelta(days=6)
+
+    db = SessionLocal()
+    try:
+        activity = db.execute(
+            select(_daily_users.c.user_id, func.sum(_daily_users.c.transactions), func.max(_daily_users.c.day))
+            .where(_daily_users.c.day >= window_start, _daily_users.c.day < today)
+            .group_by(_daily_users.c.user_id)
+        ).all()
+        totals = db.execute(
+            select(_totals.c.day, _totals.c.transactions, _totals.c.income_amount, _totals.c.expense_amount,
+                   _totals.c.registrations)
+            .where(_totals.c.day >= window_start, _totals.c.day < today)
+            .order_by(_totals.c.day)
+        ).all()
+        category_rows = db.execute(
+            select(_daily_categories.c.kind, _daily_categories.c.category_id,
+                   func.sum(_daily_categories.c.transactions), func.sum(_daily_categories.c.amount))
+            .where(_daily_categories.c.day >= window_start, _daily_categories.c.day < today)
+            .group_by(_daily_categories.c.kind, _daily_categories.c.category_id)
+        ).all()
+
+        # Активность за окно: сводные таблицы + текущий день, объединенные по ID пользователя
+        user_ids = np.array([row[0] for row in activity] + list(live.users), dtype=np.int64)
+        counts = np.array([row[1] for row in activity] + list(live.users.values()), dtype=np.int64)
+        last_days = np.array([(row[2] - window_start).days for row in activity]
+                             + [(today - window_start).days] * len(live.users), dtype=np.int64)
+        unique_ids, index = np.unique(user_ids, return_inverse=True)
+        per_user = np.bincount(index, weights=counts, minlength=len(unique_ids))
+        last_active = np.full(len(unique_ids), -1, dtype=np.int64)
+        np.maximum.at(last_active, index, last_days)
+        p50, p99 = np.percentile(per_user, [50, 99]) if len(per_user) else (0.0, 0.0)
+
+        categories = defaultdict(lambda: [0, Decimal(0)])
+        for kind, category_id, count, amount in category_rows:
+            categories[(kind, category_id)][0] += count
+            categories[(kind, category_id)][1] += Decimal(amount or 0)
+        for key, (count, amount) in live.categories.items():
+            if key[1] is not None:
+                categories[key][0] += count
+                categories[key][1] += amount
+        top_keys = {
+            kind: sorted((key for key in categories if key[0] == kind),
+                         key=lambda key: categories[key][1], reverse=True)[:TOP_CATEGORIES]
+            for kind in ANALYTICS_KINDS
+        }
+        names = _category_names(db, [key for keys in top_keys.values() for key in keys])
+    finally:
+        db.close()
+
+    live_amounts = {kind: sum((amount for (k, _), (_, amount) in live.categories.items() if k == kind), Decimal(0))
+                    for kind in ANALYTICS_KINDS}
+    volume = [(day, count, Decimal(income), Decimal(expense))
+              for day, count, income, expense, _ in totals if day >= today - timedelta(days=VOLUME_DAYS - 1)]
+    volume.append((today, sum(live.users.values()), live_amounts["income"], live_amounts["expense"]))
+    registrations = (
+        live.registrations,
+        live.registrations + sum(row.registrations for row in totals if row.day >= week_start),
+        live.registrations + sum(row.registrations for row in totals),
+    )
+
+    return Dashboard(
+        day=today,
+        dau=len(live.users),
+        wau=int((last_active >= (week_start - window_start).days).sum()),
+        mau=len(unique_ids),
+        registrations=registrations,
+        p50=float(p50),
+        p99=float(p99),
+        volume=volume,
+        top_categories={
+            kind: [(names.get(key, "—"), categories[key][0], categories[key][1]) for key in keys]
+            for kind, keys in top_keys.items()
+        },
+        computed_at=datetime.now(),
+    )
+
+
+async def get_dashboard() -> Dashboard:
+    """
+    Возвращает сводную статистику из кэша или считает ее в отдельном потоке.
+
+    Отчет кэшируется на ANALYTICS_CACHE_SECONDS секунд, поэтому повторные
+    запросы администратора не нагружают базу.
+
+    :return: Dashboard.
+    """
+    today = datetime.today().date()
+    dashboard = _dashboards.get(today)
+    if dashboard is None:
+        dashboard = await asyncio.to_thread(build_dashboard, today)
+        _dashboards.set(today, dashboard)
+    return dashboard
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Заполнение сводных таблиц аналитики')
+    parser.add_argument('--workers', type=int, default=ANALYTICS_WORKERS, help='сколько сегментов агрегировать параллельно')
+    parser.add_argument('--shard-size', type=int, default=ANALYTICS_SHARD_SIZE, help='размер сегмента по ID пользователей')
+    args = parser.parse_args()
+
+    print(rollup_days(workers=args.workers, shard_size=args.shard_size))
@@ -0,0 +1,359 @@
+import argparse
+import logging
+import os
+import time
+
+from datetime import date, datetime, timedelta
+from typing import Iterable, NamedTuple, Tuple
+
+import numpy as np
+from sqlalchemy import select, insert, delete
+from sqlalchemy.orm import Session
+
+from models.anomaly import ExpenseBaseline
+from models.categories import ExpenseCategory
+from models.database import SessionLocal
+from models.expense import Expense
+from models.user import User
+from utils.notifications import notify_after_commit
+
+logger = logging.getLogger(__name__)
+
+# Расход считается необычным, если он больше медианы категории на столько σ
+ANOMALY_SIGMA = float(os.getenv("ANOMALY_SIGMA", 3))
+# Минимальный разброс в долях медианы: при почти одинаковых суммах σ близко к нулю
+ANOMALY_MIN_SPREAD = 0.1
+# Сколько расходов в категории нужно, чтобы судить о необычной сумме
+ANOMALY_MIN_SAMPLES = 5
+# За сколько дней учитывается история расходов для медианы и σ
+ANOMALY_HISTORY_DAYS = 180
+# Всплеск: траты категории за месяц больше среднего за ANOMALY_SPIKE_MONTHS месяцев во столько раз
+ANOMALY_SPIKE_RATIO = float(os.getenv("ANOMALY_SPIKE_RATIO", 2))
+ANOMALY_SPIKE_MONTHS = 3
+# Сколько пользователей обрабатывается одним запросом и одной транзакцией
+ANOMALY_BATCH_SIZE = int(os.getenv("ANOMALY_BATCH_SIZE", 2000))
+# Сколько секунд может занимать ночной пересчет; остальные пользователи — в следующий запуск
+ANOMALY_TIME_BUDGET = int(os.getenv("ANOMALY_TIME_BUDGET", 15 * 60))
+
+_users = User.__table__
+_expenses = Expense.__table__
+_baselines = ExpenseBaseline.__table__
+
+# ID пользователя, с которого продолжится пересчет, если прошлый не уложился во время
+_resume_after = 0
+
+
+class History(NamedTuple):
+    """
+    История расходов пачки пользователей в виде массивов NumPy.
+
+    Атрибуты:
+    - users: ID пользователей (int64).
+    - categories: ID категорий (int64).
+    - days: Даты в днях от 1970-01-01 (int64).
+    - amounts: Суммы (float64).
+    """
+    users: np.ndarray
+    categories: np.ndarray
+    days: np.ndarray
+    amounts: np.ndarray
+
+
+class Baselines(NamedTuple):
+    """
+    Статистика по группам (пользователь, категория), вычисленная compute_baselines.
+
+    Атрибуты:
+    - users, categories: Ключи групп.
+    - samples, median, std: Количество расходов, медиана и σ суммы расхода за историю.
+    - monthly_avg: Средние траты за месяц по предыдущим ANOMALY_SPIKE_MONTHS месяцам.
+    - month_spent: Траты за месяц, в котором находится последний учитываемый день.
+    """
+    users: np.ndarray
+    categories: np.ndarray
+    samples: np.ndarray
+    median: np.ndarray
+    std: np.ndarray
+    monthly_avg: np.ndarray
+    month_spent: np.ndarray
+
+
+def _day_number(day: date) -> int:
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+def _month_number(days: np.ndarray) -> np.ndarray:
+    """Номер месяца (от 1970-01) для дней от 1970-01-01."""
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def load_history(db: Session, low: int, high: int, since: date, until: date) -> History:
+    """
+    Загружает расходы пользователей с ID в диапазоне [low, high] за даты [since, until).
+
+    Одним запросом по индексу (user_id, date, id); строки сразу переводятся
+    в массивы без создания объектов на каждую операцию.
+
+    :param db: Сессия базы данных.
+    :param low: Первый ID пользователя.
+    :param high: Последний ID пользователя.
+    :param since: Первая дата истории.
+    :param until: Дата, с которой расходы не учитываются.
+    :return: History.
+    """
+    rows = db.execute(
+        select(_expenses.c.user_id, _expenses.c.category_id, _expenses.c.date, _expenses.c.amount)
+        .where(
+            _expenses.c.user_id.between(low, high),
+            _expenses.c.date >= since,
+            _expenses.c.date < until,
+            _expenses.c.category_id.is_not(None),
+        )
+    ).all()
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return History(empty, empty, empty, np.empty(0, dtype=np.float64))
+    users, categories, days, amounts = zip(*rows)
+    return History(
+        np.array(users, dtype=np.int64),
+        np.array(categories, dtype=np.int64),
+        np.array(days, dtype="datetime64[D]").astype(np.int64),
+        np.array(amounts, dtype=np.float64),
+    )
+
+
+def compute_baselines(history: History, today: date) -> Baselines:
+    """
+    Считает статистику всех групп (пользователь, категория) без циклов по строкам.
+
+    Медиана и σ суммы расхода — по расходам за ANOMALY_HISTORY_DAYS дней до
+    today; среднее за месяц — по ANOMALY_SPIKE_MONTHS месяцам, предшествующим
+    месяцу вчерашнего дня; траты за месяц — с начала этого месяца по вчера.
+
+    :param history: История расходов (до today, не включая).
+    :param today: Дата пересчета.
+    :return: Baselines.
+    """
+    keys = (history.users << 32) | history.categories
+    group_keys, groups = np.unique(keys, return_inverse=True)
+    count = len(group_keys)
+    days, amounts = history.days, history.amounts
+
+    window = days >= _day_number(today) - ANOMALY_HISTORY_DAYS
+    samples = np.bincount(groups[window], minlength=count)
+    sums = np.bincount(groups[window], amounts[window], minlength=count)
+    squares = np.bincount(groups[window], amounts[window] ** 2, minlength=count)
+    present = samples > 0
+    mean = np.divide(sums, samples, out=np.zeros(count), where=present)
+    variance = np.divide(squares, samples, out=np.zeros(count), where=present) - mean ** 2
+    std = np.sqrt(np.clip(variance, 0, None))
+
+    # Медиана группы: сортировка по (группа, сумма) и средний элемент каждого отрезка
+    order = np.lexsort((amounts[window], groups[window]))
+    sorted_amounts = amounts[window][order]
+    starts = np.cumsum(samples) - samples
+    median = np.zeros(count)
+    median[present] = (sorted_amounts[(starts + (samples - 1) // 2)[present]]
+                       + sorted_amounts[(starts + samples // 2)[present]]) / 2
+
+    months = _month_number(days)
+    current = _month_number(np.array([_day_number(today) - 1]))[0]
+    in_month = months == current
+    in_trailing = (months >= current - ANOMALY_SPIKE_MONTHS) & (months < current)
+    month_spent = np.bincount(groups[in_month], amounts[in_month], minlength=count)
+    monthly_avg = np.bincount(groups[in_trailing], amounts[in_trailing], minlength=count) / ANOMALY_SPIKE_MONTHS
+
+    return Baselines(group_keys >> 32, group_keys & 0xFFFFFFFF, samples, median, std, monthly_avg, month_spent)
+
+
+def unusual_charges(amounts: np.ndarray, samples: np.ndarray, median: np.ndarray, std: np.ndarray) -> np.ndarray:
+    """
+    Отмечает расходы, которые больше медианы своей категории на ANOMALY_SIGMA σ.
+
+    :return: Булев массив той же длины, что amounts.
+    """
+    spread = np.maximum(std, median * ANOMALY_MIN_SPREAD)
+    return (samples >= ANOMALY_MIN_SAMPLES) & (amounts > median + ANOMALY_SIGMA * spread)
+
+
+def spending_spikes(month_spent: np.ndarray, monthly_avg: np.ndarray) -> np.ndarray:
+    """
+    Отмечает категории, траты в которых за месяц в ANOMALY_SPIKE_RATIO раз больше обычных.
+
+    :return: Булев массив той же длины, что month_spent.
+    """
+    return (monthly_avg > 0) & (month_spent > monthly_avg * ANOMALY_SPIKE_RATIO)
+
+
+def _category_names(db: Session, category_ids) -> dict:
+    return dict(db.execute(
+        select(ExpenseCategory.id, ExpenseCategory.name).where(ExpenseCategory.id.in_(set(category_ids)))
+    ).all())
+
+
+def check_expenses(db: Session, user_id: int, expenses: Iterable[Tuple[int, object]]) -> None:
+    """
+    Сравнивает новые расходы с обычными суммами их категорий.
+
+    Вызывается при записи расходов в той же транзакции; читает только строки
+    expense_baselines затронутых категорий. Уведомление о необычном расходе
+    отправляется после фиксации транзакции.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param expenses: Новые расходы (ID категории, сумма).
+    """
+    expenses = list(expenses)
+    baselines = {
+        row.category_id: row for row in db.execute(
+            select(_baselines.c.category_id, _baselines.c.samples, _baselines.c.median, _baselines.c.std)
+            .where(_baselines.c.user_id == user_id,
+                   _baselines.c.category_id.in_({category_id for category_id, _ in expenses}))
+        )
+    }
+    expenses = [(category_id, amount) for category_id, amount in expenses if category_id in baselines]
+    if not expenses:
+        return
+
+    stats = np.array([baselines[category_id][1:] for category_id, _ in expenses], dtype=np.float64)
+    amounts = np.array([amount for _, amount in expenses], dtype=np.float64)
+    flagged = np.flatnonzero(unusual_charges(amounts, stats[:, 0], stats[:, 1], stats[:, 2]))
+    if not len(flagged):
+        return
+
+    tg_id = db.execute(select(_users.c.tg_id).where(_users.c.id == user_id)).scalar()
+    names = _category_names(db, [expenses[index][0] for index in flagged])
+    for index in flagged:
+        category_id, amount = expenses[index]
+        notify_after_commit(db, tg_id, (
+            f"🔍 Необычный расход: {amounts[index]:.2f} ₽ в категории «{names.get(category_id, '—')}». "
+            f"Обычно здесь около {stats[index, 1]:.2f} ₽."))
+
+
+def refresh_batch(db: Session, user_ids: list, today: date) -> int:
+    """
+    Пересчитывает обычные траты пачки пользователей и уведомляет о всплесках трат.
+
+    О всплеске в категории сообщается один раз за месяц. Фиксирует
+    транзакцию вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_ids: ID пользователей пачки (по возрастанию).
+    :param today: Дата пересчета.
+    :return: Количество групп (пользователь, категория).
+    """
+    low, high = user_ids[0], user_ids[-1]
+    trailing_start = (today - timedelta(days=1)).replace(day=1)
+    for _ in range(ANOMALY_SPIKE_MONTHS):
+        trailing_start = (trailing_start - timedelta(days=1)).replace(day=1)
+    since = min(today - timedelta(days=ANOMALY_HISTORY_DAYS), trailing_start)
+    baselines = compute_baselines(load_history(db, low, high, since, today), today)
+
+    in_batch = _baselines.c.user_id.between(low, high)
+    alerted = {
+        (user_id, category_id): spike_month
+        for user_id, category_id, spike_month in db.execute(
+            select(_baselines.c.user_id, _baselines.c.category_id, _baselines.c.spike_month)
+            .where(in_batch, _baselines.c.spike_month.is_not(None))
+        )
+    }
+    month = (today - timedelta(days=1)).replace(day=1)
+    spikes = spending_spikes(baselines.month_spent, baselines.monthly_avg)
+    new_spikes = [
+        index for index in np.flatnonzero(spikes)
+        if alerted.get((int(baselines.users[index]), int(baselines.categories[index]))) != month
+    ]
+
+    spike_months = [
+        month if spike else alerted.get(key)
+        for key, spike in zip(zip(baselines.users.tolist(), baselines.categories.tolist()), spikes.tolist())
+    ]
+    columns = ("user_id", "category_id", "samples", "median", "std", "monthly_avg", "spike_month")
+    rows = [
+        dict(zip(columns, values), computed_on=today)
+        for values in zip(baselines.users.tolist(), baselines.categories.tolist(), baselines.samples.tolist(),
+                          baselines.median.tolist(), baselines.std.tolist(), baselines.monthly_avg.tolist(),
+                          spike_months)
+    ]
+    db.execute(delete(_baselines).where(in_batch))
+    if rows:
+        db.execute(insert(_baselines), rows)
+
+    if new_spikes:
+        tg_ids = dict(db.execute(
+            select(_users.c.id, _users.c.tg_id)
+            .where(_users.c.id.in_({int(baselines.users[index]) for index in new_spikes}))
+        ).all())
+        names = _category_names(db, [int(baselines.categories[index]) for index in new_spikes])
+        for index in new_spikes:
+            tg_id = tg_ids.get(int(baselines.users[index]))
+            if tg_id is None:
+                continue
+            spent, usual = baselines.month_spent[index], baselines.monthly_avg[index]
+            notify_after_commit(db, tg_id, (
+                f"📈 Траты в категории «{names.get(int(baselines.categories[index]), '—')}» за "
+                f"{month:%m.%Y}: {spent:.2f} ₽ — в {spent / usual:.1f} раза больше, чем обычно "
+                f"за месяц ({usual:.2f} ₽)."))
+    return len(rows)
+
+
+def refresh_baselines(today: date = None, batch_size: int = ANOMALY_BATCH_SIZE,
+                      time_budget: float = ANOMALY_TIME_BUDGET) -> dict:
+    """
+    Ночной пересчет обычных трат всех пользователей пачками по диапазону ID.
+
+    Каждая пачка загружается одним запросом и обрабатывается в отдельной
+    транзакции. Если пересчет не укладывается в time_budget секунд, он
+    прерывается и следующий запуск продолжает с того же пользователя.
+    Функция синхронная и предназначена для запуска в отдельном потоке из
+    планировщика.
+
+    :param today: Дата пересчета (по умолчанию — сегодня).
+    :param batch_size: Количество пользователей в пачке.
+    :param time_budget: Ограничение времени в секундах.
+    :return: {"users", "groups", "batches", "complete", "seconds"}.
+    """
+    global _resume_after
+    today = today or datetime.today().date()
+    started = time.monotonic()
+    report = {"users": 0, "groups": 0, "batches": 0, "complete": False}
+
+    after = _resume_after
+    while time.monotonic() - started < time_budget:
+        db = SessionLocal()
+        try:
+            user_ids = db.execute(
+                select(_users.c.id).where(_users.c.id > after).order_by(_users.c.id).limit(batch_size)
+            ).scalars().all()
+            if user_ids:
+                report["groups"] += refresh_batch(db, user_ids, today)
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if not user_ids:
+            report["complete"] = True
+            break
+        report["users"] += len(user_ids)
+        report["batches"] += 1
+        after = user_ids[-1]
+
+    _resume_after = 0 if report["complete"] else after
+    report["seconds"] = round(time.monotonic() - started, 3)
+    log = logger.info if report["complete"] else logger.warning
+    log("Пересчет обычных трат: %s", report)
+    return report
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Пересчет обычных трат пользователей и поиск всплесков')
+    parser.add_argument('--batch-size', type=int, default=ANOMALY_BATCH_SIZE, help='пользователей в пачке')
+    parser.add_argument('--time-budget', type=float, default=ANOMALY_TIME_BUDGET, help='ограничение времени, секунд')
+    args = parser.parse_args()
+
+    print(refresh_baselines(batch_size=args.batch_size, time_budget=args.time_budget))
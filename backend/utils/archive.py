@@ -0,0 +1,439 @@
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+import zlib
+
+from collections import defaultdict
+from datetime import datetime, date
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select, delete, insert, extract, distinct, or_, and_, func, event
+from sqlalchemy.orm import Session, aliased
+
+from models.database import SessionLocal, RoutingSession
+from models.income import Income
+from models.expense import Expense
+from models.categories import IncomeCategory, ExpenseCategory, IncomeCategoryClosure, ExpenseCategoryClosure
+from models.archive import ArchivedTotal
+from utils.partitions import add_months
+
+logger = logging.getLogger(__name__)
+
+# Каталог с архивными файлами операций
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# Операции старше стольких месяцев (считая от начала текущего) переносятся в архив
+ARCHIVE_HORIZON_MONTHS = int(os.getenv("ARCHIVE_HORIZON_MONTHS", 12))
+
+# Тип операции -> (модель операций, модель категорий)
+ARCHIVE_KINDS = {
+    "income": (Income, IncomeCategory),
+    "expense": (Expense, ExpenseCategory),
+}
+
+# Тип операции -> таблица замыкания дерева категорий
+ARCHIVE_CLOSURES = {
+    "income": IncomeCategoryClosure,
+    "expense": ExpenseCategoryClosure,
+}
+
+# Строка архива: суммы хранятся в копейках, group_id = 0 — личная операция;
+# строки отсортированы по (date, id)
+ARCHIVE_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("date", "<M8[D]"),
+    ("category_id", "<i4"),
+    ("amount", "<i8"),
+    ("group_id", "<i4"),
+])
+ROWS_FILE = "rows.npy"
+DESCRIPTIONS_FILE = "descriptions.json.z"
+
+# Ключ session.info, под которым копятся версии архива, ожидающие фиксации транзакции
+_STAGED_KEY = "staged_archives"
+
+_archived_totals = ArchivedTotal.__table__
+
+
+def archive_horizon(today: date = None, horizon_months: int = ARCHIVE_HORIZON_MONTHS) -> date:
+    """
+    Возвращает дату, раньше которой операции переносятся в архив.
+
+    :param today: Текущая дата (по умолчанию — сегодня).
+    :param horizon_months: Сколько месяцев операций остается в базе.
+    :return: Первое число месяца.
+    """
+    return add_months((today or datetime.today().date()).replace(day=1), -horizon_months)
+
+
+def _year_path(kind: str, user_id: int, year: int) -> str:
+    """Путь к архиву пользователя за год (символическая ссылка на текущую версию)."""
+    return os.path.join(ARCHIVE_DIR, kind, str(user_id), str(year))
+
+
+def _to_cents(amount) -> int:
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def _from_cents(cents) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class ArchiveYear(NamedTuple):
+    """
+    Версия архива за год, найденная одним разрешением символической ссылки.
+
+    Атрибуты:
+    - rows: Строки ARCHIVE_DTYPE (отображены в память).
+    - path: Каталог версии, из которого читаются описания (read_descriptions).
+    """
+    rows: np.ndarray
+    path: str
+
+
+def read_year(kind: str, user_id: int, year: int) -> Optional[ArchiveYear]:
+    """
+    Открывает архив пользователя за год.
+
+    Ссылка на год разрешается один раз: строки и описания читаются из одного
+    каталога версии, даже если во время чтения публикуется новая версия.
+    Строки отображаются в память (mmap), описания читаются отдельно
+    функцией read_descriptions и только при необходимости.
+
+    :param kind: Тип операций ("income" или "expense").
+    :param user_id: ID пользователя.
+    :param year: Год.
+    :return: ArchiveYear или None, если архива нет.
+    """
+    path = os.path.realpath(_year_path(kind, user_id, year))
+    try:
+        rows = np.load(os.path.join(path, ROWS_FILE), mmap_mode="r")
+    except FileNotFoundError:
+        return None
+    if rows.dtype != ARCHIVE_DTYPE:
+        # Архив записан до появления group_id: все операции в нем личные
+        upgraded = np.zeros(len(rows), dtype=ARCHIVE_DTYPE)
+        for name in rows.dtype.names:
+            upgraded[name] = rows[name]
+        rows = upgraded
+    return ArchiveYear(rows, path)
+
+
+def read_descriptions(archive: ArchiveYear) -> list:
+    """Возвращает описания операций версии архива в порядке строк."""
+    with open(os.path.join(archive.path, DESCRIPTIONS_FILE), "rb") as file:
+        return json.loads(zlib.decompress(file.read()))
+
+
+def archived_years(kind: str, user_id: int) -> list:
+    """Возвращает отсортированный список лет, за которые у пользователя есть архив."""
+    path = os.path.join(ARCHIVE_DIR, kind, str(user_id))
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(entry) for entry in os.listdir(path) if entry.isdigit())
+
+
+def iter_archived(kind: str, user_id: int):
+    """
+    Перебирает все заархивированные операции пользователя в порядке (date, id).
+
+    В памяти одновременно находятся только описания одного года.
+
+    :param kind: Тип операций ("income" или "expense").
+    :param user_id: ID пользователя.
+    :return: Генератор кортежей (id, дата, ID категории или None, сумма, описание).
+    """
+    for year in archived_years(kind, user_id):
+        archive = read_year(kind, user_id, year)
+        if archive is None:
+            continue
+        for row, description in zip(archive.rows.tolist(), read_descriptions(archive)):
+            yield row[0], row[1], row[2] or None, _from_cents(row[3]), description
+
+
+def _stage_year(kind: str, user_id: int, year: int, rows: np.ndarray, descriptions: list) -> str:
+    """
+    Записывает новую версию архива за год в отдельный каталог.
+
+    Символическая ссылка на год не меняется: версия публикуется функцией
+    _publish_year только после фиксации транзакции, удаляющей операции из базы.
+
+    :return: Путь к каталогу версии.
+    """
+    version_dir = f"{_year_path(kind, user_id, year)}.{time.time_ns()}"
+    os.makedirs(version_dir)
+    np.save(os.path.join(version_dir, ROWS_FILE), rows)
+    with open(os.path.join(version_dir, DESCRIPTIONS_FILE), "wb") as file:
+        file.write(zlib.compress(json.dumps(descriptions, ensure_ascii=False).encode("utf-8"), 9))
+    return version_dir
+
+
+def _publish_year(version_dir: str):
+    """
+    Атомарно переключает символическую ссылку на год на версию version_dir.
+
+    Предыдущая версия удаляется только при следующей публикации: читатель,
+    разрешивший ссылку до переключения, дочитывает из нее согласованную пару
+    файлов. Остальные версии (в том числе оставшиеся после сбоя) удаляются.
+    """
+    link = version_dir.rsplit(".", 1)[0]
+    keep = {os.path.basename(version_dir)}
+    if os.path.islink(link):
+        keep.add(os.readlink(link))
+    tmp_link = f"{link}.link"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.basename(version_dir), tmp_link)
+    os.replace(tmp_link, link)
+
+    parent, name = os.path.split(link)
+    for entry in os.listdir(parent):
+        if entry.startswith(f"{name}.") and entry not in keep and not entry.endswith(".link"):
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _publish_staged(session):
+    for version_dir in session.info.pop(_STAGED_KEY, []):
+        _publish_year(version_dir)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_staged(session):
+    for version_dir in session.info.pop(_STAGED_KEY, []):
+        shutil.rmtree(version_dir, ignore_errors=True)
+
+
+def _recover_staged(db: Session):
+    """
+    Завершает архивацию, прерванную между фиксацией транзакции и переключением ссылки.
+
+    Неопубликованная версия года публикуется, если итоги в базе уже посчитаны
+    по ней (число операций в archived_totals совпадает с числом строк версии),
+    иначе транзакция не была зафиксирована, и версия удаляется.
+
+    :param db: Сессия базы данных.
+    """
+    for kind in ARCHIVE_KINDS:
+        kind_dir = os.path.join(ARCHIVE_DIR, kind)
+        if not os.path.isdir(kind_dir):
+            continue
+        for user_entry in os.listdir(kind_dir):
+            user_dir = os.path.join(kind_dir, user_entry)
+            if not user_entry.isdigit() or not os.path.isdir(user_dir):
+                continue
+            staged = defaultdict(list)
+            for entry in os.listdir(user_dir):
+                year, _, version = entry.partition(".")
+                if version.isdigit():
+                    staged[int(year)].append(entry)
+            for year, entries in staged.items():
+                link = _year_path(kind, int(user_entry), year)
+                # Рассматриваются только версии новее текущей
+                current = int(os.readlink(link).partition(".")[2]) if os.path.islink(link) else 0
+                entries = sorted((entry for entry in entries if int(entry.partition(".")[2]) > current),
+                                 key=lambda entry: int(entry.partition(".")[2]))
+                if not entries:
+                    continue
+                latest = os.path.join(user_dir, entries[-1])
+                committed = db.execute(
+                    select(func.coalesce(func.sum(_archived_totals.c.count), 0))
+                    .where(_archived_totals.c.user_id == int(user_entry),
+                           _archived_totals.c.kind == kind,
+                           _archived_totals.c.month >= date(year, 1, 1),
+                           _archived_totals.c.month < date(year + 1, 1, 1))
+                ).scalar()
+                if committed == len(np.load(os.path.join(latest, ROWS_FILE), mmap_mode="r")):
+                    logger.warning("Публикуется архив, прерванный после фиксации транзакции: %s", latest)
+                    _publish_year(latest)
+                else:
+                    for entry in entries:
+                        shutil.rmtree(os.path.join(user_dir, entry), ignore_errors=True)
+
+
+def archive_user_year(db: Session, kind: str, user_id: int, year: int, cutoff: date) -> int:
+    """
+    Переносит операции пользователя за год (раньше cutoff) в архивный файл.
+
+    Новые строки объединяются с уже заархивированными по id, поэтому
+    повторный запуск после сбоя не создает дублей. Итоги по месяцам
+    пересчитываются по всему файлу. Транзакцию фиксирует вызывающий код:
+    операции удаляются из базы только вместе с обновлением итогов, а новая
+    версия архива становится видна читателям только после фиксации
+    (при откате она удаляется), поэтому операции не учитываются дважды.
+
+    :param db: Сессия базы данных.
+    :param kind: Тип операций ("income" или "expense").
+    :param user_id: ID пользователя.
+    :param year: Год.
+    :param cutoff: Операции с датой раньше этой даты архивируются.
+    :return: Количество перенесенных операций.
+    """
+    model, _ = ARCHIVE_KINDS[kind]
+    live_rows = db.execute(
+        select(model.id, model.date, model.category_id, model.amount, model.group_id, model.description)
+        .where(model.user_id == user_id,
+               model.date >= date(year, 1, 1),
+               model.date < min(date(year + 1, 1, 1), cutoff))
+        .with_for_update()
+    ).all()
+    if not live_rows:
+        return 0
+
+    merged = {}
+    existing = read_year(kind, user_id, year)
+    if existing is not None:
+        for row, description in zip(existing.rows.tolist(), read_descriptions(existing)):
+            merged[row[0]] = (row[1], row[2], row[3], row[4], description)
+    for row_id, row_date, category_id, amount, group_id, description in live_rows:
+        merged[row_id] = (row_date, category_id or 0, _to_cents(amount), group_id or 0, description or "")
+
+    ordered = sorted(merged.items(), key=lambda item: (item[1][0], item[0]))
+    rows = np.array(
+        [(row_id, row_date, category_id, cents, group_id)
+         for row_id, (row_date, category_id, cents, group_id, _) in ordered],
+        dtype=ARCHIVE_DTYPE,
+    )
+    db.info.setdefault(_STAGED_KEY, []).append(
+        _stage_year(kind, user_id, year, rows, [values[4] for _, values in ordered]))
+
+    # Итоги по (месяц, категория) пересчитываются по всему году
+    totals = defaultdict(lambda: [0, 0])
+    months = rows["date"].astype("M8[M]").astype(object)
+    for month, category_id, cents in zip(months, rows["category_id"].tolist(), rows["amount"].tolist()):
+        totals[(month, category_id)][0] += cents
+        totals[(month, category_id)][1] += 1
+
+    db.execute(delete(_archived_totals).where(
+        _archived_totals.c.user_id == user_id,
+        _archived_totals.c.kind == kind,
+        _archived_totals.c.month >= date(year, 1, 1),
+        _archived_totals.c.month < date(year + 1, 1, 1),
+    ))
+    db.execute(insert(_archived_totals), [
+        {"user_id": user_id, "kind": kind, "month": month, "category_id": category_id or None,
+         "amount": _from_cents(cents), "count": count}
+        for (month, category_id), (cents, count) in totals.items()
+    ])
+    table = model.__table__
+    db.execute(delete(table).where(table.c.date < cutoff, table.c.id.in_([row.id for row in live_rows])))
+    return len(live_rows)
+
+
+def archive_transactions(today: date = None, horizon_months: int = ARCHIVE_HORIZON_MONTHS) -> int:
+    """
+    Переносит в архив все операции старше горизонта.
+
+    Каждая пара (пользователь, год) обрабатывается в отдельной транзакции.
+    Если архивация уже идет в другом процессе, функция ничего не делает.
+    Функция синхронная и предназначена для запуска в отдельном потоке из планировщика.
+
+    :param today: Текущая дата (по умолчанию — сегодня).
+    :param horizon_months: Сколько месяцев операций остается в базе.
+    :return: Количество перенесенных операций.
+    """
+    cutoff = archive_horizon(today, horizon_months)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with open(os.path.join(ARCHIVE_DIR, ".lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Архивация уже выполняется другим процессом")
+            return 0
+
+        db = SessionLocal()
+        try:
+            _recover_staged(db)
+        finally:
+            db.close()
+
+        archived = 0
+        for kind, (model, _) in ARCHIVE_KINDS.items():
+            db = SessionLocal()
+            try:
+                user_years = db.execute(
+                    select(distinct(model.user_id), extract("year", model.date))
+                    .where(model.date < cutoff)
+                ).all()
+            finally:
+                db.close()
+
+            for user_id, year in user_years:
+                os.makedirs(os.path.join(ARCHIVE_DIR, kind, str(user_id)), exist_ok=True)
+                db = SessionLocal()
+                try:
+                    archived += archive_user_year(db, kind, user_id, int(year), cutoff)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+
+    if archived:
+        logger.info("В архив перенесено операций: %s (раньше %s)", archived, cutoff)
+    return archived
+
+
+def get_archived_totals(db: Session, kind: str, user_id: int, start_date: date, end_date: date, level: int = 0):
+    """
+    Считает суммы и детальный список заархивированных операций за период.
+
+    Файлы читаются через mmap, нужный диапазон находится бинарным поиском
+    по отсортированным датам, суммы по категориям считаются средствами NumPy.
+
+    :param db: Сессия базы данных (для названий категорий).
+    :param kind: Тип операций ("income" или "expense").
+    :param user_id: ID пользователя.
+    :param start_date: Начальная дата (включительно).
+    :param end_date: Конечная дата (включительно).
+    :param level: Уровень дерева категорий, до которого сворачиваются суммы.
+    :return: Кортеж ({категория: сумма}, [(дата, категория, описание, сумма)]);
+             пустые, если за период ничего не архивировалось.
+    """
+    chunks = []
+    for year in range(start_date.year, end_date.year + 1):
+        archive = read_year(kind, user_id, year)
+        if archive is None:
+            continue
+        lo = np.searchsorted(archive.rows["date"], np.datetime64(start_date, "D"), side="left")
+        hi = np.searchsorted(archive.rows["date"], np.datetime64(end_date, "D"), side="right")
+        if lo < hi:
+            chunks.append((archive, lo, hi, archive.rows[lo:hi]))
+    if not chunks:
+        return {}, []
+
+    selected = np.concatenate([rows for *_, rows in chunks])
+    category_ids, inverse = np.unique(selected["category_id"], return_inverse=True)
+    cents = np.zeros(len(category_ids), dtype=np.int64)
+    np.add.at(cents, inverse, selected["amount"])
+
+    _, category_model = ARCHIVE_KINDS[kind]
+    closure_model = ARCHIVE_CLOSURES[kind]
+    names = dict(db.execute(
+        select(category_model.id, category_model.name)
+        .where(category_model.id.in_(category_ids.tolist()))
+    ).all())
+    # Категория -> название ее предка на уровне level (как в запросах utils/db_operations.py)
+    ancestor = aliased(category_model)
+    rollup_names = dict(db.execute(
+        select(closure_model.descendant_id, ancestor.name)
+        .join(ancestor, ancestor.id == closure_model.ancestor_id)
+        .where(closure_model.descendant_id.in_(category_ids.tolist()),
+               or_(ancestor.level == level, and_(closure_model.depth == 0, ancestor.level < level)))
+    ).all())
+
+    category_totals = defaultdict(Decimal)
+    for category_id, total in zip(category_ids.tolist(), cents.tolist()):
+        category_totals[rollup_names.get(category_id, names.get(category_id, "Без категории"))] += _from_cents(total)
+
+    details = []
+    for archive, lo, hi, rows in chunks:
+        descriptions = read_descriptions(archive)[lo:hi]
+        for row, description in zip(rows.tolist(), descriptions):
+            details.append((row[1], names.get(row[2], "Без категории"), description, _from_cents(row[3])))
+    return dict(category_totals), details
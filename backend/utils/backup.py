@@ -0,0 +1,401 @@
+import csv
+import gzip
+import io
+import json
+import logging
+
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import (
+    Table, MetaData, Column, Integer, String, Date, DECIMAL,
+    select, insert, update, func, exists, literal, union_all,
+)
+from sqlalchemy.orm import Session
+
+from models.database import SessionLocal
+from models.user import User
+from models.archive import ArchivedTotal
+from utils.archive import ARCHIVE_KINDS, iter_archived
+from utils.budgets import apply_expenses
+from utils.db_operations import get_month_range
+from utils.exceptions import BackupError
+
+logger = logging.getLogger(__name__)
+
+BACKUP_FORMAT = "coinkeeper-backup"
+BACKUP_VERSION = 1
+# Сколько строк читается с сервера или вставляется в базу за раз
+BACKUP_BATCH_SIZE = 1000
+# Ограничение длины описания операции в файле
+MAX_DESCRIPTION_LENGTH = 1000
+
+_users = User.__table__
+_archived_totals = ArchivedTotal.__table__
+
+# Временная таблица для восстановления: строки из файла (source="backup")
+# и архивные операции пользователя (source="archive"), с которыми файл сверяется.
+_staging = Table(
+    "restore_staging", MetaData(),
+    Column("line", Integer),
+    Column("source", String(16)),
+    Column("kind", String(16)),
+    Column("date", Date),
+    Column("category_id", Integer),
+    Column("amount", DECIMAL),
+    Column("description", String),
+    prefixes=["TEMPORARY"],
+)
+_STAGING_COLUMNS = [column.name for column in _staging.columns]
+
+
+def _category_names(db: Session, kind: str) -> dict:
+    """Возвращает {ID категории: название} для типа операций."""
+    _, category_model = ARCHIVE_KINDS[kind]
+    return dict(db.execute(select(category_model.id, category_model.name)).all())
+
+
+def _category_ids(db: Session, kind: str) -> dict:
+    """Возвращает {название категории: ID}; при одинаковых названиях берется меньший ID."""
+    _, category_model = ARCHIVE_KINDS[kind]
+    rows = db.execute(select(category_model.name, category_model.id).order_by(category_model.id.desc())).all()
+    return dict(rows)
+
+
+def _dump(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def iter_backup_lines(db: Session, user_id: int):
+    """
+    Формирует строки JSON Lines с данными пользователя.
+
+    Операции из базы читаются курсором на стороне сервера пачками по
+    BACKUP_BATCH_SIZE, архивные — через mmap, поэтому расход памяти не
+    зависит от количества операций.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :return: Генератор строк файла.
+    """
+    user = db.execute(
+        select(_users.c.name, _users.c.last_name, _users.c.contact, _users.c.balance, _users.c.digest_period)
+        .where(_users.c.id == user_id)
+    ).one()
+    yield _dump({
+        "type": "header",
+        "format": BACKUP_FORMAT,
+        "version": BACKUP_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    })
+    yield _dump({"type": "profile", **user._asdict()})
+
+    counts = {}
+    for kind, (model, category_model) in ARCHIVE_KINDS.items():
+        counts[kind] = 0
+        names = _category_names(db, kind)
+        # Архивные операции всегда старше операций в базе
+        for _, row_date, category_id, amount, description in iter_archived(kind, user_id):
+            counts[kind] += 1
+            yield _dump({"type": kind, "date": row_date, "category": names.get(category_id),
+                         "amount": amount, "description": description})
+
+        result = db.execute(
+            select(model.date, category_model.name, model.amount, model.description)
+            .outerjoin(category_model, model.category_id == category_model.id)
+            .where(model.user_id == user_id)
+            .order_by(model.date, model.id)
+            .execution_options(yield_per=BACKUP_BATCH_SIZE)
+        )
+        for row_date, category, amount, description in result:
+            counts[kind] += 1
+            yield _dump({"type": kind, "date": row_date, "category": category,
+                         "amount": amount, "description": description or ""})
+
+    yield _dump({"type": "footer", **counts})
+
+
+def write_backup(tg_id: int, path: str) -> dict:
+    """
+    Записывает резервную копию пользователя в файл .jsonl.gz.
+
+    Функция синхронная и предназначена для запуска в отдельном потоке.
+
+    :param tg_id: Telegram ID пользователя.
+    :param path: Путь к файлу.
+    :return: {"income": количество, "expense": количество}.
+    :raises BackupError: Если пользователь не зарегистрирован.
+    """
+    db = SessionLocal(info={"read_only": True})
+    try:
+        user_id = db.execute(select(_users.c.id).where(_users.c.tg_id == tg_id)).scalar()
+        if user_id is None:
+            raise BackupError("Пользователь не зарегистрирован")
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            for line in iter_backup_lines(db, user_id):
+                file.write(line)
+                last_line = line
+    finally:
+        db.close()
+
+    counts = json.loads(last_line)
+    del counts["type"]
+    logger.info("Создана резервная копия пользователя %s: %s", user_id, counts)
+    return counts
+
+
+def _parse_operation(record: dict, line_number: int, category_ids: dict) -> tuple:
+    """Проверяет строку операции и возвращает (дата, ID категории, сумма, описание)."""
+    try:
+        row_date = date.fromisoformat(record["date"])
+        amount = Decimal(record["amount"])
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        raise BackupError(f"Строка {line_number}: некорректная дата или сумма")
+    if not amount.is_finite() or amount <= 0:
+        raise BackupError(f"Строка {line_number}: сумма должна быть положительной")
+
+    category = record.get("category")
+    if category is None:
+        category_id = None
+    elif category in category_ids:
+        category_id = category_ids[category]
+    else:
+        raise BackupError(f"Строка {line_number}: неизвестная категория «{category}»")
+
+    description = record.get("description") or ""
+    if not isinstance(description, str) or len(description) > MAX_DESCRIPTION_LENGTH:
+        raise BackupError(f"Строка {line_number}: некорректное описание")
+    return row_date, category_id, amount, description
+
+
+def iter_backup_rows(file, category_ids: dict):
+    """
+    Читает и проверяет файл резервной копии.
+
+    Проверяются заголовок, формат каждой строки, существование категорий и
+    итоговая строка с количеством операций (обрезанный файл не принимается).
+    Строки читаются по одной, файл целиком в память не загружается.
+
+    :param file: Открытый на чтение текстовый файл.
+    :param category_ids: {тип операций: {название категории: ID}}.
+    :return: Генератор словарей: сначала профиль (type="profile"), затем строки _staging.
+    :raises BackupError: Если файл не прошел проверку.
+    """
+    counts = dict.fromkeys(ARCHIVE_KINDS, 0)
+    footer = None
+    line_number = 0
+    try:
+        for line_number, line in enumerate(file, start=1):
+            if footer is not None:
+                raise BackupError(f"Строка {line_number}: данные после итоговой строки")
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise BackupError(f"Строка {line_number}: некорректный JSON")
+            if not isinstance(record, dict):
+                raise BackupError(f"Строка {line_number}: ожидался объект JSON")
+
+            record_type = record.get("type")
+            if line_number == 1:
+                if record_type != "header" or record.get("format") != BACKUP_FORMAT:
+                    raise BackupError("Это не резервная копия CoinKeeper")
+                if record.get("version") != BACKUP_VERSION:
+                    raise BackupError(f"Неподдерживаемая версия резервной копии: {record.get('version')}")
+            elif line_number == 2:
+                if record_type != "profile":
+                    raise BackupError("Строка 2: ожидался профиль пользователя")
+                yield record
+            elif record_type in ARCHIVE_KINDS:
+                row_date, category_id, amount, description = _parse_operation(
+                    record, line_number, category_ids[record_type])
+                counts[record_type] += 1
+                yield {"line": line_number, "source": "backup", "kind": record_type, "date": row_date,
+                       "category_id": category_id, "amount": amount, "description": description}
+            elif record_type == "footer":
+                footer = record
+            else:
+                raise BackupError(f"Строка {line_number}: неизвестный тип записи «{record_type}»")
+    except (OSError, EOFError, UnicodeDecodeError):
+        raise BackupError("Файл поврежден или не является архивом gzip")
+
+    if line_number < 2:
+        raise BackupError("Файл пуст")
+    if footer is None or any(footer.get(kind) != count for kind, count in counts.items()):
+        raise BackupError("Файл обрезан: количество операций не совпадает с итоговой строкой")
+
+
+def _batches(rows, size: int = BACKUP_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _stage(db: Session, rows):
+    """
+    Загружает строки во временную таблицу пачками.
+
+    В PostgreSQL используется COPY, в остальных СУБД — пакетный INSERT.
+    """
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        cursor = connection.connection.driver_connection.cursor()
+        try:
+            for batch in _batches(rows):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in batch:
+                    writer.writerow(["" if row[name] is None else row[name] for name in _STAGING_COLUMNS])
+                buffer.seek(0)
+                # Пустое значение без кавычек — NULL, кроме описания: там это пустая строка
+                cursor.copy_expert(
+                    f"COPY {_staging.name} ({', '.join(_STAGING_COLUMNS)}) FROM STDIN "
+                    f"WITH (FORMAT csv, FORCE_NOT_NULL (description))", buffer)
+        finally:
+            cursor.close()
+    else:
+        for batch in _batches(rows):
+            db.execute(insert(_staging), batch)
+
+
+def _insert_missing(db: Session, kind: str, user_id: int) -> int:
+    """
+    Переносит из временной таблицы в базу операции, которых у пользователя еще нет.
+
+    Операции сравниваются по (дата, категория, сумма, описание) с учетом
+    количества повторов: если в файле три одинаковых расхода, а в базе или
+    архиве уже два, добавится один. Поэтому повторное восстановление того же
+    файла ничего не добавляет.
+
+    :return: Добавленные операции (ID категории, дата, сумма).
+    """
+    model, _ = ARCHIVE_KINDS[kind]
+    table = model.__table__
+    staging = _staging.c
+
+    def numbered(rows):
+        partition = [rows.c.date, rows.c.category_id, rows.c.amount, rows.c.description]
+        return select(rows, func.row_number().over(partition_by=partition).label("n")).subquery()
+
+    backup_rows = select(staging.date, staging.category_id, staging.amount, staging.description) \
+        .where(staging.kind == kind, staging.source == "backup").subquery()
+    existing_rows = union_all(
+        select(table.c.date, table.c.category_id, table.c.amount,
+               func.coalesce(table.c.description, "").label("description"))
+        .where(table.c.user_id == user_id),
+        select(staging.date, staging.category_id, staging.amount, staging.description)
+        .where(staging.kind == kind, staging.source == "archive"),
+    ).subquery()
+    new, old = numbered(backup_rows), numbered(existing_rows)
+
+    result = db.execute(insert(table).from_select(
+        ["user_id", "category_id", "amount", "date", "description"],
+        select(literal(user_id), new.c.category_id, new.c.amount, new.c.date, new.c.description)
+        .where(~exists().where(
+            old.c.date == new.c.date,
+            old.c.category_id.is_not_distinct_from(new.c.category_id),
+            old.c.amount == new.c.amount,
+            old.c.description == new.c.description,
+            old.c.n == new.c.n,
+        ))
+    ).returning(table.c.category_id, table.c.date, table.c.amount))
+    return result.all()
+
+
+def recalculate_balance(db: Session, user_id: int):
+    """
+    Пересчитывает баланс пользователя одним запросом: доходы минус расходы,
+    включая итоги заархивированных операций.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :return: Новый баланс.
+    """
+    totals = []
+    for kind, (model, _) in ARCHIVE_KINDS.items():
+        live = select(func.coalesce(func.sum(model.amount), 0)).where(model.user_id == user_id)
+        archived = select(func.coalesce(func.sum(_archived_totals.c.amount), 0)) \
+            .where(_archived_totals.c.user_id == user_id, _archived_totals.c.kind == kind)
+        totals.append(live.scalar_subquery() + archived.scalar_subquery())
+    income, expense = totals
+    return db.execute(
+        update(_users).where(_users.c.id == user_id)
+        .values(balance=income - expense)
+        .returning(_users.c.balance)
+    ).scalar_one()
+
+
+def restore_backup(tg_id: int, path: str) -> dict:
+    """
+    Восстанавливает данные пользователя из файла .jsonl.gz.
+
+    Файл читается потоково: каждая строка проверяется и сразу загружается во
+    временную таблицу (COPY в PostgreSQL), затем недостающие операции
+    добавляются двумя запросами INSERT ... SELECT, баланс пересчитывается
+    один раз, а добавленные расходы текущего месяца учитываются в счетчиках
+    бюджетов. Все выполняется в одной транзакции: при ошибке в любой строке
+    база не меняется. Незарегистрированный пользователь создается по профилю
+    из файла, профиль существующего пользователя не меняется.
+
+    Функция синхронная и предназначена для запуска в отдельном потоке.
+
+    :param tg_id: Telegram ID пользователя.
+    :param path: Путь к файлу.
+    :return: {"income": добавлено, "expense": добавлено, "balance": новый баланс}.
+    :raises BackupError: Если файл не прошел проверку.
+    """
+    db = SessionLocal()
+    try:
+        category_ids = {kind: _category_ids(db, kind) for kind in ARCHIVE_KINDS}
+        connection = db.connection()
+        _staging.drop(connection, checkfirst=True)
+        _staging.create(connection)
+
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            rows = iter_backup_rows(file, category_ids)
+            profile = next(rows, None)
+            if profile is None:
+                raise BackupError("Файл пуст")
+
+            user_id = db.execute(select(_users.c.id).where(_users.c.tg_id == tg_id)).scalar()
+            if user_id is None:
+                user_id = db.execute(insert(_users).values(
+                    tg_id=tg_id,
+                    name=profile.get("name"),
+                    last_name=profile.get("last_name"),
+                    contact=profile.get("contact"),
+                    balance=0,
+                ).returning(_users.c.id)).scalar_one()
+
+            _stage(db, rows)
+
+        _stage(db, (
+            {"line": None, "source": "archive", "kind": kind, "date": row_date,
+             "category_id": category_id, "amount": amount, "description": description}
+            for kind in ARCHIVE_KINDS
+            for _, row_date, category_id, amount, description in iter_archived(kind, user_id)
+        ))
+
+        inserted = {kind: _insert_missing(db, kind, user_id) for kind in ARCHIVE_KINDS}
+        result = {kind: len(rows) for kind, rows in inserted.items()}
+        result["balance"] = recalculate_balance(db, user_id)
+        # Счетчики бюджетов ведутся за текущий месяц: расходы других месяцев на них не влияют
+        month_start, month_end = get_month_range(date.today())
+        apply_expenses(db, user_id, [
+            (category_id, row_date, amount) for category_id, row_date, amount in inserted["expense"]
+            if category_id is not None and month_start <= row_date <= month_end
+        ])
+        _staging.drop(connection)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    logger.info("Пользователь %s восстановил резервную копию: %s", user_id, result)
+    return result
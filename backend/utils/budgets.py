@@ -0,0 +1,218 @@
+import logging
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, NamedTuple, List, Tuple
+
+from sqlalchemy import select, update, delete, insert, func, case, bindparam
+from sqlalchemy.orm import Session
+
+from models.budget import CategoryBudget
+from models.categories import ExpenseCategory, ExpenseCategoryClosure
+from models.expense import Expense
+from models.user import User
+from utils.db_operations import get_month_range
+from utils.notifications import notify_after_commit
+
+logger = logging.getLogger(__name__)
+
+# Пороги уведомлений, в процентах от лимита (по возрастанию)
+ALERT_THRESHOLDS = (80, 100)
+
+_budgets = CategoryBudget.__table__
+_closure = ExpenseCategoryClosure.__table__
+_users = User.__table__
+
+# Изменение счетчиков бюджетов категории и всех ее предков на сумму расхода.
+# С первым расходом нового месяца счетчик начинается заново; расходы за
+# прошедшие месяцы на счетчик текущего месяца не влияют.
+_add_spend = (
+    update(_budgets)
+    .where(
+        _budgets.c.user_id == bindparam("b_user_id"),
+        _budgets.c.month <= bindparam("b_month"),
+        _budgets.c.category_id.in_(
+            select(_closure.c.ancestor_id).where(_closure.c.descendant_id == bindparam("b_category_id"))
+        ),
+    )
+    .values(
+        spent=case(
+            (_budgets.c.month == bindparam("b_month"), _budgets.c.spent + bindparam("b_delta", type_=_budgets.c.spent.type)),
+            else_=bindparam("b_new_month_spent", type_=_budgets.c.spent.type),
+        ),
+        alerted=case((_budgets.c.month == bindparam("b_month"), _budgets.c.alerted), else_=0),
+        month=bindparam("b_month"),
+    )
+    .returning(_budgets.c.id, _budgets.c.category_id, _budgets.c.spent, _budgets.c.month_limit,
+               _budgets.c.alerted)
+)
+
+
+class BudgetAlert(NamedTuple):
+    """
+    Уведомление о достижении порога бюджета.
+
+    Атрибуты:
+    - tg_id: Telegram ID пользователя.
+    - category: Название категории.
+    - threshold: Достигнутый порог в процентах.
+    - spent: Потрачено за месяц.
+    - month_limit: Лимит на месяц.
+    """
+    tg_id: int
+    category: str
+    threshold: int
+    spent: Decimal
+    month_limit: Decimal
+
+
+class BudgetRow(NamedTuple):
+    """
+    Бюджет категории в обзоре.
+
+    Атрибуты:
+    - category_id: ID категории.
+    - category: Название категории.
+    - month_limit: Лимит на месяц.
+    - spent: Потрачено за текущий месяц.
+    """
+    category_id: int
+    category: str
+    month_limit: Decimal
+    spent: Decimal
+
+
+def _threshold(spent: Decimal, month_limit: Decimal) -> int:
+    """Наибольший достигнутый порог уведомления (0 — ни один не достигнут)."""
+    reached = 0
+    for threshold in ALERT_THRESHOLDS:
+        if month_limit > 0 and spent * 100 >= month_limit * threshold:
+            reached = threshold
+    return reached
+
+
+def apply_expenses(db: Session, user_id: int, expenses: Iterable[Tuple[int, date, Decimal]]) -> None:
+    """
+    Изменяет счетчики бюджетов на суммы расходов в текущей транзакции.
+
+    Вызывается при каждой записи, изменении и удалении расхода. Если счетчик
+    пересек порог из ALERT_THRESHOLDS, уведомление отправляется после
+    фиксации транзакции; если опустился ниже порога, уведомление
+    будет отправлено повторно при следующем пересечении.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param expenses: Изменения (ID категории, дата расхода, сумма; отрицательная — при удалении).
+    """
+    deltas = defaultdict(Decimal)
+    for category_id, expense_date, amount in expenses:
+        deltas[(category_id, expense_date.replace(day=1))] += Decimal(str(amount))
+
+    crossed = []
+    for (category_id, month), delta in deltas.items():
+        if not delta:
+            continue
+        rows = db.execute(_add_spend, {
+            "b_user_id": user_id,
+            "b_month": month,
+            "b_category_id": category_id,
+            "b_delta": delta,
+            "b_new_month_spent": max(delta, Decimal(0)),
+        }).all()
+        for budget_id, budget_category_id, spent, month_limit, alerted in rows:
+            threshold = _threshold(spent, month_limit)
+            if threshold != alerted:
+                db.execute(update(_budgets).where(_budgets.c.id == budget_id).values(alerted=threshold))
+            if threshold > alerted:
+                crossed.append((budget_category_id, threshold, spent, month_limit))
+
+    if crossed:
+        tg_id = db.execute(select(_users.c.tg_id).where(_users.c.id == user_id)).scalar()
+        names = dict(db.execute(
+            select(ExpenseCategory.id, ExpenseCategory.name)
+            .where(ExpenseCategory.id.in_([category_id for category_id, _, _, _ in crossed]))
+        ).all())
+        for category_id, threshold, spent, month_limit in crossed:
+            alert = BudgetAlert(tg_id, names.get(category_id, "—"), threshold, spent, month_limit)
+            notify_after_commit(db, tg_id, format_alert(alert))
+
+
+def format_alert(alert: BudgetAlert) -> str:
+    """Текст уведомления о достижении порога бюджета."""
+    if alert.threshold >= 100:
+        return (f"🚨 Бюджет «{alert.category}» превышен: потрачено {alert.spent:.2f} ₽ "
+                f"из {alert.month_limit:.2f} ₽.")
+    return (f"⚠️ Бюджет «{alert.category}» израсходован на {alert.threshold}%: "
+            f"{alert.spent:.2f} ₽ из {alert.month_limit:.2f} ₽.")
+
+
+def _month_spent(category_id: int, user_id: int, day: date):
+    """Запрос суммы расходов пользователя за месяц по категории и ее подкатегориям."""
+    start_date, end_date = get_month_range(day)
+    return (
+        select(func.coalesce(func.sum(Expense.amount), 0))
+        .join(_closure, _closure.c.descendant_id == Expense.category_id)
+        .where(
+            _closure.c.ancestor_id == category_id,
+            Expense.user_id == user_id,
+            Expense.date >= start_date,
+            Expense.date <= end_date,
+        )
+    )
+
+
+def set_budget(db: Session, user_id: int, category_id: int, month_limit: Decimal, today: date) -> None:
+    """
+    Создает или изменяет бюджет категории.
+
+    Счетчик нового бюджета один раз заполняется суммой расходов текущего
+    месяца; дальше он поддерживается apply_expenses. Нулевой лимит удаляет
+    бюджет. Фиксирует транзакцию вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param category_id: ID категории расходов.
+    :param month_limit: Лимит на месяц.
+    :param today: Текущая дата.
+    """
+    if month_limit <= 0:
+        db.execute(delete(_budgets).where(_budgets.c.user_id == user_id, _budgets.c.category_id == category_id))
+        return
+
+    month = today.replace(day=1)
+    spent = db.execute(_month_spent(category_id, user_id, today)).scalar_one()
+    updated = db.execute(
+        update(_budgets)
+        .where(_budgets.c.user_id == user_id, _budgets.c.category_id == category_id)
+        .values(month_limit=month_limit, month=month, spent=spent, alerted=_threshold(spent, month_limit))
+    ).rowcount
+    if not updated:
+        db.execute(insert(_budgets).values(
+            user_id=user_id, category_id=category_id, month_limit=month_limit, month=month,
+            spent=spent, alerted=_threshold(spent, month_limit)))
+
+
+def get_budgets(db: Session, user_id: int, today: date) -> List[BudgetRow]:
+    """
+    Возвращает бюджеты пользователя с тратами за текущий месяц одним запросом.
+
+    Запрос читает только строки счетчиков по индексу (user_id, category_id)
+    и не обращается к таблице расходов.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param today: Текущая дата.
+    :return: Список BudgetRow, отсортированный по названию категории.
+    """
+    month = today.replace(day=1)
+    rows = db.execute(
+        select(
+            _budgets.c.category_id, ExpenseCategory.name, _budgets.c.month_limit,
+            case((_budgets.c.month == month, _budgets.c.spent), else_=0),
+        )
+        .join(ExpenseCategory, ExpenseCategory.id == _budgets.c.category_id)
+        .where(_budgets.c.user_id == user_id)
+        .order_by(ExpenseCategory.name)
+    ).all()
+    return [BudgetRow(*row) for row in rows]
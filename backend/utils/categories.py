@@ -0,0 +1,206 @@
+import argparse
+import logging
+
+from sqlalchemy import select, insert, delete, update, literal, union_all, tuple_, func, or_
+from sqlalchemy.orm import Session, aliased
+
+from models.database import SessionLocal
+from models.categories import IncomeCategory, ExpenseCategory, IncomeCategoryClosure, ExpenseCategoryClosure
+
+logger = logging.getLogger(__name__)
+
+# Тип операций -> (модель категорий, таблица замыкания)
+CATEGORY_KINDS = {
+    "income": (IncomeCategory, IncomeCategoryClosure),
+    "expense": (ExpenseCategory, ExpenseCategoryClosure),
+}
+
+
+def top_level_operations(model, kind: str):
+    """
+    Собирает запрос операций с названием их категории верхнего уровня.
+
+    Соединения внешние, как в utils/db_operations.py: операция категории без
+    строк замыкания относится к самой категории, операция без категории —
+    к «Без категории». Условия на операции (период, группа) добавляет
+    вызывающий код.
+
+    :param model: Модель операций (Income или Expense).
+    :param kind: Тип операций ("income" или "expense").
+    :return: Запрос со столбцами user_id, kind, category, amount.
+    """
+    category_model, closure = CATEGORY_KINDS[kind]
+    root = aliased(category_model)
+    return select(
+        model.user_id.label("user_id"),
+        literal(kind).label("kind"),
+        func.coalesce(root.name, literal("Без категории")).label("category"),
+        model.amount.label("amount"),
+    ).outerjoin(closure, closure.descendant_id == model.category_id) \
+        .outerjoin(root, root.id == func.coalesce(closure.ancestor_id, model.category_id)) \
+        .where(or_(root.parent_id.is_(None), closure.ancestor_id.is_(None)))
+
+
+def add_category(db: Session, kind: str, name: str, parent_id: int = None) -> int:
+    """
+    Создает категорию и записывает ее пути в таблицу замыкания.
+
+    Пути копируются у родителя одним INSERT ... SELECT. Транзакцию
+    фиксирует вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param kind: Тип операций ("income" или "expense").
+    :param name: Название категории.
+    :param parent_id: ID родительской категории или None для верхнего уровня.
+    :return: ID созданной категории.
+    :raises ValueError: Если родительская категория не найдена.
+    """
+    model, closure = CATEGORY_KINDS[kind]
+    level = 0
+    if parent_id is not None:
+        parent_level = db.execute(select(model.level).where(model.id == parent_id)).scalar()
+        if parent_level is None:
+            raise ValueError(f"Категория с ID {parent_id} не найдена")
+        level = parent_level + 1
+
+    category_id = db.execute(
+        insert(model.__table__).values(name=name, parent_id=parent_id, level=level).returning(model.id)
+    ).scalar_one()
+
+    paths = select(literal(category_id), literal(category_id), literal(0))
+    if parent_id is not None:
+        paths = union_all(
+            paths,
+            select(closure.ancestor_id, literal(category_id), closure.depth + 1)
+            .where(closure.descendant_id == parent_id),
+        )
+    db.execute(insert(closure.__table__).from_select(["ancestor_id", "descendant_id", "depth"], paths))
+    logger.info("Добавлена категория (%s): %s, родитель %s", kind, name, parent_id)
+    return category_id
+
+
+def build_closure(parents: dict) -> tuple:
+    """
+    Строит таблицу замыкания и уровни по связям «категория -> родитель».
+
+    :param parents: {ID категории: ID родителя или None}.
+    :return: Кортеж ({(предок, потомок): глубина}, {ID категории: уровень}).
+    :raises ValueError: Если в дереве есть цикл.
+    """
+    paths, levels = {}, {}
+    for category_id in parents:
+        ancestor, depth, seen = category_id, 0, set()
+        while ancestor is not None:
+            if ancestor in seen:
+                raise ValueError(f"Цикл в дереве категорий: {category_id}")
+            seen.add(ancestor)
+            paths[(ancestor, category_id)] = depth
+            ancestor, depth = parents.get(ancestor), depth + 1
+        levels[category_id] = depth - 1
+    return paths, levels
+
+
+def sync_closure(db: Session, kind: str) -> int:
+    """
+    Приводит таблицу замыкания и уровни категорий в соответствие с parent_id.
+
+    Нужна после изменения категорий в обход add_category (например, вручную
+    в базе). Категорий немного, поэтому дерево строится в памяти, а в базу
+    записывается только разница. Транзакцию фиксирует вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param kind: Тип операций ("income" или "expense").
+    :return: Количество исправленных строк.
+    """
+    model, closure = CATEGORY_KINDS[kind]
+    rows = db.execute(select(model.id, model.parent_id, model.level)).all()
+    paths, levels = build_closure({row.id: row.parent_id for row in rows})
+
+    existing = {
+        (row.ancestor_id, row.descendant_id): row.depth
+        for row in db.execute(select(closure.ancestor_id, closure.descendant_id, closure.depth))
+    }
+    extra = [key for key, depth in existing.items() if paths.get(key) != depth]
+    missing = [key for key, depth in paths.items() if existing.get(key) != depth]
+    wrong_levels = [row.id for row in rows if row.level != levels[row.id]]
+
+    if extra:
+        db.execute(delete(closure.__table__).where(tuple_(closure.ancestor_id, closure.descendant_id).in_(extra)))
+    if missing:
+        db.execute(insert(closure.__table__), [
+            {"ancestor_id": ancestor, "descendant_id": descendant, "depth": paths[(ancestor, descendant)]}
+            for ancestor, descendant in missing
+        ])
+    for category_id in wrong_levels:
+        db.execute(update(model.__table__).where(model.id == category_id).values(level=levels[category_id]))
+
+    changed = len(extra) + len(missing) + len(wrong_levels)
+    if changed:
+        logger.info("Дерево категорий (%s) исправлено, строк: %s", kind, changed)
+    return changed
+
+
+def sync_all_closures() -> int:
+    """
+    Проверяет деревья категорий доходов и расходов (выполняется при запуске бота).
+
+    :return: Количество исправленных строк.
+    """
+    changed = 0
+    db = SessionLocal()
+    try:
+        for kind in CATEGORY_KINDS:
+            changed += sync_closure(db, kind)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return changed
+
+
+def print_tree(db: Session, kind: str):
+    """Печатает дерево категорий с отступами по уровню."""
+    model, _ = CATEGORY_KINDS[kind]
+    # Путь от корня (названия предков) задает порядок обхода в глубину
+    rows = db.execute(select(model.id, model.name, model.parent_id, model.level)).all()
+    by_id = {row.id: row for row in rows}
+
+    def path(row):
+        names = []
+        while row is not None:
+            names.append((row.name or "", row.id))
+            row = by_id.get(row.parent_id)
+        return names[::-1]
+
+    for row in sorted(rows, key=path):
+        print(f"{'    ' * row.level}{row.name} (id={row.id})")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Управление деревом категорий доходов и расходов')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add_parser = commands.add_parser('add', help='добавить категорию')
+    add_parser.add_argument('kind', choices=CATEGORY_KINDS)
+    add_parser.add_argument('name', help='название категории')
+    add_parser.add_argument('--parent', type=int, help='ID родительской категории')
+    tree_parser = commands.add_parser('tree', help='показать дерево категорий')
+    tree_parser.add_argument('kind', choices=CATEGORY_KINDS)
+    commands.add_parser('sync', help='пересобрать таблицы замыкания по parent_id')
+    args = parser.parse_args()
+
+    if args.command == 'sync':
+        print(f"Исправлено строк: {sync_all_closures()}")
+    else:
+        session = SessionLocal()
+        try:
+            if args.command == 'add':
+                print(f"Создана категория с ID {add_category(session, args.kind, args.name, args.parent)}")
+                session.commit()
+            else:
+                print_tree(session, args.kind)
+        finally:
+            session.close()
@@ -1,5 +1,7 @@
+import os
+
 from aiogram import Bot
-from aiogram.types import BotCommand, BotCommandScopeDefault
+from aiogram.types import BotCommand, BotCommandScopeDefault, BotCommandScopeChat
 
 
 async def set_commands(bot: Bot) -> None:
@@ -11,6 +13,17 @@ async def set_commands(bot: Bot) -> None:
     - /register: Регистрация в приложении.
     - /help: Помощь по работе с ботом.
     - /contact: Контактная информация.
+    - /recurring: Регулярные операции.
+    - /digest: Настройка периодической сводки.
+    - /backup: Резервная копия данных.
+    - /restore: Восстановление из резервной копии.
+    - /group: Общий бюджет.
+    - /budget: Бюджеты категорий.
+
+    Администратору (TELEGRAM_ADMIN_ID) дополнительно показываются команды статистики:
+    - /admin: Активные пользователи и регистрации.
+    - /admin_volume: Операции по дням.
+    - /admin_categories: Популярные категории.
     """
     commands = [
         BotCommand(
@@ -29,6 +42,48 @@ async def set_commands(bot: Bot) -> None:
             command='contact',
             description='Наши контакты'
         ),
+        BotCommand(
+            command='recurring',
+            description='Регулярные операции'
+        ),
+        BotCommand(
+            command='digest',
+            description='Периодическая сводка'
+        ),
+        BotCommand(
+            command='backup',
+            description='Резервная копия данных'
+        ),
+        BotCommand(
+            command='restore',
+            description='Восстановить из резервной копии'
+        ),
+        BotCommand(
+            command='group',
+            description='Общий бюджет'
+        ),
+        BotCommand(
+            command='budget',
+            description='Бюджеты категорий'
+        ),
     ]
 
     await bot.set_my_commands(commands, BotCommandScopeDefault())
+
+    admin_id = os.getenv('TELEGRAM_ADMIN_ID')
+    if admin_id:
+        admin_commands = commands + [
+            BotCommand(
+                command='admin',
+                description='Статистика: пользователи'
+            ),
+            BotCommand(
+                command='admin_volume',
+                description='Статистика: операции по дням'
+            ),
+            BotCommand(
+                command='admin_categories',
+                description='Статистика: категории'
+            ),
+        ]
+        await bot.set_my_commands(admin_commands, BotCommandScopeChat(chat_id=int(admin_id)))
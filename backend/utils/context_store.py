@@ -0,0 +1,156 @@
+import sys
+import time
+
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from utils.metrics import metrics
+
+# Глубина, до которой учитываются вложенные объекты при оценке размера значения
+SIZEOF_DEPTH = 3
+
+_MISSING = object()
+
+
+def sizeof(value: Any, depth: int = SIZEOF_DEPTH) -> int:
+    """
+    Оценивает объем памяти, занимаемый значением, через sys.getsizeof.
+
+    Учитываются элементы контейнеров и атрибуты объектов до глубины depth;
+    общие объекты (строки-константы, числа) могут быть посчитаны несколько раз,
+    поэтому оценка приблизительная и служит для метрик, а не для учета байтов.
+
+    :param value: Значение.
+    :param depth: Глубина обхода вложенных объектов.
+    :return: Размер в байтах.
+    """
+    size = sys.getsizeof(value)
+    if depth <= 0:
+        return size
+    if isinstance(value, dict):
+        size += sum(sizeof(k, depth - 1) + sizeof(v, depth - 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sizeof(item, depth - 1) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += sizeof(vars(value), depth - 1)
+    return size
+
+
+class ContextStore:
+    """
+    Ограниченное хранилище состояния пользователей в памяти процесса.
+
+    Заменяет модульные словари вида {tg_id: значение}, которые растут без
+    ограничений, если пользователь не завершил сценарий. У каждого ключа есть
+    срок жизни (TTL), при превышении max_size вытесняется давно не
+    использовавшийся ключ (LRU). Число ключей, оценка занимаемой памяти и
+    количество вытеснений публикуются в метриках context.<name>.*.
+
+    :param name: Название хранилища (для метрик).
+    :param ttl: Срок жизни ключа в секундах.
+    :param max_size: Максимальное количество ключей.
+    :param sliding: Продлевать срок жизни ключа при каждом чтении.
+    """
+
+    def __init__(self, name: str, ttl: float, max_size: int = 10000, sliding: bool = False):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sliding = sliding
+        # ключ -> (срок, значение, размер); порядок — от давно использованных к недавним
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._size_gauge = metrics.gauge(f"context.{name}.size")
+        self._bytes_gauge = metrics.gauge(f"context.{name}.bytes")
+        self._evicted = metrics.counter(f"context.{name}.evicted")
+        self._expired = metrics.counter(f"context.{name}.expired")
+
+    def _update_gauges(self):
+        self._size_gauge.set(len(self._items))
+        self._bytes_gauge.set(self._bytes)
+
+    def _remove(self, key: Hashable):
+        _, value, size = self._items.pop(key)
+        self._bytes -= size
+        return value
+
+    def _purge_expired(self, now: float):
+        """Удаляет просроченные ключи с начала очереди (там самые старые)."""
+        expired = 0
+        while self._items:
+            key, (deadline, _, _) = next(iter(self._items.items()))
+            if deadline > now:
+                # Без скользящего TTL порядок LRU может не совпадать с порядком сроков,
+                # оставшиеся просроченные ключи удалятся при обращении к ним
+                break
+            self._remove(key)
+            expired += 1
+        if expired:
+            self._expired.inc(expired)
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """
+        Сохраняет значение.
+
+        :param key: Ключ (обычно Telegram ID пользователя).
+        :param value: Значение.
+        :param ttl: Срок жизни в секундах (по умолчанию — ttl хранилища).
+        """
+        now = time.monotonic()
+        if key in self._items:
+            self._remove(key)
+        self._purge_expired(now)
+        while len(self._items) >= self.max_size:
+            self._remove(next(iter(self._items)))
+            self._evicted.inc()
+        size = sizeof(key) + sizeof(value)
+        self._items[key] = (now + (self.ttl if ttl is None else ttl), value, size)
+        self._bytes += size
+        self._update_gauges()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Возвращает значение или default, если ключа нет или срок его жизни истек.
+
+        :param key: Ключ.
+        :param default: Значение по умолчанию.
+        """
+        item = self._items.get(key)
+        if item is None:
+            return default
+        deadline, value, size = item
+        now = time.monotonic()
+        if deadline <= now:
+            self._remove(key)
+            self._expired.inc()
+            self._update_gauges()
+            return default
+        if self.sliding:
+            self._items[key] = (now + self.ttl, value, size)
+        self._items.move_to_end(key)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Удаляет ключ и возвращает его значение (default, если ключа нет или он просрочен).
+
+        :param key: Ключ.
+        :param default: Значение по умолчанию.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._remove(key)
+        self._update_gauges()
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def memory(self) -> int:
+        """Оценка памяти, занимаемой ключами и значениями, в байтах."""
+        return self._bytes
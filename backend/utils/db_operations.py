@@ -1,40 +1,164 @@
+import calendar
 import logging
 
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import select, func, bindparam, or_, and_, literal
+from sqlalchemy.orm import aliased
 
 from models.income import Income
 from models.expense import Expense
-from models.categories import IncomeCategory, ExpenseCategory
+from models.categories import IncomeCategory, ExpenseCategory, IncomeCategoryClosure, ExpenseCategoryClosure
+from models.user import User
+from utils.archive import get_archived_totals
 
 
 logger = logging.getLogger(__name__)
 
+# Запросы статистики собираются один раз при импорте модуля: при вызове
+# подставляются только параметры, а скомпилированный SQL берется из кэша
+# SQLAlchemy без повторного построения ORM-запроса.
+
+# Уровень дерева категорий, до которого по умолчанию сворачиваются суммы (0 — верхний)
+ROLLUP_LEVEL = 0
+
+
+def _rollup_totals(model, category_model, closure_model):
+    """
+    Собирает запрос сумм по категориям, свернутым до уровня bindparam("level").
+
+    Операция относится к своему предку на этом уровне, а если ее категория
+    лежит выше — к самой категории. Нужная строка таблицы замыкания
+    находится одним соединением, без рекурсивного обхода дерева. Соединения
+    внешние: операция категории, для которой замыкание еще не пересобрано,
+    относится к самой категории, операция без категории — к «Без категории».
+    """
+    ancestor = aliased(category_model)
+    level = bindparam("level")
+    name = func.coalesce(ancestor.name, literal("Без категории"))
+    return select(name, func.sum(model.amount)) \
+        .outerjoin(closure_model, closure_model.descendant_id == model.category_id) \
+        .outerjoin(ancestor, ancestor.id == func.coalesce(closure_model.ancestor_id, model.category_id)) \
+        .where(model.user_id == bindparam("user_id"),
+               model.date.between(bindparam("start_date"), bindparam("end_date")),
+               or_(ancestor.level == level, and_(closure_model.depth == 0, ancestor.level < level),
+                   closure_model.ancestor_id.is_(None))) \
+        .group_by(name)
+
+
+INCOME_TOTALS = _rollup_totals(Income, IncomeCategory, IncomeCategoryClosure)
+
+INCOME_DETAILS = select(Income.date, IncomeCategory.name, Income.description, Income.amount) \
+    .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
+    .where(Income.user_id == bindparam("user_id"),
+           Income.date.between(bindparam("start_date"), bindparam("end_date"))) \
+    .order_by(Income.date)
+
+EXPENSE_TOTALS = _rollup_totals(Expense, ExpenseCategory, ExpenseCategoryClosure)
+
+EXPENSE_DETAILS = select(Expense.date, ExpenseCategory.name, Expense.description, Expense.amount) \
+    .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
+    .where(Expense.user_id == bindparam("user_id"),
+           Expense.date.between(bindparam("start_date"), bindparam("end_date"))) \
+    .order_by(Expense.date)
+
+USER_BY_TG_ID = select(User.id).where(User.tg_id == bindparam("tg_id"))
+
+
+def get_month_range(day):
+    """
+    Возвращает первый и последний день месяца.
+
+    Обе границы передаются в запросы, чтобы PostgreSQL обращался только
+    к секции нужного месяца.
+
+    :param day: Любая дата месяца.
+    :return: Кортеж (первый день, последний день).
+    """
+    start_of_month = day.replace(day=1)
+    days_in_month = calendar.monthrange(day.year, day.month)[1]
+    return start_of_month, day.replace(day=days_in_month)
+
+
+def get_week_range(day):
+    """
+    Возвращает понедельник и воскресенье недели.
+
+    :param day: Любая дата недели.
+    :return: Кортеж (понедельник, воскресенье).
+    """
+    start_of_week = day - timedelta(days=day.weekday())
+    return start_of_week, start_of_week + timedelta(days=6)
+
+
+def get_user_id(db: Session, tg_id: int):
+    """
+    Находит пользователя по Telegram ID.
+
+    :param db: Сессия базы данных.
+    :param tg_id: Telegram ID пользователя.
+    :return: Строка с атрибутом id или None, если пользователь не найден.
+    """
+    return db.execute(USER_BY_TG_ID, {"tg_id": tg_id}).first()
+
+
+def get_totals(db: Session, totals_stmt, details_stmt, user_id: int, start_date, end_date, level: int = ROLLUP_LEVEL):
+    """
+    Выполняет пару запросов статистики (суммы по категориям и детальный список).
+
+    Суммы сворачиваются до категорий уровня level, в детальном списке
+    остаются исходные категории операций.
+
+    :param db: Сессия базы данных.
+    :param totals_stmt: Запрос сумм по категориям (INCOME_TOTALS или EXPENSE_TOTALS).
+    :param details_stmt: Запрос детального списка (INCOME_DETAILS или EXPENSE_DETAILS).
+    :param user_id: ID пользователя.
+    :param start_date: Начальная дата (включительно).
+    :param end_date: Конечная дата (включительно).
+    :param level: Уровень дерева категорий для сумм (0 — верхний).
+    :return: Кортеж (общая сумма, {категория: сумма}, [(дата, категория, описание, сумма)]).
+    """
+    params = {"user_id": user_id, "start_date": start_date, "end_date": end_date}
+    category_totals = dict(db.execute(totals_stmt, {**params, "level": level}).all())
+    details = db.execute(details_stmt, params).all()
+    return sum(category_totals.values()) if category_totals else 0, category_totals, details
+
+
+def get_totals_with_archive(db: Session, kind: str, totals_stmt, details_stmt, user_id: int, start_date, end_date,
+                            level: int = ROLLUP_LEVEL):
+    """
+    То же, что get_totals, но с учетом операций, перенесенных в архив (utils/archive.py).
+
+    Если архивных файлов за период нет, результат совпадает с get_totals.
+
+    :param db: Сессия базы данных.
+    :param kind: Тип операций ("income" или "expense").
+    :param totals_stmt: Запрос сумм по категориям.
+    :param details_stmt: Запрос детального списка.
+    :param user_id: ID пользователя.
+    :param start_date: Начальная дата (включительно).
+    :param end_date: Конечная дата (включительно).
+    :param level: Уровень дерева категорий для сумм (0 — верхний).
+    :return: Кортеж (общая сумма, {категория: сумма}, [(дата, категория, описание, сумма)]).
+    """
+    total, category_totals, details = get_totals(db, totals_stmt, details_stmt, user_id, start_date, end_date, level)
+    archived_totals, archived_details = get_archived_totals(db, kind, user_id, start_date, end_date, level)
+    if not archived_details:
+        return total, category_totals, details
+
+    for category, amount in archived_totals.items():
+        category_totals[category] = category_totals.get(category, 0) + amount
+    # Архивные операции всегда старше операций в базе
+    return sum(category_totals.values()), category_totals, archived_details + list(details)
+
+
 def get_daily_income(user_id: int, db: Session):
     """Получает сумму доходов пользователя за текущий день с разбивкой по категориям и детальными данными."""
     try:
         today = datetime.today().date()
-
-        # Группировка по категориям
-        incomes_grouped = db.query(IncomeCategory.name, func.sum(Income.amount)) \
-            .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
-            .filter(Income.user_id == user_id, Income.date == today) \
-            .group_by(IncomeCategory.name) \
-            .all()
-
-        total_income = sum(amount for _, amount in incomes_grouped) if incomes_grouped else 0
-        category_incomes = {category: amount for category, amount in incomes_grouped} if incomes_grouped else {}
-
-        # Детальный список доходов за день
-        detailed_incomes = db.query(Income.date, IncomeCategory.name, Income.description, Income.amount) \
-            .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
-            .filter(Income.user_id == user_id, Income.date == today) \
-            .all()
-
-        return total_income, category_incomes, detailed_incomes
+        return get_totals(db, INCOME_TOTALS, INCOME_DETAILS, user_id, today, today)
     except Exception as e:
-        logger.error(f"Ошибка при получении дневного дохода: {e}")
+        logger.error("Ошибка при получении дневного дохода: %s", e)
         return 0, {}, []
 
 
@@ -42,186 +166,61 @@ def get_daily_expenses(user_id: int, db: Session):
     """Получает сумму расходов пользователя за текущий день с разбивкой по категориям и детальными данными."""
     try:
         today = datetime.today().date()
-
-        # Группировка по категориям
-        expenses_grouped = db.query(ExpenseCategory.name, func.sum(Expense.amount)) \
-            .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
-            .filter(Expense.user_id == user_id, Expense.date == today) \
-            .group_by(ExpenseCategory.name) \
-            .all()
-
-        total_expense = sum(amount for _, amount in expenses_grouped) if expenses_grouped else 0
-        category_expenses = {category: amount for category, amount in expenses_grouped} if expenses_grouped else {}
-
-        # Детальный список расходов за день
-        detailed_expenses = db.query(Expense.date, ExpenseCategory.name, Expense.description, Expense.amount) \
-            .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
-            .filter(Expense.user_id == user_id, Expense.date == today) \
-            .all()
-
-        return total_expense, category_expenses, detailed_expenses
+        return get_totals(db, EXPENSE_TOTALS, EXPENSE_DETAILS, user_id, today, today)
     except Exception as e:
-        logger.error(f"Ошибка при получении дневных расходов: {e}")
+        logger.error("Ошибка при получении дневных расходов: %s", e)
         return 0, {}, []
 
 def get_weekly_income(user_id: int, db: Session):
     """Получает сумму доходов пользователя за текущую неделю с разбивкой по категориям и детальными данными."""
     try:
-        today = datetime.today().date()
-        start_of_week = today - timedelta(days=today.weekday())  # Понедельник
-        end_of_week = start_of_week + timedelta(days=6)  # Воскресенье
-
-        # Группировка по категориям
-        incomes_grouped = db.query(IncomeCategory.name, func.sum(Income.amount)) \
-            .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
-            .filter(Income.user_id == user_id, Income.date.between(start_of_week, end_of_week)) \
-            .group_by(IncomeCategory.name) \
-            .all()
-
-        total_income = sum(amount for _, amount in incomes_grouped) if incomes_grouped else 0
-        category_incomes = {category: amount for category, amount in incomes_grouped} if incomes_grouped else {}
-
-        # Детальный список доходов за неделю
-        detailed_incomes = db.query(Income.date, IncomeCategory.name, Income.description, Income.amount) \
-            .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
-            .filter(Income.user_id == user_id, Income.date.between(start_of_week, end_of_week)) \
-            .order_by(Income.date) \
-            .all()
-
-        return total_income, category_incomes, detailed_incomes
+        start_of_week, end_of_week = get_week_range(datetime.today().date())
+        return get_totals(db, INCOME_TOTALS, INCOME_DETAILS, user_id, start_of_week, end_of_week)
     except Exception as e:
-        logger.error(f"Ошибка при получении недельного дохода: {e}")
+        logger.error("Ошибка при получении недельного дохода: %s", e)
         return 0, {}, []
 
 
 def get_weekly_expenses(user_id: int, db: Session):
     """Получает сумму расходов пользователя за текущую неделю с разбивкой по категориям и детальными данными."""
     try:
-        today = datetime.today().date()
-        start_of_week = today - timedelta(days=today.weekday())
-
-        # Группировка по категориям
-        expenses_grouped = db.query(ExpenseCategory.name, func.sum(Expense.amount)) \
-            .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
-            .filter(Expense.user_id == user_id, Expense.date >= start_of_week) \
-            .group_by(ExpenseCategory.name) \
-            .all()
-
-        total_expense = sum(amount for _, amount in expenses_grouped) if expenses_grouped else 0
-        category_expenses = {category: amount for category, amount in expenses_grouped} if expenses_grouped else {}
-
-        # Детальный список расходов за неделю
-        detailed_expenses = db.query(Expense.date, ExpenseCategory.name, Expense.description, Expense.amount) \
-            .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
-            .filter(Expense.user_id == user_id, Expense.date >= start_of_week) \
-            .all()
-
-        return total_expense, category_expenses, detailed_expenses
+        start_of_week, end_of_week = get_week_range(datetime.today().date())
+        return get_totals(db, EXPENSE_TOTALS, EXPENSE_DETAILS, user_id, start_of_week, end_of_week)
     except Exception as e:
-        logger.error(f"Ошибка при получении недельных расходов: {e}")
+        logger.error("Ошибка при получении недельных расходов: %s", e)
         return 0, {}, []
 
 def get_monthly_income(user_id: int, db: Session):
     """Получает полную статистику доходов пользователя за текущий месяц (сумму по категориям и детальную информацию)."""
     try:
-        today = datetime.today().date()
-        start_of_month = today.replace(day=1)
-        end_of_month = (start_of_month.replace(month=today.month % 12 + 1, day=1) - timedelta(days=1))
-
-        # Группировка по категориям
-        incomes_grouped = db.query(IncomeCategory.name, func.sum(Income.amount)) \
-            .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
-            .filter(Income.user_id == user_id, Income.date.between(start_of_month, end_of_month)) \
-            .group_by(IncomeCategory.name) \
-            .all()
-
-        total_income = sum(amount for _, amount in incomes_grouped) if incomes_grouped else 0
-        category_incomes = {category: amount for category, amount in incomes_grouped} if incomes_grouped else {}
-
-        # Детальный список доходов за месяц
-        detailed_incomes = db.query(Income.date, IncomeCategory.name, Income.description, Income.amount) \
-            .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
-            .filter(Income.user_id == user_id, Income.date.between(start_of_month, end_of_month)) \
-            .order_by(Income.date) \
-            .all()
-
-        return total_income, category_incomes, detailed_incomes
+        start_of_month, end_of_month = get_month_range(datetime.today().date())
+        return get_totals(db, INCOME_TOTALS, INCOME_DETAILS, user_id, start_of_month, end_of_month)
     except Exception as e:
-        logger.error(f"Ошибка при получении месячного дохода: {e}")
+        logger.error("Ошибка при получении месячного дохода: %s", e)
         return 0, {}, []
 
 def get_monthly_expenses(user_id: int, db: Session):
     """Получает сумму расходов пользователя за текущий месяц с разбивкой по категориям и детальными данными."""
     try:
-        today = datetime.today().date()
-        start_of_month = today.replace(day=1)
-
-        # Группировка по категориям
-        expenses_grouped = db.query(ExpenseCategory.name, func.sum(Expense.amount)) \
-            .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
-            .filter(Expense.user_id == user_id, Expense.date >= start_of_month) \
-            .group_by(ExpenseCategory.name) \
-            .all()
-
-        total_expense = sum(amount for _, amount in expenses_grouped) if expenses_grouped else 0
-        category_expenses = {category: amount for category, amount in expenses_grouped} if expenses_grouped else {}
-
-        # Детальный список расходов за месяц
-        detailed_expenses = db.query(Expense.date, ExpenseCategory.name, Expense.description, Expense.amount) \
-            .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
-            .filter(Expense.user_id == user_id, Expense.date >= start_of_month) \
-            .all()
-
-        return total_expense, category_expenses, detailed_expenses
+        start_of_month, end_of_month = get_month_range(datetime.today().date())
+        return get_totals(db, EXPENSE_TOTALS, EXPENSE_DETAILS, user_id, start_of_month, end_of_month)
     except Exception as e:
-        logger.error(f"Ошибка при получении месячных расходов: {e}")
+        logger.error("Ошибка при получении месячных расходов: %s", e)
         return 0, {}, []
 
 def get_income_in_date_range(user_id: int, start_date: datetime, end_date: datetime, db: Session):
     """Получает сумму доходов пользователя за заданный диапазон дат с разделением по категориям и детальными данными."""
     try:
-        # Группировка по категориям
-        incomes_grouped = db.query(IncomeCategory.name, func.sum(Income.amount)) \
-            .join(Income.category) \
-            .filter(Income.user_id == user_id, Income.date >= start_date, Income.date <= end_date) \
-            .group_by(IncomeCategory.name) \
-            .all()
-
-        total_income = sum(amount for _, amount in incomes_grouped) if incomes_grouped else 0
-        category_income = {category: amount for category, amount in incomes_grouped} if incomes_grouped else {}
-
-        # Детализированные данные по доходам за диапазон дат
-        detailed_incomes = db.query(Income.date, IncomeCategory.name, Income.description, Income.amount) \
-            .join(IncomeCategory, Income.category_id == IncomeCategory.id) \
-            .filter(Income.user_id == user_id, Income.date >= start_date, Income.date <= end_date) \
-            .all()
-
-        return total_income, category_income, detailed_incomes
+        return get_totals_with_archive(db, "income", INCOME_TOTALS, INCOME_DETAILS, user_id, start_date, end_date)
     except Exception as e:
-        logger.error(f"Ошибка при получении дохода за период {start_date} - {end_date}: {e}")
+        logger.error("Ошибка при получении дохода за период %s - %s: %s", start_date, end_date, e)
         return 0, {}, []
 
 
 def get_expenses_in_date_range(user_id: int, start_date: datetime, end_date: datetime, db: Session):
     """Получает сумму расходов пользователя за заданный диапазон дат с разделением по категориям и детальными данными."""
     try:
-        # Группировка по категориям
-        expenses_grouped = db.query(ExpenseCategory.name, func.sum(Expense.amount)) \
-            .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
-            .filter(Expense.user_id == user_id, Expense.date >= start_date, Expense.date <= end_date) \
-            .group_by(ExpenseCategory.name) \
-            .all()
-
-        total_expense = sum(amount for _, amount in expenses_grouped) if expenses_grouped else 0
-        category_expenses = {category: amount for category, amount in expenses_grouped} if expenses_grouped else {}
-
-        # Детальный список расходов за диапазон дат
-        detailed_expenses = db.query(Expense.date, ExpenseCategory.name, Expense.description, Expense.amount) \
-            .join(ExpenseCategory, Expense.category_id == ExpenseCategory.id) \
-            .filter(Expense.user_id == user_id, Expense.date >= start_date, Expense.date <= end_date) \
-            .all()
-
-        return total_expense, category_expenses, detailed_expenses
+        return get_totals_with_archive(db, "expense", EXPENSE_TOTALS, EXPENSE_DETAILS, user_id, start_date, end_date)
     except Exception as e:
-        logger.error(f"Ошибка при получении расходов за период {start_date} - {end_date}: {e}")
+        logger.error("Ошибка при получении расходов за период %s - %s: %s", start_date, end_date, e)
         return 0, {}, []
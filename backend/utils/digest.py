@@ -0,0 +1,224 @@
+import asyncio
+import calendar
+import logging
+import time
+
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import select, update, union_all, func, or_
+from sqlalchemy.orm import Session
+
+from models.database import SessionLocal
+from models.income import Income
+from models.expense import Expense
+from models.user import User
+from utils.categories import top_level_operations
+from utils.formatting import format_category_totals
+from utils.sender import MessageSender
+
+logger = logging.getLogger(__name__)
+
+# Названия периодов сводки
+DIGEST_PERIODS = {
+    "daily": "за день",
+    "weekly": "за неделю",
+    "monthly": "за месяц",
+}
+# Как часто писать в лог прогресс рассылки
+PROGRESS_STEP = 1000
+# Сколько получателей сводки обрабатывается одним запросом сумм
+DIGEST_BATCH_SIZE = 1000
+
+_users = User.__table__
+
+
+def get_digest_range(period: str, today: date):
+    """
+    Возвращает диапазон дат, за который строится сводка.
+
+    :param period: Период сводки ("daily", "weekly", "monthly").
+    :param today: Текущая дата.
+    :return: Кортеж (начальная дата, конечная дата).
+    """
+    if period == "weekly":
+        return today - timedelta(days=today.weekday()), today
+    if period == "monthly":
+        return today.replace(day=1), today
+    return today, today
+
+
+def due_digest_periods(today: date):
+    """
+    Определяет, какие сводки нужно отправить сегодня.
+
+    Ежедневная сводка отправляется каждый день, еженедельная — в воскресенье,
+    ежемесячная — в последний день месяца.
+
+    :param today: Текущая дата.
+    :return: Список периодов.
+    """
+    periods = ["daily"]
+    if today.weekday() == 6:
+        periods.append("weekly")
+    if today.day == calendar.monthrange(today.year, today.month)[1]:
+        periods.append("monthly")
+    return periods
+
+
+def claim_digest_recipients(db: Session, period: str, today: date) -> dict:
+    """
+    Отмечает сводку как отправленную и возвращает получателей одним UPDATE ... RETURNING.
+
+    Пользователь, которому сводка за сегодня уже отправлена (в том числе
+    другой репликой бота), повторно не выбирается.
+
+    :param db: Сессия базы данных.
+    :param period: Период сводки.
+    :param today: Текущая дата.
+    :return: Словарь {user_id: tg_id}.
+    """
+    rows = db.execute(
+        update(_users)
+        .where(
+            _users.c.digest_period == period,
+            or_(_users.c.digest_last_sent.is_(None), _users.c.digest_last_sent < today),
+        )
+        .values(digest_last_sent=today)
+        .returning(_users.c.id, _users.c.tg_id)
+    ).all()
+    return {user_id: tg_id for user_id, tg_id in rows}
+
+
+def collect_digest_totals(db: Session, user_ids, start_date: date, end_date: date) -> dict:
+    """
+    Считает суммы по категориям для получателей сводки.
+
+    Доходы и расходы объединяются через UNION ALL и группируются
+    по (user_id, kind, category) за один проход; в запрос попадают только
+    операции получателей, которых выбрала эта реплика, пачками по
+    DIGEST_BATCH_SIZE пользователей.
+
+    :param db: Сессия базы данных.
+    :param user_ids: ID получателей сводки.
+    :param start_date: Начальная дата.
+    :param end_date: Конечная дата.
+    :return: Словарь {user_id: {"income": {категория: сумма}, "expense": {категория: сумма}}}.
+    """
+    user_ids = sorted(user_ids)
+    totals = defaultdict(lambda: {"income": {}, "expense": {}})
+    for offset in range(0, len(user_ids), DIGEST_BATCH_SIZE):
+        batch = user_ids[offset:offset + DIGEST_BATCH_SIZE]
+        # Суммы сворачиваются до категорий верхнего уровня через таблицу замыкания
+        incomes = top_level_operations(Income, "income") \
+            .where(Income.user_id.in_(batch), Income.date.between(start_date, end_date))
+        expenses = top_level_operations(Expense, "expense") \
+            .where(Expense.user_id.in_(batch), Expense.date.between(start_date, end_date))
+
+        transactions = union_all(incomes, expenses).subquery()
+        stmt = select(
+            transactions.c.user_id, transactions.c.kind, transactions.c.category,
+            func.sum(transactions.c.amount),
+        ).group_by(transactions.c.user_id, transactions.c.kind, transactions.c.category)
+
+        for user_id, kind, category, amount in db.execute(stmt):
+            totals[user_id][kind][category] = amount
+    return totals
+
+
+def build_digest_message(period: str, start_date: date, end_date: date, user_totals: dict) -> str:
+    """
+    Формирует текст сводки в формате MarkdownV2.
+
+    :param period: Период сводки.
+    :param start_date: Начальная дата.
+    :param end_date: Конечная дата.
+    :param user_totals: Суммы пользователя {"income": {...}, "expense": {...}}.
+    :return: Текст сообщения.
+    """
+    if start_date == end_date:
+        period_text = start_date.strftime('%d.%m.%Y')
+    else:
+        period_text = f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
+
+    incomes = user_totals.get("income") or {}
+    expenses = user_totals.get("expense") or {}
+    if not incomes and not expenses:
+        return f"🗓 Сводка {DIGEST_PERIODS[period]}: операций нет\\."
+
+    message = format_category_totals(f"Доходы {DIGEST_PERIODS[period]}", period_text, "💰", sum(incomes.values()), incomes)
+    message += "\n"
+    message += format_category_totals(f"Расходы {DIGEST_PERIODS[period]}", period_text, "💸", sum(expenses.values()), expenses)
+    return message
+
+
+def _load_digests(period: str, today: date):
+    """Выбирает получателей и суммы для сводки в одной транзакции."""
+    start_date, end_date = get_digest_range(period, today)
+    db = SessionLocal()
+    try:
+        recipients = claim_digest_recipients(db, period, today)
+        totals = collect_digest_totals(db, recipients, start_date, end_date)
+        db.commit()
+        return start_date, end_date, recipients, totals
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def send_digests(sender: MessageSender, period: str, today: date) -> int:
+    """
+    Рассылает сводку за период всем подписчикам через очередь с ограничением частоты.
+
+    :param sender: Очередь исходящих сообщений.
+    :param period: Период сводки.
+    :param today: Текущая дата.
+    :return: Количество успешно отправленных сводок.
+    """
+    start_date, end_date, recipients, totals = await asyncio.to_thread(_load_digests, period, today)
+    if not recipients:
+        return 0
+
+    started = time.monotonic()
+    futures = [
+        sender.send(tg_id, build_digest_message(period, start_date, end_date, totals.get(user_id, {})),
+                    parse_mode="MarkdownV2")
+        for user_id, tg_id in recipients.items()
+    ]
+    logger.info("Сводка '%s': в очереди %s сообщений", period, len(futures))
+
+    sent = failed = 0
+    for done, future in enumerate(asyncio.as_completed(futures), 1):
+        try:
+            await future
+            sent += 1
+        except Exception:
+            failed += 1
+        if done % PROGRESS_STEP == 0:
+            elapsed = time.monotonic() - started
+            logger.info("Сводка '%s': %s/%s, %.1f сообщ./с", period, done, len(futures), done / elapsed)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        "Сводка '%s' завершена: отправлено %s, ошибок %s, за %.1f с (%.1f сообщ./с)",
+        period, sent, failed, elapsed, len(futures) / max(elapsed, 1e-9),
+    )
+    return sent
+
+
+async def send_due_digests(sender: MessageSender, send_hour: int):
+    """
+    Отправляет все сводки, которые положено отправить сегодня.
+
+    Запускается планировщиком периодически; до наступления send_hour ничего не делает.
+
+    :param sender: Очередь исходящих сообщений.
+    :param send_hour: Час, начиная с которого отправляются сводки.
+    """
+    now = datetime.now()
+    if now.hour < send_hour:
+        return
+    for period in due_digest_periods(now.date()):
+        await send_digests(sender, period, now.date())
@@ -4,3 +4,7 @@ class HomeworkBotError(Exception):
 
 class APIResponseError(HomeworkBotError):
     """Ошибка при запросе к API."""
+
+
+class BackupError(HomeworkBotError):
+    """Некорректный или поврежденный файл резервной копии."""
@@ -0,0 +1,258 @@
+import logging
+
+from datetime import date, timedelta
+from typing import NamedTuple, Optional, List, Tuple
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from models.categories import ExpenseCategory
+from models.expense import Expense
+from utils.context_store import ContextStore
+from utils.db_operations import get_month_range
+
+logger = logging.getLogger(__name__)
+
+# За сколько дней берется история для подбора модели
+FORECAST_HISTORY_DAYS = 180
+# Сколько полных дней истории нужно, чтобы строить прогноз
+FORECAST_MIN_DAYS = 28
+# Через сколько дней модель подбирается заново (между подборами — только дообучение новыми днями)
+FORECAST_REFIT_DAYS = 7
+# Перебираемые коэффициенты экспоненциального сглаживания
+FORECAST_ALPHAS = np.linspace(0.05, 0.95, 19)
+# Сколько категорий показывать в прогнозе
+MAX_FORECAST_CATEGORIES = 10
+
+# Подобранные модели пользователей; модель неактивного пользователя забывается через сутки
+_states = ContextStore("forecast", ttl=24 * 60 * 60, sliding=True)
+
+
+class ForecastState(NamedTuple):
+    """
+    Подобранная модель трат пользователя (по столбцу на категорию).
+
+    Дневные траты категории = уровень + поправка дня месяца; уровень
+    обновляется экспоненциальным сглаживанием с коэффициентом alpha,
+    поправка — средние траты в этот день месяца минус средние за день.
+
+    Атрибуты:
+    - categories: ID категорий (порядок столбцов).
+    - names: Названия категорий.
+    - alpha: Коэффициенты сглаживания категорий.
+    - level: Текущие уровни дневных трат категорий.
+    - season_sum: Суммы трат по дням месяца (31 x категории).
+    - season_days: Количество учтенных дней с каждым номером дня месяца.
+    - through: Последний учтенный (полный) день.
+    - fitted_on: Дата подбора коэффициентов.
+    """
+    categories: Tuple[int, ...]
+    names: Tuple[str, ...]
+    alpha: np.ndarray
+    level: np.ndarray
+    season_sum: np.ndarray
+    season_days: np.ndarray
+    through: date
+    fitted_on: date
+
+
+class Forecast(NamedTuple):
+    """
+    Прогноз трат на конец месяца.
+
+    Атрибуты:
+    - total: Прогноз суммы расходов за месяц.
+    - spent: Потрачено с начала месяца.
+    - categories: Прогноз по категориям [(название, сумма)] по убыванию суммы.
+    """
+    total: float
+    spent: float
+    categories: List[Tuple[str, float]]
+
+
+def _load_series(db: Session, user_id: int, since: date, until: date):
+    """
+    Дневные суммы расходов пользователя по категориям за даты [since, until] одним запросом.
+
+    :return: Кортеж (дни от 1970-01-01, ID категорий, названия, суммы) в виде массивов.
+    """
+    rows = db.execute(
+        select(Expense.date, Expense.category_id, ExpenseCategory.name, func.sum(Expense.amount))
+        .join(ExpenseCategory, ExpenseCategory.id == Expense.category_id)
+        .where(Expense.user_id == user_id, Expense.date >= since, Expense.date <= until)
+        .group_by(Expense.date, Expense.category_id, ExpenseCategory.name)
+    ).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty(0)
+    days, categories, names, amounts = zip(*rows)
+    return (
+        np.array(days, dtype="datetime64[D]").astype(np.int64),
+        np.array(categories, dtype=np.int64),
+        np.array(names, dtype=object),
+        np.array(amounts, dtype=np.float64),
+    )
+
+
+def _day_number(day: date) -> int:
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+def _days_of_month(first: int, count: int) -> np.ndarray:
+    """Номера дней месяца (0..30) для count дней, начиная с дня first (от 1970-01-01)."""
+    days = np.arange(first, first + count).astype("datetime64[D]")
+    return (days - days.astype("datetime64[M]")).astype(np.int64)
+
+
+def _dense(days: np.ndarray, columns: np.ndarray, amounts: np.ndarray, first: int, count: int,
+           width: int) -> np.ndarray:
+    """Матрица дневных трат (count дней, начиная с first) x width категорий; дни без трат — нули."""
+    matrix = np.zeros(count * width)
+    inside = (days >= first) & (days < first + count)
+    np.add.at(matrix, (days[inside] - first) * width + columns[inside], amounts[inside])
+    return matrix.reshape(count, width)
+
+
+def _season(season_sum: np.ndarray, season_days: np.ndarray) -> np.ndarray:
+    """Поправки дней месяца: средние траты в этот день месяца минус средние траты за день."""
+    mean = season_sum.sum(axis=0) / max(season_days.sum(), 1)
+    by_day = np.divide(season_sum, season_days[:, None], out=np.repeat(mean[None, :], 31, axis=0),
+                       where=season_days[:, None] > 0)
+    return by_day - mean
+
+
+def _fit(series: np.ndarray, days_of_month: np.ndarray):
+    """
+    Подбирает коэффициент сглаживания каждой категории по ошибке прогноза на день вперед.
+
+    Все коэффициенты из FORECAST_ALPHAS и все категории считаются одновременно:
+    цикл идет только по дням истории.
+
+    :param series: Дневные траты (дни x категории).
+    :param days_of_month: Номера дней месяца для строк series.
+    :return: Кортеж (alpha, level, season_sum, season_days).
+    """
+    season_days = np.bincount(days_of_month, minlength=31).astype(np.float64)
+    season_sum = np.zeros((31, series.shape[1]))
+    np.add.at(season_sum, days_of_month, series)
+    deseasonalized = series - _season(season_sum, season_days)[days_of_month]
+
+    alphas = FORECAST_ALPHAS[:, None]
+    level = np.repeat(deseasonalized[:7].mean(axis=0)[None, :], len(FORECAST_ALPHAS), axis=0)
+    errors = np.zeros_like(level)
+    for row in deseasonalized:
+        errors += (row - level) ** 2
+        level += alphas * (row - level)
+
+    best = errors.argmin(axis=0)
+    columns = np.arange(series.shape[1])
+    return FORECAST_ALPHAS[best], level[best, columns], season_sum, season_days
+
+
+def _fold(state: ForecastState, series: np.ndarray, days_of_month: np.ndarray) -> ForecastState:
+    """
+    Дообучает модель новыми полными днями без повторного подбора коэффициентов.
+
+    :param state: Текущая модель (столбцы series соответствуют state.categories).
+    :param series: Траты новых дней (дни x категории).
+    :param days_of_month: Номера дней месяца для строк series.
+    :return: Обновленная модель.
+    """
+    level = state.level.copy()
+    season_sum = state.season_sum.copy()
+    season_days = state.season_days.copy()
+    for row, day_of_month in zip(series, days_of_month):
+        level += state.alpha * (row - _season(season_sum, season_days)[day_of_month] - level)
+        season_sum[day_of_month] += row
+        season_days[day_of_month] += 1
+    return state._replace(level=level, season_sum=season_sum, season_days=season_days)
+
+
+def _with_categories(state: ForecastState, categories: np.ndarray, names: np.ndarray) -> ForecastState:
+    """Добавляет в модель столбцы категорий, которых в ней еще нет (с нулевыми тратами)."""
+    known = set(state.categories)
+    new = {int(category_id): name for category_id, name in zip(categories, names) if int(category_id) not in known}
+    if not new:
+        return state
+    extra = len(new)
+    return state._replace(
+        categories=state.categories + tuple(new),
+        names=state.names + tuple(new.values()),
+        alpha=np.concatenate([state.alpha, np.full(extra, np.median(FORECAST_ALPHAS))]),
+        level=np.concatenate([state.level, np.zeros(extra)]),
+        season_sum=np.hstack([state.season_sum, np.zeros((31, extra))]),
+    )
+
+
+def forecast_month(db: Session, user_id: int, today: date) -> Optional[Forecast]:
+    """
+    Прогнозирует расходы пользователя на конец текущего месяца, всего и по категориям.
+
+    Дневной ряд по категориям загружается одним запросом. При первом
+    обращении (и раз в FORECAST_REFIT_DAYS дней) модель подбирается по
+    истории за FORECAST_HISTORY_DAYS дней; при следующих запрос читает
+    только дни после последнего учтенного, и модель дообучается ими.
+    Исправления расходов за уже учтенные дни попадут в модель при
+    следующем подборе.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param today: Текущая дата.
+    :return: Forecast или None, если истории для прогноза недостаточно.
+    """
+    start_of_month, end_of_month = get_month_range(today)
+    yesterday = _day_number(today) - 1
+    state = _states.get(user_id)
+    if state is not None and (today - state.fitted_on).days >= FORECAST_REFIT_DAYS:
+        state = None
+    if state is None:
+        since = today - timedelta(days=FORECAST_HISTORY_DAYS)
+    else:
+        since = min(start_of_month, state.through + timedelta(days=1))
+    days, categories, names, amounts = _load_series(db, user_id, since, today)
+
+    if state is None:
+        complete = days <= yesterday
+        if not complete.any():
+            return None
+        first = int(days[complete].min())
+        if yesterday - first + 1 < FORECAST_MIN_DAYS:
+            return None
+        ids, columns = np.unique(categories, return_inverse=True)
+        category_names = dict(zip(categories.tolist(), names.tolist()))
+        series = _dense(days, columns, amounts, first, yesterday - first + 1, len(ids))
+        alpha, level, season_sum, season_days = _fit(series, _days_of_month(first, len(series)))
+        state = ForecastState(tuple(ids.tolist()), tuple(category_names[i] for i in ids.tolist()),
+                              alpha, level, season_sum, season_days, today - timedelta(days=1), today)
+        _states.set(user_id, state)
+    elif _day_number(state.through) < yesterday:
+        state = _with_categories(state, categories, names)
+        positions = {category_id: column for column, category_id in enumerate(state.categories)}
+        columns = np.array([positions[category_id] for category_id in categories.tolist()], dtype=np.int64)
+        first = _day_number(state.through) + 1
+        series = _dense(days, columns, amounts, first, yesterday - first + 1, len(state.categories))
+        state = _fold(state, series, _days_of_month(first, len(series)))._replace(through=today - timedelta(days=1))
+        _states.set(user_id, state)
+    state = _with_categories(state, categories, names)
+
+    positions = {category_id: column for column, category_id in enumerate(state.categories)}
+    columns = np.array([positions[category_id] for category_id in categories.tolist()], dtype=np.int64)
+    month_first = _day_number(start_of_month)
+    actual = _dense(days, columns, amounts, month_first, _day_number(today) - month_first + 1,
+                    len(state.categories))
+    spent = actual.sum(axis=0)
+
+    # Оставшиеся дни, включая сегодняшний: из прогноза на сегодня вычитается уже потраченное
+    remaining = _day_number(end_of_month) - _day_number(today) + 1
+    expected = np.clip(
+        state.level + _season(state.season_sum, state.season_days)[_days_of_month(_day_number(today), remaining)],
+        0, None)
+    expected[0] = np.clip(expected[0] - actual[-1], 0, None)
+    totals = spent + expected.sum(axis=0)
+
+    order = np.argsort(-totals)[:MAX_FORECAST_CATEGORIES]
+    return Forecast(
+        total=float(totals.sum()),
+        spent=float(spent.sum()),
+        categories=[(state.names[index], float(totals[index])) for index in order if totals[index] > 0],
+    )
@@ -0,0 +1,44 @@
+import re
+
+
+# Функция для экранирования MarkdownV2
+def escape_markdown_v2(text: str) -> str:
+    """Escapes special characters for proper rendering in MarkdownV2."""
+    # Список символов, которые нужно экранировать
+    escape_chars = r'_*[]()~`>#+-=|{}.!'
+
+    # Экранируем все специальные символы
+    text = re.sub(r'([{}])'.format(re.escape(escape_chars)), r'\\\1', text)
+
+    return text
+
+
+def format_category_totals(title: str, period: str, icon: str, total, category_totals: dict, heading_icon: str = "📅") -> str:
+    """
+    Формирует заголовок статистики с общей суммой и список сумм по категориям (MarkdownV2).
+
+    :param title: Заголовок, например "Доходы за день".
+    :param period: Период в виде строки, например "01.03.2025" или "01.03.2025 - 07.03.2025".
+    :param icon: Значок суммы (💰 для доходов, 💸 для расходов).
+    :param total: Общая сумма.
+    :param category_totals: Словарь {категория: сумма}.
+    :param heading_icon: Значок заголовка.
+    :return: Текст сообщения в формате MarkdownV2.
+    """
+    message = f"{heading_icon} \\*{escape_markdown_v2(title)}\\* \\({escape_markdown_v2(period)}\\):\n{icon} {escape_markdown_v2(str(total))}₽\n\n"
+    for category, amount in category_totals.items():
+        message += f'📌 \\*{escape_markdown_v2(category)}\\*: {escape_markdown_v2(str(amount))}₽\n'
+    return message
+
+
+def format_forecast(forecast) -> str:
+    """
+    Формирует блок прогноза расходов на конец месяца (MarkdownV2).
+
+    :param forecast: Прогноз (utils.forecast.Forecast).
+    :return: Текст блока в формате MarkdownV2.
+    """
+    message = f"\n🔮 \\*Прогноз на конец месяца:\\* {escape_markdown_v2(f'{forecast.total:.2f}')}₽\n"
+    for category, amount in forecast.categories:
+        message += f'📌 {escape_markdown_v2(category)}: {escape_markdown_v2(f"{amount:.2f}")}₽\n'
+    return message
@@ -0,0 +1,156 @@
+import logging
+import secrets
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select, insert, update, delete, union_all, func
+from sqlalchemy.orm import Session
+
+from models.income import Income
+from models.expense import Expense
+from models.group import Group, GroupMember
+from models.user import User
+from utils.categories import top_level_operations
+
+logger = logging.getLogger(__name__)
+
+# Длина кода приглашения в группу
+INVITE_CODE_BYTES = 6
+
+_users = User.__table__
+_groups = Group.__table__
+_members = GroupMember.__table__
+
+
+def create_group(db: Session, user_id: int, name: str) -> tuple:
+    """
+    Создает группу, добавляет в нее создателя и делает ее активной для него.
+
+    Транзакцию фиксирует вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя-создателя.
+    :param name: Название группы.
+    :return: Кортеж (ID группы, код приглашения).
+    """
+    invite_code = secrets.token_urlsafe(INVITE_CODE_BYTES)
+    group_id = db.execute(
+        insert(_groups).values(name=name, owner_id=user_id, invite_code=invite_code).returning(_groups.c.id)
+    ).scalar_one()
+    db.execute(insert(_members).values(group_id=group_id, user_id=user_id, role="owner"))
+    db.execute(update(_users).where(_users.c.id == user_id).values(active_group_id=group_id))
+    logger.info("Пользователь %s создал группу %s", user_id, group_id)
+    return group_id, invite_code
+
+
+def join_group(db: Session, user_id: int, invite_code: str):
+    """
+    Добавляет пользователя в группу по коду приглашения и делает ее активной.
+
+    Повторное вступление в ту же группу только делает ее активной.
+    Транзакцию фиксирует вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param invite_code: Код приглашения.
+    :return: Строка группы (id, name) или None, если код не найден.
+    """
+    group = db.execute(
+        select(_groups.c.id, _groups.c.name).where(_groups.c.invite_code == invite_code.strip())
+    ).first()
+    if group is None:
+        return None
+    is_member = db.execute(
+        select(_members.c.user_id).where(_members.c.group_id == group.id, _members.c.user_id == user_id)
+    ).first()
+    if is_member is None:
+        db.execute(insert(_members).values(group_id=group.id, user_id=user_id, role="member"))
+    db.execute(update(_users).where(_users.c.id == user_id).values(active_group_id=group.id))
+    logger.info("Пользователь %s вступил в группу %s", user_id, group.id)
+    return group
+
+
+def leave_group(db: Session, user_id: int, group_id: int):
+    """
+    Исключает пользователя из группы. Его прошлые операции остаются в статистике группы.
+
+    Транзакцию фиксирует вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param group_id: ID группы.
+    """
+    db.execute(delete(_members).where(_members.c.group_id == group_id, _members.c.user_id == user_id))
+    db.execute(
+        update(_users)
+        .where(_users.c.id == user_id, _users.c.active_group_id == group_id)
+        .values(active_group_id=None)
+    )
+    logger.info("Пользователь %s вышел из группы %s", user_id, group_id)
+
+
+def get_active_group(db: Session, tg_id: int):
+    """
+    Возвращает активную группу пользователя вместе с числом участников.
+
+    :param db: Сессия базы данных.
+    :param tg_id: Telegram ID пользователя.
+    :return: Строка (user_id, group_id, name, invite_code, members) или None, если пользователь
+             не зарегистрирован; group_id равен None, если пользователь не состоит в группе.
+    """
+    counted = _members.alias("counted")
+    members = select(func.count()).select_from(counted).where(counted.c.group_id == _groups.c.id).scalar_subquery()
+    return db.execute(
+        select(_users.c.id.label("user_id"), _groups.c.id.label("group_id"), _groups.c.name,
+               _groups.c.invite_code, members.label("members"))
+        .select_from(_users)
+        .outerjoin(_members, (_members.c.user_id == _users.c.id) & (_members.c.group_id == _users.c.active_group_id))
+        .outerjoin(_groups, _groups.c.id == _members.c.group_id)
+        .where(_users.c.tg_id == tg_id)
+    ).first()
+
+
+def get_group_totals(db: Session, group_id: int, start_date: date, end_date: date) -> dict:
+    """
+    Считает статистику группы за период одним запросом.
+
+    Доходы и расходы группы выбираются по индексам (group_id, date),
+    объединяются через UNION ALL и группируются по (участник, тип, категория
+    верхнего уровня). Суммы по категориям и по участникам складываются из
+    этих строк, поэтому число запросов не зависит от числа участников.
+    Учитываются только операции в базе: статистика строится за текущую
+    неделю или месяц, которые всегда моложе горизонта архивации
+    (group_id архивных операций сохраняется в архивных файлах).
+
+    :param db: Сессия базы данных.
+    :param group_id: ID группы.
+    :param start_date: Начальная дата (включительно).
+    :param end_date: Конечная дата (включительно).
+    :return: {"income"/"expense": {"total": сумма, "categories": {категория: сумма},
+             "members": {ID участника: сумма}}, "names": {ID участника: имя для показа}}.
+    """
+    transactions = union_all(
+        top_level_operations(Income, "income")
+        .where(Income.group_id == group_id, Income.date.between(start_date, end_date)),
+        top_level_operations(Expense, "expense")
+        .where(Expense.group_id == group_id, Expense.date.between(start_date, end_date)),
+    ).subquery()
+    stmt = select(
+        transactions.c.user_id, _users.c.name, transactions.c.kind, transactions.c.category,
+        func.sum(transactions.c.amount),
+    ).join(_users, _users.c.id == transactions.c.user_id) \
+        .group_by(transactions.c.user_id, _users.c.name, transactions.c.kind, transactions.c.category)
+
+    totals = {
+        kind: {"total": Decimal(0), "categories": defaultdict(Decimal), "members": defaultdict(Decimal)}
+        for kind in ("income", "expense")
+    }
+    totals["names"] = {}
+    for user_id, name, kind, category, amount in db.execute(stmt):
+        totals[kind]["total"] += amount
+        totals[kind]["categories"][category] += amount
+        totals[kind]["members"][user_id] += amount
+        totals["names"][user_id] = name or f"Участник {user_id}"
+    return totals
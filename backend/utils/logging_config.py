@@ -0,0 +1,145 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from dotenv import load_dotenv
+from aiogram.types import TelegramObject, Update
+
+# Контекст текущего обновления, добавляемый в каждую запись лога
+update_id_var: ContextVar = ContextVar("update_id", default=None)
+user_id_var: ContextVar = ContextVar("user_id", default=None)
+handler_var: ContextVar = ContextVar("handler", default=None)
+
+logger = logging.getLogger(__name__)
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи лога update_id, пользователя и обработчик текущего обновления."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.update_id = update_id_var.get()
+        record.user_id = user_id_var.get()
+        record.handler = handler_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись лога в одну строку JSON."""
+
+    FIELDS = ("update_id", "user_id", "handler", "latency_ms")
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в вызывающем потоке.
+
+    Стандартный QueueHandler.prepare подставляет аргументы в сообщение до
+    постановки в очередь; здесь это делает фоновый поток QueueListener,
+    поэтому на пути обработки обновления остается только добавление в очередь.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: str = None) -> logging.handlers.QueueListener:
+    """
+    Настраивает логирование: записи попадают в очередь, а форматирование
+    и запись на диск выполняет фоновый поток.
+
+    Параметры берутся из переменных окружения LOG_LEVEL, LOG_FILE,
+    LOG_MAX_BYTES и LOG_BACKUP_COUNT (файл ротируется по размеру).
+
+    :param level: Уровень логирования (по умолчанию LOG_LEVEL или INFO).
+    :return: Запущенный QueueListener (его нужно остановить при завершении работы).
+    """
+    load_dotenv()
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    log_queue = queue.SimpleQueue()
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.getenv("LOG_FILE", "coin_keeper_bot.log"),
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+        backupCount=int(os.getenv("LOG_BACKUP_COUNT", 5)),
+        encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    # SQL-запросы логируются только при явном включении
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class LoggingContextMiddleware(BaseMiddleware):
+    """
+    Outer-middleware обновлений: заполняет контекст логов и пишет время обработки.
+
+    Регистрируется на dp.update.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        update_id_var.set(event.update_id if isinstance(event, Update) else None)
+        user_id_var.set(user.id if user else None)
+        handler_var.set(None)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            logger.info("Обновление обработано за %s мс", latency_ms, extra={"latency_ms": latency_ms})
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Inner-middleware: запоминает имя обработчика для записей лога."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("text_command") or data.get("handler")
+        if handler_object is not None:
+            handler_var.set(getattr(handler_object.callback, "__name__", None))
+        return await handler(event, data)
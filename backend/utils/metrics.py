@@ -0,0 +1,115 @@
+import logging
+import threading
+
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Counter:
+    """Монотонно растущий счетчик."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """Текущее значение величины (глубина очереди, размер кэша и т.п.)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """
+    Распределение значений по последним window наблюдениям.
+
+    Хранит скользящее окно, поэтому перцентили отражают недавнее поведение,
+    а память не растет со временем.
+
+    :param name: Название метрики.
+    :param window: Размер окна наблюдений.
+    """
+
+    def __init__(self, name: str, window: int = 2048):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self._values = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._values.append(value)
+
+    def snapshot(self):
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return {"count": self.count}
+
+        def quantile(q):
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4),
+            "p50": round(quantile(0.5), 4),
+            "p99": round(quantile(0.99), 4),
+            "max": round(values[-1], 4),
+        }
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса. Метрики создаются при первом обращении по имени."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name)
+            return metric
+
+    def counter(self, name: str) -> Counter:
+        return self._get(Counter, name)
+
+    def gauge(self, name: str) -> Gauge:
+        return self._get(Gauge, name)
+
+    def histogram(self, name: str) -> Histogram:
+        return self._get(Histogram, name)
+
+    def snapshot(self) -> dict:
+        """Возвращает текущие значения всех метрик."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def log_snapshot(self):
+        """Пишет текущие значения метрик в лог (используется планировщиком)."""
+        logger.info("Метрики: %s", self.snapshot())
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,45 @@
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.database import RoutingSession
+from utils import sender
+
+logger = logging.getLogger(__name__)
+
+# Ключ session.info, под которым копятся уведомления текущей транзакции
+_PENDING_KEY = "pending_notifications"
+
+
+def notify_after_commit(db: Session, tg_id: int, text: str) -> None:
+    """
+    Откладывает уведомление пользователя до фиксации текущей транзакции.
+
+    Если транзакция откатывается, уведомление не отправляется. Уведомления
+    ставятся в очередь отправки с интерактивным приоритетом; вызывать можно
+    из любого потока (обработчика или задачи планировщика).
+
+    :param db: Сессия базы данных.
+    :param tg_id: Telegram ID пользователя.
+    :param text: Текст уведомления.
+    """
+    db.info.setdefault(_PENDING_KEY, []).append((tg_id, text))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _send_pending(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if sender.message_sender is None:
+        for tg_id, text in pending:
+            logger.info("Уведомление пользователю %s (отправка недоступна): %s", tg_id, text)
+        return
+    for tg_id, text in pending:
+        sender.message_sender.send_threadsafe(tg_id, text, sender.PRIORITY_INTERACTIVE)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_pending(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,249 @@
+import argparse
+import logging
+import re
+
+from datetime import datetime, date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, секционированные по месяцам по столбцу date
+PARTITIONED_TABLES = ("incomes", "expenses")
+# На сколько месяцев вперед заранее создаются секции
+PARTITION_MONTHS_AHEAD = 3
+
+_PARTITION_NAME_RE = re.compile(r"^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$")
+
+
+def add_months(month_start: date, months: int) -> date:
+    """
+    Сдвигает первое число месяца на заданное количество месяцев.
+
+    :param month_start: Первое число месяца.
+    :param months: Количество месяцев (может быть отрицательным).
+    :return: Первое число полученного месяца.
+    """
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month_start: date) -> str:
+    """Возвращает имя месячной секции таблицы, например incomes_y2026m10."""
+    return f"{table}_y{month_start.year:04d}m{month_start.month:02d}"
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    """
+    Проверяет, что таблица секционирована (миграция применена и база — PostgreSQL).
+
+    :param db: Сессия базы данных.
+    :param table: Имя таблицы.
+    :return: True, если таблица секционирована.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": table},
+    ).first() is not None
+
+
+def list_partitions(db: Session, table: str) -> dict:
+    """
+    Возвращает месячные секции таблицы.
+
+    :param db: Сессия базы данных.
+    :param table: Имя секционированной таблицы.
+    :return: Словарь {первое число месяца: имя секции}.
+    """
+    rows = db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    ).scalars()
+
+    partitions = {}
+    for name in rows:
+        match = _PARTITION_NAME_RE.match(name)
+        if match and match["table"] == table:
+            partitions[date(int(match["year"]), int(match["month"]), 1)] = name
+    return partitions
+
+
+def create_month_partition(db: Session, table: str, month_start: date) -> bool:
+    """
+    Создает секцию за месяц и переносит в нее строки этого месяца из секции DEFAULT.
+
+    Секция создается отдельной таблицей с CHECK-ограничением на диапазон, строки
+    переносятся одним DELETE ... RETURNING, после чего таблица подключается через
+    ATTACH PARTITION. Благодаря CHECK новая секция повторно не сканируется,
+    а проверенное ограничение «нет строк за месяц» на секции DEFAULT избавляет
+    ATTACH от ее сканирования под исключительной блокировкой; после подключения
+    оба ограничения удаляются.
+    Запись в секцию DEFAULT блокируется только на время переноса одного месяца;
+    эта же блокировка не дает двум репликам создать секцию одновременно
+    (наличие секции проверяется повторно после ее получения).
+    Транзакцию фиксирует вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param table: Имя секционированной таблицы.
+    :param month_start: Первое число месяца.
+    :return: True, если секция создана, False, если она уже существовала.
+    """
+    if month_start in list_partitions(db, table):
+        return False
+
+    name = partition_name(table, month_start)
+    default = f"{table}_default"
+    bounds = {"start": month_start, "end": add_months(month_start, 1)}
+
+    db.execute(text(f"LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE"))
+    # Другая реплика могла создать секцию, пока мы ждали блокировку
+    if month_start in list_partitions(db, table):
+        return False
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    db.execute(text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_range "
+        f"CHECK (date >= DATE '{bounds['start']}' AND date < DATE '{bounds['end']}')"
+    ))
+    moved = db.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE date >= :start AND date < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds).rowcount
+    db.execute(text(
+        f"ALTER TABLE {default} ADD CONSTRAINT {default}_not_{name} "
+        f"CHECK (NOT (date >= DATE '{bounds['start']}' AND date < DATE '{bounds['end']}')) NOT VALID"
+    ))
+    db.execute(text(f"ALTER TABLE {default} VALIDATE CONSTRAINT {default}_not_{name}"))
+    db.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    ))
+    db.execute(text(f"ALTER TABLE {default} DROP CONSTRAINT {default}_not_{name}"))
+    db.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_range"))
+
+    logger.info("Создана секция %s, перенесено строк: %s", name, moved)
+    return True
+
+
+def ensure_future_partitions(today: date = None, months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """
+    Создает секции на текущий и следующие months_ahead месяцев.
+
+    Запускается планировщиком; если таблицы не секционированы, ничего не делает.
+    Каждая секция создается в отдельной транзакции.
+
+    :param today: Текущая дата (по умолчанию — сегодня).
+    :param months_ahead: На сколько месяцев вперед создавать секции.
+    :return: Количество созданных секций.
+    """
+    current_month = (today or datetime.today().date()).replace(day=1)
+    created = 0
+    for table in PARTITIONED_TABLES:
+        for offset in range(months_ahead + 1):
+            db = SessionLocal()
+            try:
+                if not is_partitioned(db, table):
+                    break
+                created += create_month_partition(db, table, add_months(current_month, offset))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+    return created
+
+
+def migrate_default_partition(table: str) -> int:
+    """
+    Переносит строки из секции DEFAULT (бывшей несекционированной таблицы) в месячные секции.
+
+    Месяцы обрабатываются по одному, от самого старого, каждый в своей
+    транзакции, поэтому перенос можно выполнять на работающей базе
+    и прерывать в любой момент.
+
+    :param table: Имя секционированной таблицы.
+    :return: Количество созданных секций.
+    """
+    created = 0
+    while True:
+        db = SessionLocal()
+        try:
+            if not is_partitioned(db, table):
+                raise ValueError(f"Таблица {table} не секционирована, примените миграции.")
+            oldest = db.execute(text(f"SELECT min(date) FROM {table}_default")).scalar()
+            if oldest is None:
+                return created
+            month_start = oldest.replace(day=1)
+            if month_start in list_partitions(db, table):
+                raise ValueError(f"Секция {partition_name(table, month_start)} уже существует, "
+                                 f"но в секции DEFAULT остались строки за этот месяц.")
+            create_month_partition(db, table, month_start)
+            db.commit()
+            created += 1
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def detach_partitions(table: str, before: date) -> list:
+    """
+    Отключает от таблицы секции за месяцы раньше before.
+
+    Отключенная секция остается обычной таблицей с тем же именем: ее можно
+    выгрузить (pg_dump -t) и удалить. Балансы пользователей хранятся отдельно
+    и не меняются.
+
+    :param table: Имя секционированной таблицы.
+    :param before: Секции за месяцы строго раньше этой даты отключаются.
+    :return: Список имен отключенных секций.
+    """
+    db = SessionLocal()
+    try:
+        detached = []
+        for month_start, name in sorted(list_partitions(db, table).items()):
+            if add_months(month_start, 1) <= before:
+                db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                detached.append(name)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for name in detached:
+        logger.info("Секция %s отключена и готова к архивированию", name)
+    return detached
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Обслуживание месячных секций incomes и expenses')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('ensure', help='создать секции на текущий и следующие месяцы')
+    commands.add_parser('migrate', help='перенести строки из секции DEFAULT в месячные секции')
+    detach_parser = commands.add_parser('detach', help='отключить секции старше заданного месяца')
+    detach_parser.add_argument('before', help='месяц в формате ГГГГ-ММ, более ранние секции отключаются')
+    args = parser.parse_args()
+
+    if args.command == 'ensure':
+        print(f"Создано секций: {ensure_future_partitions()}")
+    elif args.command == 'migrate':
+        for partitioned_table in PARTITIONED_TABLES:
+            print(f"{partitioned_table}: создано секций {migrate_default_partition(partitioned_table)}")
+    else:
+        before_month = datetime.strptime(args.before, '%Y-%m').date()
+        for partitioned_table in PARTITIONED_TABLES:
+            print(f"{partitioned_table}: отключены {', '.join(detach_partitions(partitioned_table, before_month)) or '-'}")
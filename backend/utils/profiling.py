@@ -0,0 +1,32 @@
+import time
+
+
+class StartupProfiler:
+    """
+    Замеряет длительность этапов запуска бота (импорты, подключение к БД и т.п.).
+
+    Этапы отмечаются вызовами mark(); каждый этап длится от предыдущей
+    отметки до текущей.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, name: str):
+        """Завершает текущий этап и сохраняет его длительность."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def report(self) -> str:
+        """Возвращает таблицу длительности этапов."""
+        total = time.perf_counter() - self.started
+        width = max((len(name) for name, _ in self.phases), default=0)
+        lines = [f"{name:<{width}}  {duration * 1000:9.1f} ms" for name, duration in self.phases]
+        lines.append(f"{'итого':<{width}}  {total * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+
+startup_profiler = StartupProfiler()
@@ -0,0 +1,249 @@
+import difflib
+import logging
+import re
+import time
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import NamedTuple, Optional, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from utils.categories import CATEGORY_KINDS
+
+logger = logging.getLogger(__name__)
+
+# Сообщение быстрого ввода: знак, сумма и необязательный текст ("-450 кафе обед вчера", "+50000 зарплата")
+QUICK_ADD_RE = re.compile(r"^\s*(?P<sign>[+-])\s*(?P<amount>\d{1,12}(?:[.,]\d{1,2})?)(?:[ \t]+(?P<rest>[^\n]*?))?\s*$")
+# Дата в тексте: ДД.ММ или ДД.ММ.ГГГГ
+DATE_RE = re.compile(r"^(?P<day>\d{1,2})\.(?P<month>\d{1,2})(?:\.(?P<year>\d{4}))?$")
+RELATIVE_DAYS = {
+    "сегодня": 0,
+    "вчера": 1,
+    "позавчера": 2,
+}
+# Максимальное число строк в одном пакетном сообщении
+MAX_BATCH_LINES = 100
+# Насколько похожим должно быть слово на название категории (0..1)
+FUZZY_CUTOFF = 0.75
+# Сколько вариантов категории предлагать при неоднозначном вводе
+MAX_CANDIDATES = 4
+# Сколько секунд кэшируется справочник категорий
+CATALOG_TTL = 300
+
+
+class QuickEntry(NamedTuple):
+    """
+    Разобранное сообщение быстрого ввода.
+
+    Атрибуты:
+    - kind: Тип операции: "income" или "expense".
+    - amount: Сумма.
+    - date: Дата операции.
+    - words: Слова сообщения без суммы и даты (категория и описание).
+    """
+    kind: str
+    amount: Decimal
+    date: date
+    words: List[str]
+
+
+class BatchLine(NamedTuple):
+    """
+    Результат разбора одной строки пакетного ввода.
+
+    Атрибуты:
+    - number: Номер строки в сообщении (с 1).
+    - text: Текст строки.
+    - entry: Разобранная операция или None, если строка отклонена.
+    - category_id: ID категории (для принятой строки).
+    - category_name: Название категории (для принятой строки).
+    - description: Описание (для принятой строки).
+    - error: Причина отклонения.
+    """
+    number: int
+    text: str
+    entry: Optional[QuickEntry] = None
+    category_id: Optional[int] = None
+    category_name: Optional[str] = None
+    description: Optional[str] = None
+    error: Optional[str] = None
+
+
+class CategoryCatalog:
+    """
+    Кэш справочника категорий для сопоставления с текстом сообщения.
+
+    Категорий немного и меняются они редко, поэтому справочник загружается
+    целиком и обновляется не чаще раза в CATALOG_TTL секунд.
+    """
+
+    def __init__(self, ttl: float = CATALOG_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._loaded_at = {}
+
+    def entries(self, db: Session, kind: str) -> List[Tuple[int, str, str]]:
+        """
+        Возвращает категории типа операций.
+
+        :param db: Сессия базы данных.
+        :param kind: Тип операций ("income" или "expense").
+        :return: Список (ID, название, название в нижнем регистре).
+        """
+        if time.monotonic() - self._loaded_at.get(kind, float("-inf")) > self.ttl:
+            model, _ = CATEGORY_KINDS[kind]
+            rows = db.execute(select(model.id, model.name).order_by(model.id)).all()
+            self._entries[kind] = [(row.id, row.name, (row.name or "").lower()) for row in rows]
+            self._loaded_at[kind] = time.monotonic()
+        return self._entries[kind]
+
+    def invalidate(self):
+        """Сбрасывает кэш (например, после добавления категории)."""
+        self._loaded_at.clear()
+
+    def match(self, db: Session, kind: str, words: List[str]) -> Tuple[List[Tuple[int, str]], int]:
+        """
+        Находит категорию по первым словам текста.
+
+        Сначала проверяются два первых слова (для названий из двух слов), затем
+        одно. Порядок сравнения: точное совпадение, начало названия, нечеткое
+        сходство (difflib), которое учитывает опечатки и окончания.
+
+        :param db: Сессия базы данных.
+        :param kind: Тип операций.
+        :param words: Слова сообщения.
+        :return: Кортеж (варианты [(ID, название)], сколько слов занимает категория).
+                 Один вариант — категория определена, несколько — ввод неоднозначен.
+        """
+        entries = self.entries(db, kind)
+        for size in (2, 1):
+            if len(words) < size:
+                continue
+            phrase = " ".join(words[:size]).lower()
+            exact = [(category_id, name) for category_id, name, lower in entries if lower == phrase]
+            if exact:
+                return exact, size
+            if len(phrase) >= 3:
+                prefix = [(category_id, name) for category_id, name, lower in entries if lower.startswith(phrase)]
+                if prefix:
+                    return prefix[:MAX_CANDIDATES], size
+            close = difflib.get_close_matches(
+                phrase, [lower for _, _, lower in entries], n=MAX_CANDIDATES, cutoff=FUZZY_CUTOFF)
+            if close:
+                return [(category_id, name) for category_id, name, lower in entries if lower in close], size
+        return [], 0
+
+
+category_catalog = CategoryCatalog()
+
+
+def _parse_date(word: str, today: date, last: bool) -> Optional[date]:
+    """
+    Распознает относительную дату или ДД.ММ(.ГГГГ).
+
+    Числовая дата принимается последним словом сообщения или, в других местах,
+    только с двузначным месяцем ("05.03"), чтобы "1.5 литра" не читалось как дата.
+
+    :param word: Слово сообщения в нижнем регистре.
+    :param today: Текущая дата.
+    :param last: Слово последнее в сообщении.
+    :return: Дата или None, если слово не дата.
+    :raises ValueError: Если такой даты не существует (31.02).
+    """
+    if word in RELATIVE_DAYS:
+        return today - timedelta(days=RELATIVE_DAYS[word])
+    match = DATE_RE.match(word)
+    if not match or not last and len(match.group("month")) != 2:
+        return None
+    year = int(match.group("year") or today.year)
+    try:
+        parsed = date(year, int(match.group("month")), int(match.group("day")))
+        # ДД.ММ без года в будущем означает прошлый год (31.12 в январе)
+        if match.group("year") is None and parsed > today:
+            parsed = parsed.replace(year=year - 1)
+    except ValueError:
+        raise ValueError(f"Некорректная дата: {word}") from None
+    return parsed
+
+
+def parse_quick_add(text: str, today: date) -> Optional[QuickEntry]:
+    """
+    Разбирает сообщение быстрого ввода.
+
+    :param text: Текст сообщения, например "-450 кафе обед вчера".
+    :param today: Текущая дата.
+    :return: QuickEntry или None, если сообщение не в формате быстрого ввода.
+    :raises ValueError: Если сумма или дата некорректны.
+    """
+    match = QUICK_ADD_RE.match(text or "")
+    if not match:
+        return None
+
+    amount = Decimal(match.group("amount").replace(",", "."))
+    if amount <= 0:
+        raise ValueError("Сумма должна быть больше нуля")
+
+    entry_date = today
+    words = []
+    rest = (match.group("rest") or "").split()
+    for position, word in enumerate(rest, 1):
+        parsed = _parse_date(word.lower(), today, position == len(rest))
+        if parsed is None:
+            words.append(word)
+        else:
+            entry_date = parsed
+    if entry_date > today:
+        raise ValueError("Дата операции не может быть в будущем")
+
+    kind = "income" if match.group("sign") == "+" else "expense"
+    return QuickEntry(kind, amount, entry_date, words)
+
+
+def is_batch(text: Optional[str]) -> bool:
+    """Проверяет, что сообщение состоит из нескольких строк и первая из них в формате быстрого ввода."""
+    lines = [line for line in (text or "").splitlines() if line.strip()]
+    return len(lines) > 1 and QUICK_ADD_RE.match(lines[0]) is not None
+
+
+def parse_batch(db: Session, text: str, today: date) -> List[BatchLine]:
+    """
+    Разбирает пакетное сообщение: каждая непустая строка — операция в формате быстрого ввода.
+
+    Категория каждой строки определяется по кэшу справочника, поэтому разбор
+    не обращается к базе (кроме обновления кэша). Строки с ошибкой или
+    неоднозначной категорией отклоняются с указанием причины.
+
+    :param db: Сессия базы данных.
+    :param text: Текст сообщения.
+    :param today: Текущая дата.
+    :return: Список BatchLine в порядке строк сообщения.
+    :raises ValueError: Если строк больше MAX_BATCH_LINES.
+    """
+    lines = [(number, line.strip()) for number, line in enumerate(text.splitlines(), 1) if line.strip()]
+    if len(lines) > MAX_BATCH_LINES:
+        raise ValueError(f"Слишком много строк: не больше {MAX_BATCH_LINES} за раз")
+
+    result = []
+    for number, line in lines:
+        try:
+            entry = parse_quick_add(line, today)
+        except ValueError as e:
+            result.append(BatchLine(number, line, error=str(e)))
+            continue
+        if entry is None:
+            result.append(BatchLine(number, line, error="Ожидается формат «-450 кафе обед вчера»"))
+            continue
+
+        candidates, size = category_catalog.match(db, entry.kind, entry.words)
+        if not candidates:
+            result.append(BatchLine(number, line, entry, error="Категория не найдена"))
+        elif len(candidates) > 1:
+            names = ", ".join(name for _, name in candidates)
+            result.append(BatchLine(number, line, entry, error=f"Неоднозначная категория: {names}"))
+        else:
+            category_id, category_name = candidates[0]
+            description = " ".join(entry.words[size:]) or None
+            result.append(BatchLine(number, line, entry, category_id, category_name, description))
+    return result
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты по алгоритму "ведро с токенами".
+
+    :param rate: Скорость пополнения, токенов в секунду.
+    :param capacity: Максимальное количество накопленных токенов (размер всплеска).
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """
+        Забирает токен, если он есть, не дожидаясь его появления.
+
+        :return: 0, если токен получен, иначе время в секундах до появления токена.
+        """
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Ожидает, пока в ведре появится токен, и забирает его."""
+        async with self._lock:
+            while True:
+                delay = self.reserve()
+                if not delay:
+                    return
+                await asyncio.sleep(delay)
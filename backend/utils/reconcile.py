@@ -0,0 +1,262 @@
+import argparse
+import logging
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import NamedTuple, Optional, List, Tuple
+
+from sqlalchemy import select, insert, update, func, union_all, case
+from sqlalchemy.orm import Session
+
+from models.database import SessionLocal
+from models.income import Income
+from models.expense import Expense
+from models.archive import ArchivedTotal
+from models.reconciliation import ReconciliationRun
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Сколько сегментов пользователей сверяется одновременно (у каждого свое соединение)
+RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", 4))
+# Размер сегмента по диапазону ID пользователей
+RECONCILE_SHARD_SIZE = int(os.getenv("RECONCILE_SHARD_SIZE", 50000))
+# Насколько ниже прошлой отметки ID начинать поиск новых операций: транзакции,
+# получившие ID до прошлой сверки и зафиксированные после нее, не должны потеряться
+RECONCILE_ID_OVERLAP = 10000
+# Сколько расхождений писать в лог по каждому сегменту
+MAX_LOGGED_MISMATCHES = 20
+
+_users = User.__table__
+_incomes = Income.__table__
+_expenses = Expense.__table__
+_archived_totals = ArchivedTotal.__table__
+_runs = ReconciliationRun.__table__
+
+
+class ShardResult(NamedTuple):
+    """
+    Результат сверки одного сегмента пользователей.
+
+    Атрибуты:
+    - checked: Сколько пользователей проверено.
+    - mismatches: Расхождения (ID пользователя, баланс, сумма операций).
+    - fixed: Скольким пользователям баланс исправлен.
+    """
+    checked: int
+    mismatches: List[Tuple[int, object, object]]
+    fixed: int
+
+
+def _in_shard(column, low: int, high: int):
+    return (column >= low) & (column < high)
+
+
+def _changed_users(low: int, high: int, since: Tuple[int, int]):
+    """Пользователи сегмента, у которых есть операции с ID больше отметок since."""
+    income_since, expense_since = since
+    return union_all(
+        select(_incomes.c.user_id).where(_in_shard(_incomes.c.user_id, low, high), _incomes.c.id > income_since),
+        select(_expenses.c.user_id).where(_in_shard(_expenses.c.user_id, low, high), _expenses.c.id > expense_since),
+    )
+
+
+def _signed_amounts(user_filter):
+    """
+    Суммы операций со знаком: доходы, минус расходы и итоги заархивированных операций.
+
+    :param user_filter: Функция, возвращающая условие на колонку user_id.
+    """
+    return union_all(
+        select(_incomes.c.user_id, _incomes.c.amount).where(user_filter(_incomes.c.user_id)),
+        select(_expenses.c.user_id, -_expenses.c.amount).where(user_filter(_expenses.c.user_id)),
+        select(
+            _archived_totals.c.user_id,
+            case((_archived_totals.c.kind == "income", _archived_totals.c.amount), else_=-_archived_totals.c.amount),
+        ).where(user_filter(_archived_totals.c.user_id)),
+    ).subquery("signed")
+
+
+def find_mismatches(db: Session, low: int, high: int, since: Optional[Tuple[int, int]] = None):
+    """
+    Находит пользователей сегмента, баланс которых не равен сумме их операций.
+
+    Суммы считаются одним запросом с GROUP BY по всему сегменту.
+
+    :param db: Сессия базы данных.
+    :param low: Начало диапазона ID пользователей (включительно).
+    :param high: Конец диапазона ID пользователей (не включительно).
+    :param since: Отметки (ID дохода, ID расхода): проверять только пользователей с более новыми
+                  операциями. None — проверять всех пользователей сегмента.
+    :return: Кортеж (сколько пользователей проверено, [(ID, баланс, сумма операций)]).
+    """
+    if since is None:
+        def user_filter(column):
+            return _in_shard(column, low, high)
+    else:
+        changed = _changed_users(low, high, since).subquery("changed")
+
+        def user_filter(column):
+            return column.in_(select(changed.c.user_id))
+
+    signed = _signed_amounts(user_filter)
+    totals = (
+        select(signed.c.user_id, func.sum(signed.c.amount).label("expected"))
+        .group_by(signed.c.user_id)
+        .subquery("totals")
+    )
+    expected = func.coalesce(totals.c.expected, 0)
+    balance = func.coalesce(_users.c.balance, 0)
+    users = _users.c.id
+    checked = db.execute(
+        select(func.count()).select_from(_users).where(_in_shard(users, low, high), user_filter(users))
+    ).scalar_one()
+    mismatches = db.execute(
+        select(users, _users.c.balance, expected)
+        .select_from(_users.outerjoin(totals, totals.c.user_id == users))
+        .where(_in_shard(users, low, high), user_filter(users), balance != expected)
+        .order_by(users)
+    ).all()
+    return checked, [tuple(row) for row in mismatches]
+
+
+def fix_balances(db: Session, user_ids: List[int]) -> int:
+    """
+    Записывает пользователям баланс, равный сумме их операций.
+
+    Строки пользователей сначала блокируются, а суммы считаются следующим
+    запросом: операции, зафиксированные до блокировки, в них уже видны, а
+    незавершенная запись операции дождется блокировки и изменит уже
+    исправленный баланс. Фиксирует транзакцию вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_ids: ID пользователей.
+    :return: Количество исправленных пользователей.
+    """
+    if not user_ids:
+        return 0
+    db.execute(select(_users.c.id).where(_users.c.id.in_(user_ids)).with_for_update())
+    signed = _signed_amounts(lambda column: column.in_(user_ids))
+    expected = func.coalesce(
+        select(func.sum(signed.c.amount)).where(signed.c.user_id == _users.c.id).scalar_subquery(), 0)
+    result = db.execute(
+        update(_users)
+        .where(_users.c.id.in_(user_ids), func.coalesce(_users.c.balance, 0) != expected)
+        .values(balance=expected)
+    )
+    return result.rowcount
+
+
+def reconcile_shard(low: int, high: int, since: Optional[Tuple[int, int]], fix: bool) -> ShardResult:
+    """
+    Сверяет балансы одного сегмента в отдельной сессии (выполняется в потоке пула).
+
+    :param low: Начало диапазона ID пользователей (включительно).
+    :param high: Конец диапазона ID пользователей (не включительно).
+    :param since: Отметки ID операций или None для полной сверки.
+    :param fix: Исправлять найденные расхождения.
+    :return: ShardResult.
+    """
+    db = SessionLocal()
+    try:
+        checked, mismatches = find_mismatches(db, low, high, since)
+        fixed = fix_balances(db, [user_id for user_id, _, _ in mismatches]) if fix else 0
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for user_id, balance, expected in mismatches[:MAX_LOGGED_MISMATCHES]:
+        logger.warning("Расхождение баланса пользователя %s: %s, по операциям %s", user_id, balance, expected)
+    return ShardResult(checked, mismatches, fixed)
+
+
+def id_shards(low: int, high: int, shard_size: int) -> List[Tuple[int, int]]:
+    """Делит диапазон ID [low, high] на сегменты [начало, конец)."""
+    return [(start, min(start + shard_size, high + 1)) for start in range(low, high + 1, shard_size)]
+
+
+def reconcile_balances(fix: bool = False, full: bool = False, workers: int = RECONCILE_WORKERS,
+                       shard_size: int = RECONCILE_SHARD_SIZE) -> dict:
+    """
+    Сверяет users.balance с суммой доходов и расходов всех пользователей.
+
+    Диапазон ID пользователей делится на сегменты, которые сверяются
+    параллельно в workers потоках, каждый в своем соединении. По умолчанию
+    проверяются только пользователи, у которых появились операции после
+    прошлой сверки; первая сверка (или full=True) проверяет всех. Функция
+    синхронная и предназначена для запуска в отдельном потоке из планировщика.
+
+    :param fix: Исправлять найденные расхождения.
+    :param full: Проверить всех пользователей.
+    :param workers: Количество параллельно сверяемых сегментов.
+    :param shard_size: Размер сегмента по диапазону ID пользователей.
+    :return: {"checked", "mismatched", "fixed", "shards", "full", "seconds"}.
+    """
+    started = time.monotonic()
+    started_at = datetime.now()
+    db = SessionLocal()
+    try:
+        low, high = db.execute(select(func.min(_users.c.id), func.max(_users.c.id))).one()
+        income_max_id = db.execute(select(func.coalesce(func.max(_incomes.c.id), 0))).scalar_one()
+        expense_max_id = db.execute(select(func.coalesce(func.max(_expenses.c.id), 0))).scalar_one()
+        since = None
+        if not full:
+            last = db.execute(
+                select(_runs.c.income_max_id, _runs.c.expense_max_id).order_by(_runs.c.id.desc()).limit(1)
+            ).first()
+            if last is not None:
+                since = (max(last.income_max_id - RECONCILE_ID_OVERLAP, 0),
+                         max(last.expense_max_id - RECONCILE_ID_OVERLAP, 0))
+    finally:
+        db.close()
+
+    shards = id_shards(low, high, shard_size) if low is not None else []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reconcile") as pool:
+        results = list(pool.map(lambda shard: reconcile_shard(*shard, since, fix), shards))
+
+    report = {
+        "checked": sum(result.checked for result in results),
+        "mismatched": sum(len(result.mismatches) for result in results),
+        "fixed": sum(result.fixed for result in results),
+        "shards": len(shards),
+        "full": since is None,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+    db = SessionLocal()
+    try:
+        db.execute(insert(_runs).values(
+            started_at=started_at,
+            finished_at=datetime.now(),
+            full=report["full"],
+            income_max_id=income_max_id,
+            expense_max_id=expense_max_id,
+            checked=report["checked"],
+            mismatched=report["mismatched"],
+            fixed=report["fixed"],
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    log = logger.warning if report["mismatched"] else logger.info
+    log("Сверка балансов: %s", report)
+    return report
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Сверка балансов пользователей с суммой операций')
+    parser.add_argument('--fix', action='store_true', help='исправить найденные расхождения')
+    parser.add_argument('--full', action='store_true', help='проверить всех пользователей, а не только с новыми операциями')
+    parser.add_argument('--workers', type=int, default=RECONCILE_WORKERS, help='сколько сегментов сверять параллельно')
+    parser.add_argument('--shard-size', type=int, default=RECONCILE_SHARD_SIZE, help='размер сегмента по ID пользователей')
+    args = parser.parse_args()
+
+    print(reconcile_balances(fix=args.fix, full=args.full, workers=args.workers, shard_size=args.shard_size))
@@ -0,0 +1,160 @@
+import logging
+
+from collections import defaultdict
+from datetime import datetime, date
+from decimal import Decimal
+
+from sqlalchemy import select, insert, update, bindparam
+from sqlalchemy.orm import Session
+
+from models.database import SessionLocal
+from models.income import Income
+from models.expense import Expense
+from models.user import User
+from models.recurring import RecurringRule
+from utils.budgets import apply_expenses
+from utils.schedule import next_run_date
+
+logger = logging.getLogger(__name__)
+
+# Сколько правил обрабатывается в одной транзакции
+MATERIALIZE_BATCH_SIZE = 1000
+# Ограничение на количество пропущенных запусков, которые догоняются за раз
+MAX_CATCH_UP_RUNS = 366
+
+_users = User.__table__
+_rules = RecurringRule.__table__
+
+_update_balance = (
+    update(_users)
+    .where(_users.c.id == bindparam("b_user_id"))
+    .values(balance=_users.c.balance + bindparam("b_delta"))
+)
+
+_update_rule = (
+    update(_rules)
+    .where(_rules.c.id == bindparam("b_rule_id"))
+    .values(
+        next_run=bindparam("b_next_run"),
+        last_run=bindparam("b_last_run"),
+        is_active=bindparam("b_is_active"),
+    )
+)
+
+
+def materialize_batch(db: Session, today: date, batch_size: int = MATERIALIZE_BATCH_SIZE) -> int:
+    """
+    Создает операции по одной пачке наступивших регулярных правил.
+
+    Правила выбираются с FOR UPDATE SKIP LOCKED, поэтому несколько реплик бота
+    могут работать одновременно: каждая получает свою непересекающуюся пачку.
+    Доходы и расходы вставляются пакетно (в активную группу пользователя,
+    если она есть), баланс каждого пользователя обновляется один раз на пачку,
+    счетчики бюджетов — в той же транзакции.
+    Транзакцию фиксирует вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param today: Дата, по которую (включительно) создаются операции.
+    :param batch_size: Максимальное количество правил в пачке.
+    :return: Количество обработанных правил.
+    """
+    rules = db.execute(
+        select(
+            _rules.c.id, _rules.c.user_id, _rules.c.kind, _rules.c.category_id,
+            _rules.c.amount, _rules.c.description, _rules.c.schedule, _rules.c.next_run,
+            _users.c.active_group_id,
+        )
+        .join(_users, _users.c.id == _rules.c.user_id)
+        .where(_rules.c.is_active.is_(True), _rules.c.next_run <= today)
+        .order_by(_rules.c.next_run, _rules.c.id)
+        .limit(batch_size)
+        .with_for_update(of=_rules, skip_locked=True)
+    ).all()
+
+    if not rules:
+        return 0
+
+    incomes, expenses, rule_updates = [], [], []
+    balance_deltas = defaultdict(Decimal)
+
+    for rule_id, user_id, kind, category_id, amount, description, schedule, run_date, group_id in rules:
+        target = incomes if kind == "income" else expenses
+        sign = 1 if kind == "income" else -1
+        last_run = None
+        runs = 0
+
+        while run_date is not None and run_date <= today and runs < MAX_CATCH_UP_RUNS:
+            target.append({
+                "user_id": user_id,
+                "category_id": category_id,
+                "amount": amount,
+                "date": run_date,
+                "description": description,
+                "group_id": group_id,
+            })
+            balance_deltas[user_id] += sign * Decimal(amount)
+            last_run = run_date
+            runs += 1
+            try:
+                run_date = next_run_date(schedule, run_date)
+            except ValueError:
+                logger.error("Некорректное расписание '%s' у правила %s, правило отключено.", schedule, rule_id)
+                run_date = None
+
+        rule_updates.append({
+            "b_rule_id": rule_id,
+            "b_next_run": run_date or last_run,
+            "b_last_run": last_run,
+            "b_is_active": run_date is not None,
+        })
+
+    if incomes:
+        db.execute(insert(Income.__table__), incomes)
+    if expenses:
+        db.execute(insert(Expense.__table__), expenses)
+        by_user = defaultdict(list)
+        for values in expenses:
+            by_user[values["user_id"]].append((values["category_id"], values["date"], values["amount"]))
+        for user_id, user_expenses in sorted(by_user.items()):
+            apply_expenses(db, user_id, user_expenses)
+    # Строки пользователей блокируются в порядке id, чтобы параллельные пачки не взаимоблокировались
+    db.execute(_update_balance, [
+        {"b_user_id": user_id, "b_delta": delta}
+        for user_id, delta in sorted(balance_deltas.items())
+    ])
+    db.execute(_update_rule, rule_updates)
+
+    logger.info(
+        "Регулярные операции: правил %s, доходов %s, расходов %s, пользователей %s",
+        len(rules), len(incomes), len(expenses), len(balance_deltas),
+    )
+    return len(rules)
+
+
+def materialize_due_rules(today: date = None, batch_size: int = MATERIALIZE_BATCH_SIZE) -> int:
+    """
+    Создает операции по всем наступившим регулярным правилам.
+
+    Каждая пачка обрабатывается в отдельной транзакции, чтобы блокировки
+    держались недолго. Функция синхронная и предназначена для запуска
+    в отдельном потоке из планировщика.
+
+    :param today: Дата, по которую создаются операции (по умолчанию — сегодня).
+    :param batch_size: Размер пачки правил.
+    :return: Общее количество обработанных правил.
+    """
+    today = today or datetime.today().date()
+    total = 0
+    while True:
+        db = SessionLocal()
+        try:
+            processed = materialize_batch(db, today, batch_size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        total += processed
+        if processed < batch_size:
+            return total
@@ -0,0 +1,154 @@
+import calendar
+
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import NamedTuple, FrozenSet, Optional
+
+
+# Короткие псевдонимы расписаний
+SCHEDULE_ALIASES = {
+    "@daily": "* * *",
+    "@weekly": "* * 1",
+    "@monthly": "1 * *",
+    "@yearly": "1 1 *",
+}
+
+# Сколько лет вперед ищем ближайшую дату (нужно для правил вроде "29 2 *")
+MAX_LOOKAHEAD_YEARS = 8
+
+
+class Schedule(NamedTuple):
+    """
+    Разобранное cron-подобное расписание с точностью до дня.
+
+    Атрибуты:
+    - days: Допустимые дни месяца (1-31).
+    - months: Допустимые месяцы (1-12).
+    - weekdays: Допустимые дни недели (0-6, 0 — воскресенье, как в cron).
+    - any_day: Поле дня месяца было задано как "*".
+    - any_weekday: Поле дня недели было задано как "*".
+    """
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]
+    any_day: bool
+    any_weekday: bool
+
+
+def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    """
+    Разбирает одно поле cron-выражения: "*", "5", "1,15", "1-5", "*/2", "1-20/5".
+
+    :param field: Текст поля.
+    :param low: Минимальное допустимое значение.
+    :param high: Максимальное допустимое значение.
+    :return: Множество значений поля.
+    :raises ValueError: Если поле задано некорректно.
+    """
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f"Некорректный шаг: {step_str}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end:
+            raise ValueError(f"Значение вне диапазона {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@lru_cache(maxsize=1024)
+def parse_schedule(expression: str) -> Schedule:
+    """
+    Разбирает расписание в формате "день_месяца месяц день_недели".
+
+    Допускаются псевдонимы @daily, @weekly, @monthly, @yearly, а также полное
+    пятипольное cron-выражение (поля минут и часов игнорируются: операции
+    создаются с точностью до дня).
+
+    :param expression: Текст расписания.
+    :return: Объект Schedule.
+    :raises ValueError: Если расписание задано некорректно.
+    """
+    expression = SCHEDULE_ALIASES.get(expression.strip().lower(), expression)
+    fields = expression.split()
+    if len(fields) == 5:
+        fields = fields[2:]
+    if len(fields) != 3:
+        raise ValueError("Ожидается три поля: день_месяца месяц день_недели")
+
+    day_field, month_field, weekday_field = fields
+    weekdays = _parse_field(weekday_field, 0, 7)
+    # В cron 7 — тоже воскресенье
+    if 7 in weekdays:
+        weekdays = (weekdays - {7}) | {0}
+
+    return Schedule(
+        days=_parse_field(day_field, 1, 31),
+        months=_parse_field(month_field, 1, 12),
+        weekdays=weekdays,
+        any_day=day_field == "*",
+        any_weekday=weekday_field == "*",
+    )
+
+
+def _matches_day(schedule: Schedule, day: date) -> bool:
+    """Проверяет, подходит ли день под поля дня месяца и дня недели (семантика cron)."""
+    day_ok = day.day in schedule.days
+    weekday_ok = (day.isoweekday() % 7) in schedule.weekdays
+    if schedule.any_day and schedule.any_weekday:
+        return True
+    if schedule.any_day:
+        return weekday_ok
+    if schedule.any_weekday:
+        return day_ok
+    # Если ограничены оба поля, cron срабатывает при совпадении любого из них
+    return day_ok or weekday_ok
+
+
+def next_run_date(expression: str, after: date) -> Optional[date]:
+    """
+    Вычисляет ближайшую дату строго после after, подходящую под расписание.
+
+    Месяцы, не входящие в расписание, пропускаются целиком, поэтому расчет
+    занимает не больше нескольких десятков итераций даже для редких правил.
+
+    :param expression: Текст расписания.
+    :param after: Дата, после которой ищется следующий запуск.
+    :return: Дата следующего запуска или None, если в пределах
+             MAX_LOOKAHEAD_YEARS подходящей даты нет.
+    """
+    schedule = parse_schedule(expression)
+    current = after + timedelta(days=1)
+    limit = date(after.year + MAX_LOOKAHEAD_YEARS, 12, 31)
+
+    while current <= limit:
+        if current.month not in schedule.months:
+            # Переходим к первому числу следующего месяца
+            days_in_month = calendar.monthrange(current.year, current.month)[1]
+            current = current.replace(day=days_in_month) + timedelta(days=1)
+            continue
+        if _matches_day(schedule, current):
+            return current
+        current += timedelta(days=1)
+    return None
+
+
+def first_run_date(expression: str, start: date) -> Optional[date]:
+    """
+    Вычисляет первую дату, начиная с start включительно, подходящую под расписание.
+
+    :param expression: Текст расписания.
+    :param start: Дата, с которой правило начинает действовать.
+    :return: Дата первого запуска или None.
+    """
+    return next_run_date(expression, start - timedelta(days=1))
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import random
+
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """
+    Простой внутрипроцессный планировщик периодических задач на asyncio.
+
+    Синхронные задачи (работа с БД) выполняются в отдельном потоке, чтобы не
+    блокировать обработку обновлений. Ко времени запуска добавляется
+    случайный сдвиг, чтобы реплики бота не просыпались одновременно.
+    """
+
+    def __init__(self):
+        self._jobs = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, interval: float, func: Callable, *args, jitter: float = 0.1):
+        """
+        Регистрирует периодическую задачу.
+
+        :param name: Название задачи (для логов).
+        :param interval: Интервал между запусками в секундах.
+        :param func: Синхронная функция или корутинная функция.
+        :param args: Аргументы функции.
+        :param jitter: Доля интервала, на которую случайно сдвигается запуск.
+        """
+        self._jobs.append((name, interval, func, args, jitter))
+
+    async def _run_job(self, name: str, interval: float, func: Callable, args: tuple, jitter: float):
+        """Бесконечный цикл запуска одной задачи."""
+        while True:
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    await func(*args)
+                else:
+                    await asyncio.to_thread(func, *args)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка в задаче планировщика '%s': %s", name, e, exc_info=True)
+            await asyncio.sleep(interval * (1 + random.uniform(-jitter, jitter)))
+
+    def start(self):
+        """Запускает все зарегистрированные задачи."""
+        for name, interval, func, args, jitter in self._jobs:
+            task = asyncio.create_task(self._run_job(name, interval, func, args, jitter), name=name)
+            self._tasks.append(task)
+        logger.info("Планировщик запущен, задач: %s", len(self._tasks))
+
+    async def stop(self):
+        """Останавливает все задачи планировщика."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+scheduler = Scheduler()
@@ -0,0 +1,266 @@
+import asyncio
+import itertools
+import logging
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Callable, Awaitable
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from utils.metrics import metrics
+from utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Ограничения Telegram: ~30 сообщений в секунду суммарно и ~1 сообщение в секунду в один чат
+GLOBAL_RATE = 30
+PER_CHAT_RATE = 1.0
+# Сколько сообщений подряд можно отправить в один чат без ожидания (ответ из 2-3 сообщений)
+PER_CHAT_BURST = 3
+# Сколько раз повторяем отправку после RetryAfter
+MAX_RETRIES = 3
+# Через сколько секунд простоя забываем лимит чата
+CHAT_IDLE_TTL = 60
+# Сколько лимитов чатов храним, прежде чем чистить простаивающие
+MAX_CHAT_BUCKETS = 10000
+
+# Приоритеты: ответы пользователю отправляются раньше массовых рассылок
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+_priority: ContextVar[int] = ContextVar("outgoing_priority", default=PRIORITY_INTERACTIVE)
+# Устанавливается внутри обработчиков очереди, чтобы middleware не ставило запрос в очередь повторно
+_inside_dispatcher: ContextVar[bool] = ContextVar("inside_dispatcher", default=False)
+
+
+@contextmanager
+def bulk_priority():
+    """Контекст, в котором исходящие запросы получают низкий (массовый) приоритет."""
+    token = _priority.set(PRIORITY_BULK)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class MessageSender:
+    """
+    Центральный диспетчер исходящих запросов к Telegram.
+
+    Все запросы, отправляющие сообщения в чат, проходят через приоритетную
+    очередь: глобальное "ведро с токенами" держит общий темп, отдельные
+    ведра ограничивают частоту в каждый чат, а при RetryAfter отправка
+    приостанавливается и запрос повторяется. Ответы пользователям имеют
+    приоритет над массовыми рассылками.
+
+    :param bot: Экземпляр бота.
+    :param rate: Глобальный лимит сообщений в секунду.
+    :param per_chat_rate: Лимит сообщений в секунду в один чат.
+    :param per_chat_burst: Допустимый всплеск сообщений в один чат.
+    :param workers: Количество параллельных отправителей.
+    """
+
+    def __init__(self, bot: Bot, rate: float = GLOBAL_RATE, per_chat_rate: float = PER_CHAT_RATE,
+                 per_chat_burst: int = PER_CHAT_BURST, workers: int = 8):
+        self.bot = bot
+        self.bucket = TokenBucket(rate)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.workers = workers
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._chat_buckets = {}
+        self._paused_until = 0.0
+        self._tasks = []
+        self._loop = None
+
+        self._queue_depth = metrics.gauge("sender.queue_depth")
+        self._latency = metrics.histogram("sender.latency_seconds")
+        self._request_time = metrics.histogram("sender.request_seconds")
+        self._sent = metrics.counter("sender.sent")
+        self._failed = metrics.counter("sender.failed")
+        self._retry_after = metrics.counter("sender.retry_after")
+        # Неудачные отправки из других потоков: их Future никто не ждет
+        self._threadsafe_failed = metrics.counter("sender.threadsafe_failed")
+
+    def start(self):
+        """Запускает обработчики очереди."""
+        self._loop = asyncio.get_running_loop()
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        """Останавливает обработчики очереди."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def submit(self, chat_id, call: Callable[[], Awaitable], priority: int = None) -> asyncio.Future:
+        """
+        Ставит запрос в очередь.
+
+        :param chat_id: Идентификатор чата, в который отправляется сообщение.
+        :param call: Функция без аргументов, выполняющая запрос.
+        :param priority: Приоритет (по умолчанию берется из контекста).
+        :return: Future с результатом запроса.
+        """
+        if priority is None:
+            priority = _priority.get()
+        future = asyncio.get_running_loop().create_future()
+        self._put(priority, next(self._sequence), (chat_id, call, future, 0, time.monotonic()))
+        return future
+
+    def send(self, chat_id: int, text: str, priority: int = PRIORITY_BULK, **kwargs) -> asyncio.Future:
+        """
+        Ставит сообщение в очередь на отправку, не дожидаясь ее.
+
+        :param chat_id: Идентификатор чата.
+        :param text: Текст сообщения.
+        :param priority: Приоритет сообщения (по умолчанию — массовая рассылка).
+        :param kwargs: Дополнительные параметры bot.send_message.
+        :return: Future, который завершится отправленным сообщением или исключением.
+        """
+        return self.submit(chat_id, lambda: self.bot.send_message(chat_id, text, **kwargs), priority)
+
+    def send_threadsafe(self, chat_id: int, text: str, priority: int = PRIORITY_BULK, **kwargs):
+        """
+        Ставит сообщение в очередь из любого потока (например, из задачи планировщика,
+        выполняющейся в asyncio.to_thread).
+
+        :param chat_id: Идентификатор чата.
+        :param text: Текст сообщения.
+        :param priority: Приоритет сообщения.
+        :param kwargs: Дополнительные параметры bot.send_message.
+        """
+        def enqueue():
+            self.send(chat_id, text, priority, **kwargs).add_done_callback(
+                lambda future: self._report_unawaited(chat_id, future))
+
+        try:
+            self._loop.call_soon_threadsafe(enqueue)
+        except RuntimeError as e:
+            # Цикл событий уже закрыт (бот останавливается)
+            self._threadsafe_failed.inc()
+            logger.error("Не удалось поставить сообщение в очередь для чата %s: %s", chat_id, e)
+
+    def _report_unawaited(self, chat_id: int, future: asyncio.Future):
+        """Забирает результат отправки, которую никто не ждет, чтобы ошибка не терялась."""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._threadsafe_failed.inc()
+            logger.error("Сообщение из фоновой задачи в чат %s не отправлено: %r", chat_id, error)
+
+    async def join(self):
+        """Ожидает, пока все запросы из очереди будут обработаны."""
+        await self.queue.join()
+
+    def _put(self, priority: int, sequence: int, item: tuple):
+        self.queue.put_nowait((priority, sequence, item))
+        self._queue_depth.set(self.queue.qsize())
+
+    def _chat_delay(self, chat_id) -> float:
+        """Резервирует место в лимите чата и возвращает время ожидания, если лимит исчерпан."""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                self._forget_idle_chats()
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return bucket.reserve()
+
+    def _forget_idle_chats(self):
+        """Удаляет лимиты чатов, в которые давно ничего не отправлялось."""
+        deadline = time.monotonic() - CHAT_IDLE_TTL
+        idle = [chat_id for chat_id, bucket in self._chat_buckets.items() if bucket.updated_at < deadline]
+        for chat_id in idle:
+            del self._chat_buckets[chat_id]
+
+    async def _worker(self):
+        _inside_dispatcher.set(True)
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, sequence, item = await self.queue.get()
+            self._queue_depth.set(self.queue.qsize())
+            chat_id, call, future, attempt, enqueued_at = item
+            try:
+                # Чат или весь бот на паузе: возвращаем запрос в очередь позже, не занимая обработчик
+                delay = self._paused_until - time.monotonic()
+                if delay <= 0:
+                    delay = self._chat_delay(chat_id)
+                if delay > 0:
+                    loop.call_later(delay, self._put, priority, sequence, item)
+                    continue
+
+                await self.bucket.acquire()
+                started = time.monotonic()
+                result = await call()
+                self._request_time.observe(time.monotonic() - started)
+                self._latency.observe(time.monotonic() - enqueued_at)
+                self._sent.inc()
+                if not future.done():
+                    future.set_result(result)
+            except TelegramRetryAfter as e:
+                self._retry_after.inc()
+                self._paused_until = time.monotonic() + e.retry_after
+                logger.warning("Flood control: пауза %s с, чат %s", e.retry_after, chat_id)
+                if attempt < MAX_RETRIES:
+                    self._put(priority, sequence, (chat_id, call, future, attempt + 1, enqueued_at))
+                else:
+                    self._failed.inc()
+                    if not future.done():
+                        future.set_exception(e)
+            except Exception as e:
+                self._failed.inc()
+                logger.error("Не удалось отправить сообщение в чат %s: %s", chat_id, e)
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+
+class OutgoingRequestMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота, направляющее отправку сообщений через MessageSender.
+
+    Благодаря ему message.answer, bot.send_message и другие send-методы
+    автоматически соблюдают лимиты Telegram без изменений в обработчиках.
+    """
+
+    def __init__(self, sender: MessageSender):
+        self.sender = sender
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or _inside_dispatcher.get() or not type(method).__name__.startswith("Send"):
+            return await make_request(bot, method)
+        return await self.sender.submit(chat_id, lambda: make_request(bot, method))
+
+
+message_sender: Optional[MessageSender] = None
+
+
+def init_sender(bot: Bot) -> MessageSender:
+    """
+    Создает и запускает общую очередь исходящих сообщений и подключает ее к сессии бота.
+
+    :param bot: Экземпляр бота.
+    :return: Экземпляр MessageSender.
+    """
+    global message_sender
+    message_sender = MessageSender(bot)
+    message_sender.start()
+    bot.session.middleware(OutgoingRequestMiddleware(message_sender))
+    return message_sender
@@ -0,0 +1,310 @@
+import logging
+
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, NamedTuple, Optional, List, Tuple
+
+from sqlalchemy import select, insert, update, delete, bindparam, literal, union_all, tuple_
+from sqlalchemy.orm import Session
+
+from models.income import Income
+from models.expense import Expense
+from models.categories import IncomeCategory, ExpenseCategory
+from models.user import User
+from utils.anomalies import check_expenses
+from utils.budgets import apply_expenses
+
+logger = logging.getLogger(__name__)
+
+# Тип операции -> модель
+TRANSACTION_MODELS = {
+    "income": Income,
+    "expense": Expense,
+}
+# Тип операции -> модель категорий
+TRANSACTION_CATEGORIES = {
+    "income": IncomeCategory,
+    "expense": ExpenseCategory,
+}
+# Порядок типов операций в списке при совпадении даты (по убыванию)
+KIND_RANKS = {
+    "income": 1,
+    "expense": 0,
+}
+# Знак, с которым операция меняет баланс
+BALANCE_SIGNS = {
+    "income": 1,
+    "expense": -1,
+}
+
+_users = User.__table__
+
+
+class TransactionRow(NamedTuple):
+    """
+    Операция в списке операций пользователя.
+
+    Атрибуты:
+    - kind: Тип операции: "income" или "expense".
+    - id: ID операции.
+    - date: Дата операции.
+    - amount: Сумма.
+    - category: Название категории.
+    - description: Описание.
+    """
+    kind: str
+    id: int
+    date: date
+    amount: Decimal
+    category: Optional[str]
+    description: Optional[str]
+
+    @property
+    def cursor(self) -> Tuple[date, str, int]:
+        """Ключ операции для постраничной навигации."""
+        return self.date, self.kind, self.id
+
+_update_balance = (
+    update(_users)
+    .where(_users.c.id == bindparam("b_user_id"))
+    .values(balance=_users.c.balance + bindparam("b_delta"))
+)
+
+
+def record_transaction(db: Session, user_id: int, kind: str, category_id: int, amount, transaction_date: date,
+                       description: str = None, group_id: int = None) -> int:
+    """
+    Записывает доход или расход и изменяет баланс пользователя.
+
+    Оба изменения выполняются в одной транзакции без загрузки ORM-объектов;
+    фиксирует транзакцию вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param kind: Тип операции ("income" или "expense").
+    :param category_id: ID категории.
+    :param amount: Сумма (положительная).
+    :param transaction_date: Дата операции.
+    :param description: Описание.
+    :param group_id: ID общего бюджета или None для личной операции.
+    :return: ID созданной операции.
+    """
+    model = TRANSACTION_MODELS[kind]
+    amount = Decimal(str(amount))
+    transaction_id = db.execute(
+        insert(model.__table__).values(
+            user_id=user_id,
+            category_id=category_id,
+            amount=amount,
+            date=transaction_date,
+            description=description,
+            group_id=group_id,
+        ).returning(model.id)
+    ).scalar_one()
+    db.execute(_update_balance, {"b_user_id": user_id, "b_delta": BALANCE_SIGNS[kind] * amount})
+    if kind == "expense":
+        apply_expenses(db, user_id, [(category_id, transaction_date, amount)])
+        check_expenses(db, user_id, [(category_id, amount)])
+    return transaction_id
+
+
+def record_transactions(db: Session, user_id: int, rows: Iterable[Tuple[str, int, Decimal, date, str]],
+                        group_id: int = None) -> int:
+    """
+    Записывает пачку доходов и расходов и один раз изменяет баланс пользователя.
+
+    Строки каждого типа вставляются одним многострочным INSERT (executemany
+    с insertmanyvalues), баланс изменяется на итоговую разницу одним UPDATE.
+    Фиксирует транзакцию вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param rows: Операции (тип, ID категории, сумма, дата, описание).
+    :param group_id: ID общего бюджета или None для личных операций.
+    :return: Количество записанных операций.
+    """
+    by_kind = {kind: [] for kind in TRANSACTION_MODELS}
+    delta = Decimal(0)
+    for kind, category_id, amount, transaction_date, description in rows:
+        amount = Decimal(str(amount))
+        by_kind[kind].append({
+            "user_id": user_id,
+            "category_id": category_id,
+            "amount": amount,
+            "date": transaction_date,
+            "description": description,
+            "group_id": group_id,
+        })
+        delta += BALANCE_SIGNS[kind] * amount
+
+    count = 0
+    for kind, values in by_kind.items():
+        if values:
+            db.execute(insert(TRANSACTION_MODELS[kind].__table__), values)
+            count += len(values)
+    if count:
+        db.execute(_update_balance, {"b_user_id": user_id, "b_delta": delta})
+    if by_kind["expense"]:
+        apply_expenses(db, user_id, [(values["category_id"], values["date"], values["amount"])
+                                     for values in by_kind["expense"]])
+        check_expenses(db, user_id, [(values["category_id"], values["amount"]) for values in by_kind["expense"]])
+    return count
+
+
+def _page_select(kind: str, user_id: int, limit: int, after: Optional[Tuple[date, str, int]]):
+    """
+    Запрос страницы операций одного типа по убыванию (date, id).
+
+    Условие на курсор записано через сравнение кортежей, поэтому страница
+    читается из индекса (user_id, date, id) с любого места истории.
+    """
+    model = TRANSACTION_MODELS[kind]
+    category = TRANSACTION_CATEGORIES[kind]
+    stmt = (
+        select(
+            literal(kind).label("kind"), model.id, model.date, model.amount,
+            category.name.label("category"), model.description,
+        )
+        .outerjoin(category, category.id == model.category_id)
+        .where(model.user_id == user_id)
+    )
+    if after is not None:
+        after_date, after_kind, after_id = after
+        if KIND_RANKS[kind] < KIND_RANKS[after_kind]:
+            stmt = stmt.where(model.date <= after_date)
+        elif KIND_RANKS[kind] > KIND_RANKS[after_kind]:
+            stmt = stmt.where(model.date < after_date)
+        else:
+            stmt = stmt.where(tuple_(model.date, model.id) < tuple_(after_date, after_id))
+    return stmt.order_by(model.date.desc(), model.id.desc()).limit(limit)
+
+
+def list_transactions(db: Session, user_id: int, limit: int,
+                      after: Optional[Tuple[date, str, int]] = None) -> Tuple[List[TransactionRow], bool]:
+    """
+    Возвращает страницу доходов и расходов пользователя, новые сначала.
+
+    Используется постраничная навигация по ключу (keyset): следующая страница
+    начинается после последней операции предыдущей, поэтому скорость не
+    зависит от глубины истории. Операции одной даты упорядочены по типу и ID.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param limit: Размер страницы.
+    :param after: Ключ (дата, тип, ID) последней операции предыдущей страницы или None.
+    :return: Кортеж (операции, есть ли следующая страница).
+    """
+    pages = union_all(*(
+        _page_select(kind, user_id, limit + 1, after).subquery().select()
+        for kind in TRANSACTION_MODELS
+    )).subquery()
+    rows = sorted(
+        (TransactionRow(*row) for row in db.execute(select(pages)).all()),
+        key=lambda row: (row.date, KIND_RANKS[row.kind], row.id),
+        reverse=True,
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def get_transaction(db: Session, user_id: int, kind: str, transaction_id: int) -> Optional[TransactionRow]:
+    """
+    Находит операцию пользователя.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param kind: Тип операции.
+    :param transaction_id: ID операции.
+    :return: TransactionRow или None, если операция не найдена или принадлежит другому пользователю.
+    """
+    model = TRANSACTION_MODELS[kind]
+    row = db.execute(
+        _page_select(kind, user_id, 1, None).where(model.id == transaction_id)
+    ).first()
+    return TransactionRow(*row) if row else None
+
+
+def update_transaction(db: Session, user_id: int, kind: str, transaction_id: int,
+                       amount=None, description: str = None) -> Optional[TransactionRow]:
+    """
+    Изменяет сумму и (или) описание операции.
+
+    Строка операции блокируется до конца транзакции, баланс пользователя
+    изменяется на разницу сумм в той же транзакции. Фиксирует транзакцию
+    вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param kind: Тип операции.
+    :param transaction_id: ID операции.
+    :param amount: Новая сумма или None, если сумма не меняется.
+    :param description: Новое описание или None, если описание не меняется.
+    :return: Измененная операция или None, если операция не найдена.
+    """
+    model = TRANSACTION_MODELS[kind]
+    old = db.execute(
+        select(model.amount, model.category_id, model.date)
+        .where(model.id == transaction_id, model.user_id == user_id)
+        .with_for_update()
+    ).first()
+    if old is None:
+        return None
+    old_amount = old.amount
+
+    values = {}
+    if amount is not None:
+        values["amount"] = Decimal(str(amount))
+    if description is not None:
+        values["description"] = description
+    if values:
+        db.execute(update(model.__table__).where(model.id == transaction_id).values(**values))
+    if amount is not None and values["amount"] != old_amount:
+        delta = BALANCE_SIGNS[kind] * (values["amount"] - old_amount)
+        db.execute(_update_balance, {"b_user_id": user_id, "b_delta": delta})
+        if kind == "expense":
+            apply_expenses(db, user_id, [(old.category_id, old.date, values["amount"] - old_amount)])
+    logger.info("Изменена операция (%s) %s: %s", kind, transaction_id, values)
+    return get_transaction(db, user_id, kind, transaction_id)
+
+
+def delete_transaction(db: Session, user_id: int, kind: str, transaction_id: int) -> Optional[dict]:
+    """
+    Удаляет операцию и возвращает ее сумму на баланс пользователя.
+
+    Фиксирует транзакцию вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param user_id: ID пользователя.
+    :param kind: Тип операции.
+    :param transaction_id: ID операции.
+    :return: Значения удаленной строки (для отмены удаления) или None, если операция не найдена.
+    """
+    table = TRANSACTION_MODELS[kind].__table__
+    row = db.execute(
+        delete(table)
+        .where(table.c.id == transaction_id, table.c.user_id == user_id)
+        .returning(*table.c)
+    ).mappings().first()
+    if row is None:
+        return None
+    db.execute(_update_balance, {"b_user_id": user_id, "b_delta": -BALANCE_SIGNS[kind] * row["amount"]})
+    if kind == "expense":
+        apply_expenses(db, user_id, [(row["category_id"], row["date"], -row["amount"])])
+    logger.info("Удалена операция (%s) %s на сумму %s", kind, transaction_id, row["amount"])
+    return dict(row)
+
+
+def restore_transaction(db: Session, kind: str, row: dict) -> None:
+    """
+    Восстанавливает удаленную операцию с прежним ID и снова учитывает ее в балансе.
+
+    Фиксирует транзакцию вызывающий код.
+
+    :param db: Сессия базы данных.
+    :param kind: Тип операции.
+    :param row: Значения строки, возвращенные delete_transaction.
+    """
+    db.execute(insert(TRANSACTION_MODELS[kind].__table__).values(**row))
+    db.execute(_update_balance, {"b_user_id": row["user_id"], "b_delta": BALANCE_SIGNS[kind] * row["amount"]})
+    if kind == "expense":
+        apply_expenses(db, row["user_id"], [(row["category_id"], row["date"], row["amount"])])
+    logger.info("Восстановлена операция (%s) %s", kind, row["id"])